@@ -0,0 +1,3 @@
+# src/bench/__init__.py
+
+# Benchmark suite; run it with `python src/benchmark.py`
@@ -0,0 +1,321 @@
+# src/bench/suite.py
+
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+from jinja2 import Template
+from PIL import Image
+from config.settings import APP_VERSION, BASE_DIR, NAMES_FILE, OVERLAY_TYPES
+from core.assets import AssetServer
+from core.audio_index import AudioIndex, AUDIO_INDEX_NAME
+from core.compositor import Compositor
+from core.creator import VideoCreator, VideoRenderer
+from core.encoder import encode_video
+from core.ingest import ImageIngest
+from core.overlays import OverlayStrip, decode_audio, encode_overlay_video
+from core.tracking_store import TrackingStore
+from core.utils import load_names
+from bench.synthetic import make_audio_folder, make_image_folder, make_sample_template, start_stub_driver
+
+STAGES = ('scan', 'metadata', 'template', 'screenshot', 'ingest', 'encode', 'overlay', 'tracking', 'batch')
+RESULTS_VERSION = 1
+
+def measure(function, repeat):
+    """Call function repeat times and return the wall-clock seconds of each call"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(round(time.perf_counter() - start, 6))
+    return timings
+
+def git_revision():
+    """Commit the benchmark ran against, if the tree is a git checkout"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+                              stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True).stdout.decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+class BenchmarkSuite:
+    """
+    Times each pipeline stage on generated inputs: sine-wave MP3s, covers at several resolutions
+    and a sample template. Chrome is replaced by a stub driver, so the suite runs offline on a CPU-only box.
+    Every result records its parameters and per-run timings so two result files can be compared.
+    """
+
+    def __init__(self, work_dir=None, durations=(10,), resolutions=((1280, 720), (1920, 1080), (4000, 3000)),
+                 batch_sizes=(1, 4), workers=(1, 2), encoders=('still',), backends=('pillow', 'browser'),
+                 repeat=3, progress_callback=print, tile_frames=(1,)):
+        self.work_dir = work_dir or tempfile.mkdtemp(prefix='autovid_bench_')
+        self.durations = list(durations)
+        self.resolutions = [tuple(r) for r in resolutions]
+        self.batch_sizes = list(batch_sizes)
+        self.workers = list(workers)
+        self.encoders = list(encoders)
+        self.backends = list(backends)
+        self.repeat = repeat
+        self.tile_frames = list(tile_frames)
+        self.progress_callback = progress_callback
+        self.results = []
+        self.html_template = None
+        self.images = []
+        self.audio = {}
+
+    def report_progress(self, message):
+        if self.progress_callback:
+            self.progress_callback(message)
+
+    def prepare(self):
+        """Generate the synthetic inputs once; existing files in work_dir are reused"""
+        self.report_progress(f"Generating inputs in {self.work_dir}")
+        self.html_template = make_sample_template(os.path.join(self.work_dir, 'template'))
+        self.images = make_image_folder(os.path.join(self.work_dir, 'images'), self.resolutions)
+        for seconds in self.durations:
+            folder = os.path.join(self.work_dir, f"audio_{seconds}s")
+            self.audio[seconds] = make_audio_folder(folder, max(self.batch_sizes), seconds)
+
+    def record(self, stage, params, timings, items=1):
+        result = {
+            'stage': stage,
+            'params': params,
+            'items': items,
+            'seconds': timings,
+            'min': min(timings),
+            'median': round(statistics.median(timings), 6),
+            'mean': round(statistics.mean(timings), 6),
+            'per_item': round(statistics.median(timings) / items, 6),
+        }
+        self.results.append(result)
+        label = ", ".join(f"{k}={v}" for k, v in params.items())
+        self.report_progress(f"{stage:<10} {label:<48} median {result['median']:.4f}s ({result['per_item']:.4f}s/item)")
+        return result
+
+    def scratch(self, name):
+        """Fresh empty folder for one measurement"""
+        path = os.path.join(self.work_dir, 'scratch', name)
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path)
+        return path
+
+    def bench_scan(self):
+        """List the audio folder and probe it, with a cold and a warm audio index"""
+        seconds = self.durations[0]
+        for batch_size in self.batch_sizes:
+            folder = os.path.dirname(self.audio[seconds][0])
+            names = sorted(os.listdir(folder))
+            mp3s = [os.path.join(folder, f) for f in names if f.lower().endswith('.mp3')][:batch_size]
+
+            def cold():
+                index_path = os.path.join(folder, AUDIO_INDEX_NAME)
+                if os.path.exists(index_path):
+                    os.remove(index_path)
+                [f for f in os.listdir(folder) if f.lower().endswith('.mp3')]
+                AudioIndex(folder).probe_all(mp3s)
+
+            def warm():
+                [f for f in os.listdir(folder) if f.lower().endswith('.mp3')]
+                AudioIndex(folder).probe_all(mp3s)
+
+            self.record('scan', {'files': batch_size, 'index': 'cold'}, measure(cold, self.repeat), batch_size)
+            self.record('scan', {'files': batch_size, 'index': 'warm'}, measure(warm, self.repeat), batch_size)
+
+    def bench_metadata(self):
+        """Generate song/artist/year for every file in a batch"""
+        first_names, last_names = load_names(NAMES_FILE)
+        tracking = TrackingStore(os.path.join(self.scratch('metadata'), 'tracking.db'), json_path='')
+        creator = VideoCreator(self.work_dir, self.work_dir, '', output_folder=self.scratch('metadata_out'), tracking_db=tracking.db_path, seed=0)
+        audio = self.audio[self.durations[0]]
+
+        def generate(batch_size):
+            # Every run indexes the tracking store afresh, as a batch does
+            creator.metadata = None
+            for a in audio[:batch_size]:
+                creator.generate_metadata(a, first_names, last_names, tracking)
+
+        try:
+            for batch_size in self.batch_sizes:
+                timings = measure(lambda: generate(batch_size), self.repeat)
+                self.record('metadata', {'files': batch_size}, timings, batch_size)
+        finally:
+            tracking.close()
+
+    def bench_template(self):
+        """Fill the template: the Jinja HTML and its asset URLs for the browser path, the full frame for the Pillow path"""
+        with open(self.html_template, 'r', encoding='utf-8') as f:
+            template = Template(f.read())
+        compositor = Compositor.from_template(self.html_template)
+        asset_server = AssetServer()
+        template_dir = os.path.dirname(self.html_template)
+        for image in self.images:
+            resolution = os.path.basename(image).split('_')[1]
+
+            def html():
+                urls = {f"{name}_url": asset_server.file_url(os.path.join(template_dir, f"{name}.png"))
+                        for name in ('photo_background', 'container_background')}
+                html_content = template.render(image_url=asset_server.file_url(image), song_name='Song',
+                                               song_artist='Artist Name', song_year='1984', **urls)
+                asset_server.page_url(html_content)
+
+            self.record('template', {'backend': 'browser', 'resolution': resolution}, measure(html, self.repeat))
+            if 'pillow' in self.backends:
+                pillow = lambda: compositor.render(image, 'Song', 'Artist Name', '1984')
+                self.record('template', {'backend': 'pillow', 'resolution': resolution}, measure(pillow, self.repeat))
+        asset_server.close()
+
+    def bench_screenshot(self):
+        """Produce and save the frame through each backend (the browser backend uses the stub driver)"""
+        for backend in self.backends:
+            renderer = VideoRenderer(self.html_template, self.scratch('screenshot'), self.scratch('screenshot_frames'),
+                                     backend=backend, frame_cache=False, prescale=False, driver_factory=start_stub_driver)
+            try:
+                for image in self.images:
+                    resolution = os.path.basename(image).split('_')[1]
+                    timings = measure(lambda: renderer.render_template_frame(image, 'Song', 'Artist Name', '1984'), self.repeat)
+                    self.record('screenshot', {'backend': backend, 'resolution': resolution}, timings)
+            finally:
+                renderer.close()
+
+    def bench_ingest(self):
+        """Pre-scale each source resolution, from an empty cache every run"""
+        for image in self.images:
+            resolution = os.path.basename(image).split('_')[1]
+            timings = measure(lambda: ImageIngest(cache_dir=self.scratch('ingest')).prepare(image), self.repeat)
+            self.record('ingest', {'resolution': resolution}, timings)
+
+    def bench_encode(self):
+        """Encode a 1080p frame with each song length and encoder"""
+        frame = ImageIngest(cache_dir=self.scratch('encode_frame')).prepare(self.images[-1])
+        output_folder = self.scratch('encode')
+        for encoder in self.encoders:
+            for seconds in self.durations:
+                audio = self.audio[seconds][0]
+                output = os.path.join(output_folder, f"{encoder}_{seconds}.mp4")
+                timings = measure(lambda: encode_video(frame, audio, output, encoder=encoder), self.repeat)
+                self.record('encode', {'encoder': encoder, 'seconds': seconds}, timings)
+
+    def bench_overlay(self):
+        """
+        Encode a 1080p frame with overlays off (the still encoder) and on; items are audio seconds, so per_item
+        is wall seconds per second of audio. The overlay work is also timed on its own: decoding the audio and
+        preparing the strip once per song, and drawing it for every frame (items are frames).
+        """
+        frame = ImageIngest(cache_dir=self.scratch('overlay_frame')).prepare(self.images[-1])
+        output_folder = self.scratch('overlay')
+        for seconds in self.durations:
+            audio = self.audio[seconds][0]
+            output = os.path.join(output_folder, f"overlay_{seconds}.mp4")
+            # Untimed: otherwise the first variant alone pays for loading ffmpeg and reading the files cold
+            encode_video(frame, audio, output)
+            for overlays in ([], ['progress'], list(OVERLAY_TYPES)):
+                if overlays:
+                    encode = lambda: encode_overlay_video(frame, audio, output, overlays)
+                else:
+                    encode = lambda: encode_video(frame, audio, output)
+                self.record('overlay', {'overlays': ','.join(overlays) or 'none', 'seconds': seconds}, measure(encode, self.repeat), seconds)
+
+            samples = decode_audio(audio)
+            self.record('overlay', {'part': 'decode', 'seconds': seconds}, measure(lambda: decode_audio(audio), self.repeat))
+            with Image.open(frame) as image:
+                strip = OverlayStrip(OVERLAY_TYPES, image.size)
+                prepare = lambda: strip.prepare(image, samples)
+                self.record('overlay', {'part': 'prepare', 'seconds': seconds}, measure(prepare, self.repeat))
+            draw = lambda: [strip.draw(index) for index in range(strip.frames)]
+            self.record('overlay', {'part': 'draw', 'seconds': seconds}, measure(draw, self.repeat), strip.frames)
+
+    def bench_tracking(self):
+        """Record a batch's worth of videos in a fresh tracking database"""
+        for batch_size in self.batch_sizes:
+            def save():
+                store = TrackingStore(os.path.join(self.scratch('tracking'), 'tracking.db'), json_path='')
+                try:
+                    for index in range(batch_size):
+                        store.record(f"Song {index}", 'Artist Name', '1984', self.images[0], f"video_{index}.mp4")
+                finally:
+                    store.close()
+            self.record('tracking', {'files': batch_size}, measure(save, self.repeat), batch_size)
+
+    def bench_batch(self):
+        """Run whole batches end to end across batch sizes, worker counts and backends"""
+        seconds = self.durations[0]
+        for backend, tile_frames in [(b, t) for b in self.backends for t in (self.tile_frames if b == 'browser' else [1])]:
+            for batch_size in self.batch_sizes:
+                audio = self.audio[seconds][:batch_size]
+                for workers in self.workers:
+                    if workers > 1 and batch_size == 1:
+                        continue
+
+                    def batch():
+                        creator = VideoCreator(
+                            os.path.dirname(self.images[0]), os.path.dirname(audio[0]), self.html_template,
+                            output_folder=self.scratch('batch'), progress_callback=None,
+                            encoder=self.encoders[0], workers=workers, backend=backend, frame_cache=False,
+                            audio_files=audio, driver_factory=start_stub_driver, tile_frames=tile_frames,
+                            tracking_db=os.path.join(self.scratch('batch_tracking'), 'tracking.db')
+                        )
+                        success, message = creator.run()
+                        if not success:
+                            raise RuntimeError(message)
+
+                    timings = measure(batch, self.repeat)
+                    params = {'backend': backend, 'files': batch_size, 'workers': workers, 'seconds': seconds, 'encoder': self.encoders[0]}
+                    if tile_frames > 1:
+                        # Only tiled runs carry the key, so untiled results still match older result files
+                        params['tile_frames'] = tile_frames
+                    self.record('batch', params, timings, batch_size)
+
+    def run(self, stages=STAGES):
+        """Generate inputs, run the selected stages and return the results document"""
+        started_at = time.time()
+        self.prepare()
+        for stage in stages:
+            getattr(self, f"bench_{stage}")()
+        return {
+            'version': RESULTS_VERSION,
+            'app_version': APP_VERSION,
+            'revision': git_revision(),
+            'started_at': started_at,
+            'elapsed_seconds': round(time.time() - started_at, 3),
+            'machine': {
+                'platform': platform.platform(),
+                'python': platform.python_version(),
+                'processor': platform.processor() or platform.machine(),
+                'cpu_count': os.cpu_count(),
+            },
+            'config': {
+                'durations': self.durations,
+                'resolutions': [f"{w}x{h}" for w, h in self.resolutions],
+                'batch_sizes': self.batch_sizes,
+                'workers': self.workers,
+                'encoders': self.encoders,
+                'backends': self.backends,
+                'repeat': self.repeat,
+                'tile_frames': self.tile_frames,
+                'stages': list(stages),
+            },
+            'results': self.results,
+        }
+
+def result_key(result):
+    return (result['stage'], tuple(sorted(result['params'].items())))
+
+def compare(baseline, current):
+    """Pair up matching results of two runs; ratio < 1 means the current run is faster"""
+    previous = {result_key(r): r for r in baseline.get('results', [])}
+    rows = []
+    for result in current.get('results', []):
+        before = previous.get(result_key(result))
+        if before is None:
+            continue
+        rows.append({
+            'stage': result['stage'],
+            'params': result['params'],
+            'baseline': before['median'],
+            'current': result['median'],
+            'ratio': round(result['median'] / before['median'], 3) if before['median'] else None,
+        })
+    return rows
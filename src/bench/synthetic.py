@@ -0,0 +1,165 @@
+# src/bench/synthetic.py
+
+import io
+import json
+import os
+import random
+import subprocess
+import urllib.request
+from PIL import Image, ImageDraw
+from core.encoder import get_ffmpeg_binary
+
+SAMPLE_TEMPLATE_HTML = """<!DOCTYPE html>
+<html>
+<head>
+<style>
+    body { margin: 0; width: 1920px; height: 1080px; font-family: Arial, sans-serif;
+           background: url('{{ photo_background_url }}') center / 120%; }
+    .card { position: absolute; left: 680px; top: 100px; width: 560px; height: 730px; border-radius: 12px;
+            background: url('{{ container_background_url }}') center / cover; }
+    .cover { position: absolute; left: 30px; top: 30px; width: 500px; height: 500px; border-radius: 12px;
+             background: url('{{ image_url }}') center / cover; }
+    .song { position: absolute; left: 30px; top: 570px; font-size: 32px; font-weight: bold; }
+    .meta { position: absolute; left: 30px; font-size: 18px; color: #777777; }
+</style>
+</head>
+<body>
+    <div class="card">
+        <div class="cover"></div>
+        <div class="song">{{ song_name }}</div>
+        <div class="meta" style="top: 619px">Artist: {{ song_artist }}</div>
+        <div class="meta" style="top: 649px">Year: {{ song_year }}</div>
+    </div>
+</body>
+</html>
+"""
+
+SAMPLE_TEMPLATE_LAYOUT = {
+    "size": [1920, 1080],
+    "background_color": "#f5f5f5",
+    "layers": [
+        {"type": "image", "source": "photo_background", "box": [0, 0, 1920, 1080], "fit": "cover", "scale": 1.2},
+        {"type": "shadow", "box": [680, 100, 560, 730], "radius": 12, "blur": 6, "offset": [0, 6], "color": [0, 0, 0, 51]},
+        {"type": "image", "source": "container_background", "box": [680, 100, 560, 730], "fit": "cover", "radius": 12},
+        {"type": "image", "source": "cover", "box": [710, 130, 500, 500], "fit": "cover", "radius": 12},
+        {"type": "text", "text": "{song_name}", "box": [710, 670, 340, 44], "size": 32, "weight": "bold", "color": "#333333"},
+        {"type": "text", "text": "Artist: {song_artist}", "box": [710, 719, 340, 25], "size": 18, "color": "#777777"},
+        {"type": "text", "text": "Year: {song_year}", "box": [710, 749, 340, 25], "size": 18, "color": "#777777"}
+    ]
+}
+
+def make_sine_mp3(path, seconds, frequency=440, bitrate='128k'):
+    """Write a sine-wave MP3 of the given length with ffmpeg's lavfi source"""
+    subprocess.run(
+        [get_ffmpeg_binary(), '-hide_banner', '-loglevel', 'error', '-y',
+         '-f', 'lavfi', '-i', f"sine=frequency={frequency}:sample_rate=44100:duration={seconds}",
+         '-ac', '2', '-c:a', 'libmp3lame', '-b:a', bitrate, path],
+        check=True
+    )
+    return path
+
+def make_cover(path, size, seed=0):
+    """Write a cover image: a gradient with random shapes, so it compresses like a photo rather than a flat colour"""
+    rng = random.Random(seed)
+    width, height = size
+    gradient = Image.linear_gradient('L').resize((width, height))
+    image = Image.merge('RGB', (gradient, gradient.rotate(90).resize((width, height)), Image.new('L', (width, height), rng.randint(0, 255))))
+    draw = ImageDraw.Draw(image)
+    for _ in range(40):
+        x, y = rng.randrange(width), rng.randrange(height)
+        radius = rng.randint(width // 40 + 1, width // 6 + 2)
+        draw.ellipse((x - radius, y - radius, x + radius, y + radius),
+                     fill=(rng.randint(0, 255), rng.randint(0, 255), rng.randint(0, 255)))
+    image.save(path, quality=90)
+    return path
+
+def make_sample_template(folder):
+    """Write a self-contained HTML template, its Pillow layout and generated assets; return the HTML path"""
+    os.makedirs(folder, exist_ok=True)
+    make_cover(os.path.join(folder, 'photo_background.png'), (960, 540), seed=101)
+    make_cover(os.path.join(folder, 'container_background.png'), (560, 730), seed=102)
+    html_template = os.path.join(folder, 'sample.html')
+    with open(html_template, 'w', encoding='utf-8') as f:
+        f.write(SAMPLE_TEMPLATE_HTML)
+    with open(os.path.join(folder, 'sample.layout.json'), 'w', encoding='utf-8') as f:
+        json.dump(SAMPLE_TEMPLATE_LAYOUT, f, indent=4)
+    return html_template
+
+def make_audio_folder(folder, count, seconds):
+    """Fill a folder with count sine MP3s (one tone per file) and return their paths"""
+    os.makedirs(folder, exist_ok=True)
+    paths = []
+    for index in range(count):
+        path = os.path.join(folder, f"tone{index:03d}.mp3")
+        if not os.path.exists(path):
+            make_sine_mp3(path, seconds, frequency=220 + 20 * index)
+        paths.append(path)
+    return paths
+
+def make_image_folder(folder, resolutions, per_resolution=1):
+    """Fill a folder with covers at each resolution and return their paths"""
+    os.makedirs(folder, exist_ok=True)
+    paths = []
+    for width, height in resolutions:
+        for index in range(per_resolution):
+            path = os.path.join(folder, f"cover_{width}x{height}_{index}.jpg")
+            if not os.path.exists(path):
+                make_cover(path, (width, height), seed=width * height + index)
+            paths.append(path)
+    return paths
+
+class StubDriver:
+    """
+    Stands in for Chrome: implements the WebDriver calls the renderer makes and returns a flat PNG of the
+    window size, so the screenshot stage runs without a browser. Timings measure our code, not Chrome's.
+    """
+
+    def __init__(self, page_size=(1920, 1080)):
+        self.page_size = list(page_size)
+        self.content_size = list(page_size)
+        self.window_size = [800, 600]
+        self.html = ''
+        self.pages = 0
+
+    def get(self, url):
+        # Fetch the page like a browser would, so serving it is part of the measured time
+        if url.startswith('http'):
+            with urllib.request.urlopen(url) as response:
+                self.html = response.read().decode('utf-8')
+        self.content_size = list(self.page_size)
+        self.pages += 1
+
+    def execute_script(self, script, *args):
+        if 'readyState' in script:
+            return True
+        if 'autovid-tile' in script:
+            # Tiled page: every tile takes page_size, in a grid of args[0] columns
+            columns, (width, height) = args[0], self.page_size
+            tiles = self.html.count('class="autovid-tile"')
+            self.content_size = [columns * width, -(-tiles // columns) * height]
+            return {'rects': [[(i % columns) * width, (i // columns) * height, width, height] for i in range(tiles)],
+                    'size': list(self.content_size)}
+        if 'scrollWidth' in script:
+            return list(self.content_size)
+        return list(self.window_size)
+
+    def set_script_timeout(self, timeout):
+        pass
+
+    def execute_async_script(self, script, *args):
+        return True
+
+    def set_window_size(self, width, height):
+        self.window_size = [width, height]
+
+    def get_screenshot_as_png(self):
+        buffer = io.BytesIO()
+        Image.new('RGB', tuple(self.window_size), (245, 245, 245)).save(buffer, 'PNG')
+        return buffer.getvalue()
+
+    def quit(self):
+        pass
+
+def start_stub_driver():
+    """Driver factory for the benchmark; module-level so worker processes can unpickle it"""
+    return StubDriver()
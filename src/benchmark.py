@@ -0,0 +1,81 @@
+# src/benchmark.py
+
+import argparse
+import contextlib
+import json
+import sys
+from bench.suite import BenchmarkSuite, STAGES, compare
+from core.log import configure_logging, LOG_LEVELS
+
+def parse_list(value, cast=int):
+    return [cast(item) for item in value.split(',') if item]
+
+def parse_resolution(value):
+    width, height = value.lower().split('x')
+    return int(width), int(height)
+
+def build_parser():
+    """Build the benchmark argument parser"""
+    parser = argparse.ArgumentParser(
+        prog="autovid-benchmark",
+        description="Time each pipeline stage on generated media (no browser or network needed)"
+    )
+    parser.add_argument("--output", default="-", help="Write the JSON results to this file ('-' for stdout)")
+    parser.add_argument("--work-dir", default=None, help="Folder for generated inputs; reused between runs (default: a new temp folder)")
+    parser.add_argument("--stages", type=lambda v: parse_list(v, str), default=list(STAGES),
+                        help=f"Comma-separated stages to run (default: {','.join(STAGES)})")
+    parser.add_argument("--durations", type=parse_list, default=[10], help="Song lengths in seconds, e.g. 10,60")
+    parser.add_argument("--resolutions", type=lambda v: parse_list(v, parse_resolution),
+                        default=[(1280, 720), (1920, 1080), (4000, 3000)], help="Cover sizes, e.g. 1280x720,4000x3000")
+    parser.add_argument("--batch-sizes", type=parse_list, default=[1, 4], help="Files per batch, e.g. 1,4,16")
+    parser.add_argument("--workers", type=parse_list, default=[1, 2], help="Worker counts for batch runs, e.g. 1,2,4")
+    parser.add_argument("--encoders", type=lambda v: parse_list(v, str), default=['still'], help="Encoders to time, e.g. still,moviepy")
+    parser.add_argument("--backends", type=lambda v: parse_list(v, str), default=['pillow', 'browser'],
+                        help="Frame backends to time; 'browser' runs against a stub driver")
+    parser.add_argument("--tile-frames", type=parse_list, default=[1],
+                        help="Browser frames per page load for batch runs, e.g. 1,4 (see --tile-frames in cli.py)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement")
+    parser.add_argument("--log-level", type=str.upper, choices=LOG_LEVELS, default='WARNING', help="Log level of the pipeline under test")
+    parser.add_argument("--compare", default=None, help="Results file from an earlier run to compare medians against")
+    return parser
+
+def print_comparison(rows):
+    """Print median timings next to a baseline's, slowest regressions first"""
+    print(f"{'stage':<10} {'params':<56} {'baseline':>9} {'current':>9} {'ratio':>6}", file=sys.stderr)
+    for row in sorted(rows, key=lambda r: r['ratio'] or 0, reverse=True):
+        label = ", ".join(f"{k}={v}" for k, v in row['params'].items())
+        print(f"{row['stage']:<10} {label:<56} {row['baseline']:>9.4f} {row['current']:>9.4f} {row['ratio'] or 0:>6.2f}", file=sys.stderr)
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    configure_logging(args.log_level)
+    unknown = [stage for stage in args.stages if stage not in STAGES]
+    if unknown:
+        print(f"Unknown stages: {', '.join(unknown)}", file=sys.stderr)
+        return 2
+
+    # Progress goes to stderr so the results can be piped from stdout
+    suite = BenchmarkSuite(
+        work_dir=args.work_dir, durations=args.durations, resolutions=args.resolutions,
+        batch_sizes=args.batch_sizes, workers=args.workers, encoders=args.encoders,
+        backends=args.backends, repeat=args.repeat, tile_frames=args.tile_frames,
+        progress_callback=lambda message: print(message, file=sys.stderr)
+    )
+    # Anything the pipeline prints (e.g. moviepy) would mix with the JSON on stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        results = suite.run(args.stages)
+
+    if args.output == "-":
+        json.dump(results, sys.stdout, indent=4)
+        sys.stdout.write("\n")
+    else:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=4)
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            print_comparison(compare(json.load(f), results))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
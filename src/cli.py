@@ -0,0 +1,300 @@
+# src/cli.py
+
+import argparse
+import json
+import os
+import sys
+from config.settings import APP_NAME, APP_VERSION, TEMPLATE_DIR, DEFAULT_ENCODER, DEFAULT_WORKERS, DEFAULT_RENDER_BACKEND, INGEST_MEMORY_BUDGET, WATCH_INTERVAL, WATCH_SETTLE_SECONDS, LOG_LEVEL, TRACE_ENABLED, RENDITIONS, RENDER_BACKENDS, METADATA_SEED, METADATA_UNIQUE_ARTISTS, BROWSER_TILE_FRAMES, QUEUE_LEASE_SECONDS, PIPELINE_RENDER_THREADS, PIPELINE_ENCODE_THREADS, PIPELINE_QUEUE_SIZE, OVERLAY_TYPES, DEFAULT_OVERLAYS
+from core.encoder import ENCODERS
+from core.log import configure_logging, LOG_LEVELS
+from core.progress import format_event
+from core.watcher import FolderWatcher, WATCH_STATE_NAME, watch_folder
+
+def resolve_template(template):
+    """Resolve a template given as a path or as a file name inside TEMPLATE_DIR"""
+    if not template:
+        return ""
+    if os.path.isfile(template):
+        return os.path.abspath(template)
+    candidate = os.path.join(TEMPLATE_DIR, template)
+    if os.path.isfile(candidate):
+        return candidate
+    raise FileNotFoundError(f"Template not found: {template}")
+
+def parse_renditions(value):
+    """Parse a comma-separated list of rendition names"""
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in names if name not in RENDITIONS]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown rendition(s): {', '.join(unknown)}")
+    return names
+
+def parse_overlays(value):
+    """Parse a comma-separated list of overlay names"""
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in names if name not in OVERLAY_TYPES]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown overlay(s): {', '.join(unknown)}")
+    return names
+
+QUEUE_ACTIONS = ('run', 'submit', 'work', 'collect', 'status')
+
+def build_parser():
+    """Build the command line argument parser"""
+    parser = argparse.ArgumentParser(
+        prog="autovid",
+        description=f"{APP_NAME} {APP_VERSION} - create videos from images and audio without the GUI"
+    )
+    parser.add_argument("--images", help="Folder containing .png/.jpg/.jpeg images (required)")
+    parser.add_argument("--audio", help="Folder containing .mp3 files (required)")
+    parser.add_argument("--output", help="Folder to write videos to (required)")
+    parser.add_argument("--template", default="", help="HTML template path or name in the template folder (default: no template)")
+    parser.add_argument("--artist", default=None, help="Use this artist name instead of a generated one")
+    parser.add_argument("--year", default=None, help="Use this year instead of a generated one")
+    parser.add_argument("--seed", type=int, default=METADATA_SEED,
+                        help="Seed for generated names, years and image picks, to make a batch reproducible")
+    parser.add_argument("--unique-artists", action="store_true", default=METADATA_UNIQUE_ARTISTS,
+                        help="Never reuse an artist name for the same song, even with a different year")
+    parser.add_argument("--encoder", choices=ENCODERS, default=DEFAULT_ENCODER,
+                        help="'still' encodes one looped frame with ffmpeg and copies the audio; 'moviepy' uses the original 24 fps path")
+    parser.add_argument("--backend", choices=RENDER_BACKENDS, default=DEFAULT_RENDER_BACKEND,
+                        help="Frame renderer for templates: 'pillow' needs a <template>.layout.json, 'auto' uses it when present")
+    parser.add_argument("--no-frame-cache", dest="frame_cache", action="store_false",
+                        help="Always render frames instead of reusing identical ones from the frame cache")
+    parser.add_argument("--no-prescale", dest="prescale", action="store_false",
+                        help="Use source images at full resolution instead of scaling them to the output size first")
+    parser.add_argument("--memory-budget", type=int, default=INGEST_MEMORY_BUDGET // (1024 * 1024),
+                        help="Largest decoded source image a worker may hold, in MB (0 = unlimited)")
+    parser.add_argument("--renditions", type=parse_renditions, default=None,
+                        help=f"Comma-separated aspect ratios to produce from one pass, e.g. 16x9,9x16,1x1 (available: {', '.join(RENDITIONS)})")
+    parser.add_argument("--overlays", type=parse_overlays, default=DEFAULT_OVERLAYS,
+                        help=f"Comma-separated animations drawn over the frame while it is encoded, e.g. progress,waveform (available: {', '.join(OVERLAY_TYPES)})")
+    parser.add_argument("--tile-frames", type=int, default=BROWSER_TILE_FRAMES,
+                        help="Render this many browser frames per page load and split one screenshot between them (1 = off)")
+    parser.add_argument("--compilation", default=None,
+                        help="Also join all songs into one video with chapters, written to this file (relative paths go in --output)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="Number of render processes (0 = one per CPU core)")
+    parser.add_argument("--render-threads", type=int, default=PIPELINE_RENDER_THREADS,
+                        help="With one worker, frames rendered at once (each render thread has its own browser)")
+    parser.add_argument("--encode-threads", type=int, default=PIPELINE_ENCODE_THREADS,
+                        help="With one worker, videos encoded at once while the next frames render")
+    parser.add_argument("--pipeline-depth", type=int, default=PIPELINE_QUEUE_SIZE,
+                        help="Rendered frames that may wait for an encoder before rendering pauses")
+    parser.add_argument("--resume", action="store_true",
+                        help="Skip songs the previous batch in this output folder already finished (see autovid_manifest.json)")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Only plan the batch: print names, output paths, collisions and time and disk estimates, then exit")
+    parser.add_argument("--calibrate", action="store_true",
+                        help="With --dry-run, measure this machine with a short sample encode even if it was measured before")
+    parser.add_argument("--no-calibrate", dest="calibrate_missing", action="store_false",
+                        help="With --dry-run, never run a sample encode; estimates need a calibration from an earlier run")
+    parser.add_argument("--summary", default=None, help="Write a JSON summary of the batch to this file ('-' for stdout)")
+    parser.add_argument("--log-level", type=str.upper, choices=LOG_LEVELS, default=LOG_LEVEL,
+                        help="Console log level; DEBUG shows per-file details, OFF silences the log")
+    parser.add_argument("--trace", default=None,
+                        help="Write per-stage timings as JSON lines to this file (default: autovid_trace.jsonl in the output folder)")
+    parser.add_argument("--no-trace", dest="trace_enabled", action="store_false", default=TRACE_ENABLED,
+                        help="Do not record per-stage timings")
+    parser.add_argument("--watch", action="store_true",
+                        help="Keep running and render new .mp3 files as they appear in the audio folder")
+    parser.add_argument("--interval", type=float, default=WATCH_INTERVAL, help="Seconds between scans in watch mode")
+    parser.add_argument("--settle", type=float, default=WATCH_SETTLE_SECONDS,
+                        help="Seconds a new file must stay unchanged before it is rendered in watch mode")
+    parser.add_argument("--skip-existing", action="store_true",
+                        help="In watch mode, ignore files already in the audio folder when watching starts")
+    parser.add_argument("--queue", default=None,
+                        help="Share the batch with other render nodes through this folder (e.g. on a NAS), see --queue-action")
+    parser.add_argument("--queue-action", choices=QUEUE_ACTIONS, default='run',
+                        help="'submit' queues the batch, 'work' renders queued jobs (no other options needed), 'collect' records "
+                             "finished jobs in this machine's tracking store, 'status' reports progress; 'run' submits, works and collects")
+    parser.add_argument("--lease-seconds", type=float, default=QUEUE_LEASE_SECONDS,
+                        help="Seconds a claimed job stays reserved without a heartbeat before another node may take it over")
+    parser.add_argument("--install-driver", action="store_true",
+                        help="Download chromedriver for the installed Chrome and cache its path for offline runs, then exit")
+    return parser
+
+def write_summary(summary, destination):
+    """Write the batch summary as JSON to a file or stdout"""
+    if destination == "-":
+        json.dump(summary, sys.stdout, ensure_ascii=False, indent=4)
+        sys.stdout.write("\n")
+        return
+    with open(destination, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, ensure_ascii=False, indent=4)
+
+def main(argv=None):
+    """
+    Command line entry point.
+    Runs a batch headlessly and returns a process exit code.
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    configure_logging(args.log_level)
+
+    if args.install_driver:
+        return install_driver()
+    if args.queue and args.queue_action not in ('run', 'submit'):
+        return run_queue(args, None)
+    missing = [f"--{name}" for name in ('images', 'audio', 'output') if not getattr(args, name)]
+    if missing:
+        parser.error(f"the following arguments are required: {', '.join(missing)}")
+    if args.compilation and (args.renditions or args.watch):
+        parser.error("--compilation cannot be combined with --renditions or --watch")
+    if args.queue and (args.compilation or args.watch):
+        parser.error("--queue cannot be combined with --compilation or --watch")
+    if args.overlays and (args.compilation or args.encoder != 'still'):
+        parser.error("--overlays needs the still encoder and cannot be combined with --compilation")
+
+    try:
+        template = resolve_template(args.template)
+    except FileNotFoundError as e:
+        print(str(e), file=sys.stderr)
+        return 2
+
+    if args.dry_run:
+        return plan_batch(args, template)
+    if args.watch:
+        return watch(args, template)
+    if args.queue:
+        return run_queue(args, template)
+
+    success, message = run_batch(args, template, resume=args.resume)
+    return 0 if success else 1
+
+def install_driver():
+    """Fetch chromedriver now so later runs start without network access"""
+    from core.browser import resolve_driver_path, DriverNotFoundError
+
+    try:
+        driver_path = resolve_driver_path(offline=False, refresh=True)
+    except DriverNotFoundError as e:
+        print(str(e), file=sys.stderr)
+        return 1
+    print(f"chromedriver cached: {driver_path}")
+    return 0
+
+def print_progress(event):
+    """Print encode progress; item starts are already announced by the progress messages"""
+    if event['kind'] != 'start':
+        print(format_event(event), flush=True)
+
+def build_creator(args, template, resume=False, audio_files=None):
+    """A VideoCreator set up from the command line options"""
+    from core.creator import VideoCreator
+
+    return VideoCreator(
+        args.images, args.audio, template,
+        custom_artist=args.artist, custom_year=args.year,
+        output_folder=os.path.abspath(args.output),
+        progress_callback=print,
+        progress_event_callback=print_progress,
+        encoder=args.encoder,
+        workers=args.workers,
+        backend=args.backend,
+        frame_cache=args.frame_cache,
+        prescale=args.prescale,
+        memory_budget=args.memory_budget * 1024 * 1024,
+        resume=resume,
+        audio_files=audio_files,
+        renditions=args.renditions,
+        overlays=args.overlays,
+        seed=args.seed,
+        tile_frames=args.tile_frames,
+        render_threads=args.render_threads,
+        encode_threads=args.encode_threads,
+        pipeline_depth=args.pipeline_depth,
+        compilation=args.compilation,
+        unique_artists=args.unique_artists,
+        trace=args.trace_enabled,
+        trace_path=os.path.abspath(args.trace) if args.trace else None
+    )
+
+def run_batch(args, template, resume=False, audio_files=None):
+    """Run one batch with the command line options and report the result"""
+    creator = build_creator(args, template, resume=resume, audio_files=audio_files)
+    success, message = creator.run()
+    print(message)
+
+    if args.summary:
+        write_summary(creator.summary(success, message), args.summary)
+
+    return success, message
+
+def plan_batch(args, template):
+    """Print what a batch would do, without rendering or encoding anything"""
+    from core.planner import format_plan
+
+    creator = build_creator(args, template, resume=args.resume)
+    try:
+        report = creator.plan(calibrate_missing=args.calibrate_missing, recalibrate=args.calibrate)
+    except (OSError, ValueError) as e:
+        print(str(e), file=sys.stderr)
+        return 2
+    print(format_plan(report))
+    if args.summary:
+        write_summary(report, args.summary)
+    return 1 if report['collisions'] or report['warnings'] else 0
+
+def run_queue(args, template):
+    """
+    Take part in a batch shared through a queue folder.
+    Any number of machines can 'work' on the same folder; one of them submits and collects, so only its
+    tracking store is written.
+    """
+    from core.job_queue import JobQueue, collect_results
+
+    job_queue = JobQueue(args.queue, lease_seconds=args.lease_seconds)
+    action = args.queue_action
+    if action in ('run', 'submit'):
+        success, message = build_creator(args, template, resume=args.resume).submit(job_queue)
+        print(message)
+        if not success:
+            return 1
+    elif not job_queue.exists:
+        print(f"No job queue in {job_queue.folder}", file=sys.stderr)
+        return 2
+
+    if action in ('run', 'work'):
+        from core.creator import run_queue_workers, resolve_workers
+
+        rendered = run_queue_workers(job_queue.folder, nodes=resolve_workers(args.workers), lease_seconds=args.lease_seconds, progress_callback=print)
+        print(f"Rendered {rendered} videos on this machine")
+    if action in ('run', 'collect'):
+        collected = collect_results(job_queue)
+        print(f"Recorded {len(collected)} finished videos in the tracking store")
+
+    status = job_queue.status()
+    failures = job_queue.failures()
+    print(f"Queue {job_queue.folder}: {status['done']}/{status['total']} done, {status['failed']} failed, "
+          f"{status['leased']} rendering, {status['waiting']} waiting")
+    for failure in failures:
+        print(f"Failed {os.path.basename(failure['job']['audio'])} ({failure['attempts']} attempts): {failure['error']}")
+    if args.summary:
+        write_summary({'queue': job_queue.folder, 'status': status, 'failures': failures}, args.summary)
+    return 1 if failures else 0
+
+def watch(args, template):
+    """
+    Watch the audio folder and render each new file once it has finished being written.
+    Batches always resume, so files finished before a restart are not rendered twice.
+    """
+    output_folder = os.path.abspath(args.output)
+    os.makedirs(output_folder, exist_ok=True)
+    watcher = FolderWatcher(args.audio, os.path.join(output_folder, WATCH_STATE_NAME), settle_seconds=args.settle)
+    if args.skip_existing:
+        watcher.mark_all_seen()
+    print(f"Watching {watcher.folder} for new audio (Ctrl+C to stop)")
+
+    def process(paths):
+        print(f"Found {len(paths)} new audio file(s)")
+        run_batch(args, template, resume=True, audio_files=paths)
+
+    try:
+        watch_folder(watcher, process, interval=args.interval)
+    except KeyboardInterrupt:
+        print("Stopped watching")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
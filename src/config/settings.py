@@ -15,7 +15,8 @@ TEMPLATE_DIR = os.path.join(SRC_DIR, 'template')
 # File paths
 CONFIG_FILE = os.path.join(RESOURCES_DIR, 'config.json')
 NAMES_FILE = os.path.join(RESOURCES_DIR, 'names.json')
-TRACKING_FILE = os.path.join(RESOURCES_DIR, 'tracking.json')
+TRACKING_FILE = os.path.join(RESOURCES_DIR, 'tracking.json')  # Legacy, imported into TRACKING_DB once
+TRACKING_DB = os.path.join(RESOURCES_DIR, 'tracking.db')
 
 # Ensure necessary directories exist
 # os.makedirs(OUTPUT_DIR, exist_ok=True)
@@ -30,5 +31,117 @@ APP_VERSION = "1.0.0"
 DEFAULT_FPS = 24
 MIN_YEAR = 1978
 MAX_YEAR = 1986
+# Generated artist/song/year combinations never repeat one from the tracking store. Set METADATA_SEED to
+# make a batch's names and image picks reproducible; METADATA_UNIQUE_ARTISTS also keeps an artist from
+# being reused for the same song in another year
+METADATA_SEED = None
+METADATA_UNIQUE_ARTISTS = False
+METADATA_MAX_ATTEMPTS = 32  # Random draws per song before walking the remaining candidates in order
+DEFAULT_ENCODER = 'still'  # 'still' (ffmpeg, single looped frame) or 'moviepy'
+STILL_IMAGE_FPS = 1
+STILL_IMAGE_PRESET = 'veryfast'
+
+# Renditions that can be produced together from one render pass and one audio stream.
+# Outputs are named artist_song_year_<name>.mp4; no video_bitrate means x264's constant-quality default
+RENDITIONS = {
+    '16x9': {'size': (1920, 1080), 'video_bitrate': None},
+    '9x16': {'size': (1080, 1920), 'video_bitrate': None},
+    '1x1': {'size': (1080, 1080), 'video_bitrate': None},
+}
+
+# Animated overlays (--overlays) drawn with NumPy over the static frame at encode time, stacked in a strip
+# along its bottom edge. Heights and margins are for a 1080 px tall frame and scale with the frame
+OVERLAY_TYPES = ('progress', 'waveform', 'meter')
+DEFAULT_OVERLAYS = []
+OVERLAY_FPS = 10
+OVERLAY_AUDIO_RATE = 8000  # Audio is decoded to mono at this rate for the waveform and levels
+OVERLAY_HEIGHTS = {'progress': 8, 'waveform': 96, 'meter': 8}
+OVERLAY_MARGIN = 32  # Below the strip
+OVERLAY_GAP = 12  # Between stacked overlays
+OVERLAY_COLOR = (106, 90, 205)  # #6A5ACD, the app colour; reads on light and dark frames
+OVERLAY_OPACITY = 0.9  # The played part, or the meter's current level
+OVERLAY_TRACK_OPACITY = 0.3  # The rest
+
+# Frame rendering: 'auto' uses the Pillow compositor when a template has a
+# <name>.layout.json next to it, otherwise the browser; 'browser' or 'pillow' force one
+RENDER_BACKENDS = ('auto', 'browser', 'pillow')
+DEFAULT_RENDER_BACKEND = 'auto'
+
+# Image ingest: source images are scaled down to fit this size once and cached
+INGEST_ENABLED = True
+INGEST_MAX_SIZE = (1920, 1080)
+INGEST_MEMORY_BUDGET = 512 * 1024 ** 2  # Largest decoded image a worker may hold, in bytes
+INGEST_CACHE_DIR = os.path.join(BASE_DIR, 'cache', 'images')
+INGEST_CACHE_MAX_BYTES = 1024 ** 3  # Least recently used images are evicted above this size
+
+# Audio metadata index (durations, stream info, ID3 tags)
+AUDIO_INDEX_DIR = os.path.join(BASE_DIR, 'cache', 'audio')  # Used when the audio folder is read-only
+AUDIO_PROBE_WORKERS = 0  # Parallel ffmpeg probes; 0 uses one per CPU core
+
+# Rendered frame cache, keyed by template, assets, cover image and metadata
+FRAME_CACHE_ENABLED = True
+FRAME_CACHE_DIR = os.path.join(BASE_DIR, 'cache', 'frames')
+FRAME_CACHE_MAX_BYTES = 2 * 1024 ** 3  # Least recently used frames are evicted above this size
+
+# Compilation (mix) mode: every song is encoded once as a segment with these fixed parameters, so segments
+# can be joined without re-encoding. Segments are cached by frame, audio and parameters
+COMPILATION_SIZE = (1920, 1080)
+COMPILATION_FPS = 1  # Joining restarts both streams at every segment, so a low rate costs no drift across songs
+COMPILATION_AUDIO_RATE = 48000
+COMPILATION_AUDIO_BITRATE = '192k'
+SEGMENT_CACHE_DIR = os.path.join(BASE_DIR, 'cache', 'segments')
+SEGMENT_CACHE_MAX_BYTES = 10 * 1024 ** 3
+
+# Browser settings
+BROWSER_MAX_PAGES = 100  # Restart a browser after this many renders
+BROWSER_READY_TIMEOUT = 10  # Seconds to wait for a page to finish loading
+BROWSER_POLL_INTERVAL = 0.02
+# Pages, template assets and covers are served to the browser from a loopback HTTP server
+ASSET_SERVER_HOST = '127.0.0.1'
+# Frames per page load when browser frames are rendered in tiles (1 = one page load per frame)
+BROWSER_TILE_FRAMES = 1
+BROWSER_TILE_START_SIZE = (800, 600)  # Initial tile size, as a new headless window; tiles grow to fit their page
+ASSET_SERVER_PAGES = 4  # Least number of unscreenshotted pages a renderer keeps published
+ASSET_CACHE_MAX_BYTES = 128 * 1024 * 1024  # Asset bytes held in memory per renderer
+# chromedriver is looked up in this order: CHROMEDRIVER_PATH, the path cached in DRIVER_CACHE_FILE by an
+# earlier download, chromedriver on PATH; only then is it downloaded (never when BROWSER_OFFLINE is set)
+CHROMEDRIVER_PATH = os.getenv('AUTOVID_CHROMEDRIVER') or None
+CHROME_BINARY = os.getenv('AUTOVID_CHROME_BINARY') or None
+BROWSER_OFFLINE = os.getenv('AUTOVID_OFFLINE', '') not in ('', '0')
+DRIVER_CACHE_FILE = os.path.join(BASE_DIR, 'cache', 'driver.json')
+DRIVER_DOWNLOAD_TIMEOUT = 60  # Seconds to wait for a chromedriver download before giving up
+
+# Batch settings
+DEFAULT_WORKERS = 1  # Render processes per batch; 0 uses one per CPU core
+# Within one render process frames are rendered while earlier songs encode; these set each stage's threads
+# and how many rendered frames may wait for an encoder
+PIPELINE_RENDER_THREADS = 1
+PIPELINE_ENCODE_THREADS = 1
+PIPELINE_QUEUE_SIZE = 2
+
+# Dry-run estimates come from per-machine measurements: a short sample encode of the batch's own inputs,
+# refined by every finished batch (older measurements count for at most CALIBRATION_HISTORY_SECONDS of audio)
+CALIBRATION_FILE = os.path.join(BASE_DIR, 'cache', 'calibration.json')
+CALIBRATION_SAMPLE_SECONDS = 20  # A quarter-length sample is encoded as well, to separate ffmpeg's start-up from its speed
+CALIBRATION_HISTORY_SECONDS = 3600
+
+# Shared job queue (a batch split across render nodes through a common folder)
+QUEUE_LEASE_SECONDS = 120  # A claimed job goes back to the queue if its worker stops renewing the lease this long
+QUEUE_MAX_ATTEMPTS = 2  # Failed jobs are retried by any node until they have failed this many times
+QUEUE_POLL_INTERVAL = 2.0  # Seconds an idle worker waits before looking for expired leases again
+
+# Watch mode
+WATCH_INTERVAL = 1.0  # Seconds between folder scans
+WATCH_SETTLE_SECONDS = 2.0  # A new file must stay unchanged this long before it is rendered
+
+# GUI template preview: rendered off the UI thread at reduced size, once edits pause for PREVIEW_DEBOUNCE_MS
+PREVIEW_SIZE = (480, 270)  # Previews are scaled to fit this box
+PREVIEW_DEBOUNCE_MS = 250
+PREVIEW_CACHE_ITEMS = 32  # Previews kept in memory, by template files, cover and metadata
+
+# Logging and tracing
+LOG_LEVEL = 'INFO'  # 'DEBUG', 'INFO', 'WARNING', 'ERROR' or 'OFF'
+TRACE_ENABLED = True  # Write per-stage timings for every video to the trace file in the output folder
+PROGRESS_INTERVAL = 0.5  # Minimum seconds between progress updates sent to the UI or console
 
 # You can add more settings as needed
\ No newline at end of file
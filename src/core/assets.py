@@ -0,0 +1,181 @@
+# src/core/assets.py
+
+import base64
+import hashlib
+import mimetypes
+import os
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote, urlsplit
+from config.settings import ASSET_CACHE_MAX_BYTES, ASSET_SERVER_HOST, ASSET_SERVER_PAGES
+from core.log import get_logger
+
+logger = get_logger('assets')
+
+class AssetStore:
+    """
+    In-memory copies of the files templates reference (template assets, covers).
+    A file is read once and only re-read when its mtime or size changes; the least recently used files are
+    dropped once the store holds more than max_bytes.
+    """
+
+    def __init__(self, max_bytes=ASSET_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        """Return the entry for path: data, mime type and a version that changes with the file"""
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry['stamp'] == stamp:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return entry
+        with open(path, 'rb') as f:
+            data = f.read()
+        entry = {
+            'path': path,
+            'stamp': stamp,
+            'data': data,
+            'mime': mimetypes.guess_type(path)[0] or 'application/octet-stream',
+            'version': hashlib.sha1(f"{stamp[0]}:{stamp[1]}".encode()).hexdigest()[:12],
+            'base64': None,
+        }
+        with self._lock:
+            previous = self._entries.pop(path, None)
+            if previous is not None:
+                self.total_bytes -= len(previous['data'])
+            self._entries[path] = entry
+            self.total_bytes += len(data)
+            self.misses += 1
+            while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+                _, dropped = self._entries.popitem(last=False)
+                self.total_bytes -= len(dropped['data'])
+        return entry
+
+    def base64(self, path):
+        """The file's base64 text, for templates that still inline their images"""
+        entry = self.get(path)
+        if entry['base64'] is None:
+            entry['base64'] = base64.b64encode(entry['data']).decode()
+        return entry['base64']
+
+class AssetRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        owner = self.server.owner
+        path = urlsplit(self.path).path
+        if path.startswith('/pages/'):
+            page = owner.pages.get(path)
+            if page is None:
+                return self.send_error(404)
+            # Pages differ on every render and must never be served from the browser cache
+            return self.send_body(page, 'text/html; charset=utf-8', {'Cache-Control': 'no-store'})
+        if path.startswith('/files/'):
+            file_path = owner.files.get(path.split('/')[2])
+            if file_path is None:
+                return self.send_error(404)
+            try:
+                entry = owner.store.get(file_path)
+            except FileNotFoundError:
+                return self.send_error(404)
+            etag = f'"{entry["version"]}"'
+            # URLs carry the file version, so the browser may keep (and keep decoded) what it has fetched
+            headers = {'Cache-Control': 'public, max-age=31536000, immutable', 'ETag': etag}
+            if self.headers.get('If-None-Match') == etag:
+                return self.send_body(b'', None, headers, status=304)
+            return self.send_body(entry['data'], entry['mime'], headers)
+        self.send_error(404)
+
+    def send_body(self, body, content_type, headers, status=200):
+        self.send_response(status)
+        if content_type:
+            self.send_header('Content-Type', content_type)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(f"asset server: {format % args}")
+
+class AssetServer:
+    """
+    Loopback HTTP server that hands the browser rendered pages and the files they reference.
+    Only files registered with file_url() are served. Their URLs include the file's version, so the browser
+    caches template assets across renders and fetches them again only after the file changes on disk.
+    """
+
+    def __init__(self, store=None, host=ASSET_SERVER_HOST, port=0, max_pages=ASSET_SERVER_PAGES):
+        self.store = store or AssetStore()
+        self.host = host
+        self.port = port
+        self.max_pages = max_pages
+        self.files = {}
+        self.pages = OrderedDict()
+        self._page_count = 0
+        self._server = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        self.start()
+        return f"http://{self.host}:{self._server.server_address[1]}"
+
+    def start(self):
+        """Start serving on first use"""
+        with self._lock:
+            if self._server is not None:
+                return
+            self._server = ThreadingHTTPServer((self.host, self.port), AssetRequestHandler)
+            self._server.daemon_threads = True
+            self._server.owner = self
+            self._thread = threading.Thread(target=self._server.serve_forever, name='autovid-assets', daemon=True)
+            self._thread.start()
+            logger.debug(f"Asset server listening on {self.host}:{self._server.server_address[1]}")
+
+    def file_url(self, path):
+        """URL the browser can load path from"""
+        path = os.path.abspath(path)
+        entry = self.store.get(path)
+        file_id = hashlib.sha1(path.encode()).hexdigest()[:16]
+        self.files[file_id] = path
+        return f"{self.base_url}/files/{file_id}/{quote(os.path.basename(path))}?v={entry['version']}"
+
+    def page_url(self, html):
+        """
+        Publish a rendered page and return its URL. Callers unpublish it once the browser is done with it;
+        max_pages only bounds pages that were never unpublished, dropping the oldest first.
+        """
+        with self._lock:
+            self._page_count += 1
+            path = f"/pages/{self._page_count}.html"
+            self.pages[path] = html.encode('utf-8')
+            while len(self.pages) > self.max_pages:
+                self.pages.popitem(last=False)
+        return f"{self.base_url}{path}"
+
+    def unpublish(self, url):
+        """Stop serving a page published with page_url"""
+        with self._lock:
+            self.pages.pop(urlsplit(url).path, None)
+
+    def close(self):
+        with self._lock:
+            if self._server is None:
+                return
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
@@ -0,0 +1,157 @@
+# src/core/audio_index.py
+
+import hashlib
+import json
+import os
+import re
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config.settings import AUDIO_INDEX_DIR, AUDIO_PROBE_WORKERS
+from core.encoder import get_ffmpeg_binary
+
+AUDIO_INDEX_NAME = '.autovid_audio_index.json'
+AUDIO_INDEX_VERSION = 1
+
+DURATION_PATTERN = re.compile(r"Duration:\s*(\d+):(\d+):(\d+(?:\.\d+)?)")
+BITRATE_PATTERN = re.compile(r"bitrate:\s*(\d+)\s*kb/s")
+STREAM_PATTERN = re.compile(r"Stream #\d+:\d+.*?: Audio: (\w+)[^,]*, (\d+) Hz, ([^,]+)")
+TAG_PATTERN = re.compile(r"^\s{4}(\w+)\s*:\s(.*)$")
+CHANNEL_LAYOUTS = {'mono': 1, 'stereo': 2, '2.1': 3, 'quad': 4, '4.0': 4, '5.0': 5, '5.1': 6, '6.1': 7, '7.1': 8}
+# ID3 frames ffmpeg may report the year under
+YEAR_TAGS = ('date', 'year', 'TYER', 'TDRC', 'TDOR')
+
+def parse_ffmpeg_info(output):
+    """Pull duration, bitrate, stream info and title/artist/year tags out of `ffmpeg -i` output"""
+    info = {'duration': None, 'bitrate': None, 'codec': None, 'sample_rate': None, 'channels': None,
+            'title': None, 'artist': None, 'year': None}
+    match = DURATION_PATTERN.search(output)
+    if match:
+        hours, minutes, seconds = match.groups()
+        info['duration'] = round(int(hours) * 3600 + int(minutes) * 60 + float(seconds), 3)
+    match = BITRATE_PATTERN.search(output)
+    if match:
+        info['bitrate'] = int(match.group(1)) * 1000
+    match = STREAM_PATTERN.search(output)
+    if match:
+        codec, sample_rate, layout = match.groups()
+        info['codec'] = codec
+        info['sample_rate'] = int(sample_rate)
+        layout = layout.strip()
+        channels = re.match(r"(\d+) channels", layout)
+        info['channels'] = int(channels.group(1)) if channels else CHANNEL_LAYOUTS.get(layout.split('(')[0])
+
+    # Container-level tags sit in the first Metadata block, indented by four spaces
+    tags = {}
+    for line in output.split('Duration:')[0].splitlines():
+        match = TAG_PATTERN.match(line)
+        if match:
+            tags.setdefault(match.group(1).lower(), match.group(2).strip())
+    info['title'] = tags.get('title') or None
+    info['artist'] = tags.get('artist') or None
+    for key in YEAR_TAGS:
+        year = re.match(r"(\d{4})", tags.get(key.lower(), ''))
+        if year:
+            info['year'] = year.group(1)
+            break
+    return info
+
+def probe_audio(path):
+    """Probe one audio file with ffmpeg"""
+    process = subprocess.run(
+        [get_ffmpeg_binary(), '-hide_banner', '-i', path],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    output = process.stderr.decode('utf-8', errors='replace')
+    info = parse_ffmpeg_info(output)
+    if info['duration'] is None:
+        info['error'] = output.strip().splitlines()[-1] if output.strip() else "ffmpeg could not read the file"
+    return info
+
+class AudioIndex:
+    """
+    Cached audio metadata (duration, bitrate, sample rate, channels, ID3 title/artist/year) for a folder.
+    Entries are keyed by path and invalidated by size and mtime; new files are probed in parallel.
+    The index is stored next to the audio as .autovid_audio_index.json, or in the cache folder
+    when the audio folder is not writable.
+    """
+
+    def __init__(self, folder):
+        self.folder = os.path.abspath(folder)
+        self.entries = {}
+        self.probed = 0
+        self._lock = threading.Lock()
+        self.path = self.sidecar_path()
+        self.load()
+
+    def sidecar_path(self):
+        sidecar = os.path.join(self.folder, AUDIO_INDEX_NAME)
+        if os.path.exists(sidecar) or os.access(self.folder, os.W_OK):
+            return sidecar
+        folder_key = hashlib.sha256(self.folder.encode()).hexdigest()[:16]
+        return os.path.join(AUDIO_INDEX_DIR, f"{folder_key}.json")
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+        if data.get('version') == AUDIO_INDEX_VERSION:
+            self.entries = data.get('entries', {})
+
+    def save(self):
+        """Write the index atomically"""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with self._lock:
+            data = {'version': AUDIO_INDEX_VERSION, 'entries': self.entries}
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=4)
+        os.replace(temp_path, self.path)
+
+    @staticmethod
+    def file_key(path):
+        stat = os.stat(path)
+        return stat.st_size, stat.st_mtime_ns
+
+    def entry_key(self, path):
+        """Files in the indexed folder are keyed by name, anything else by absolute path"""
+        path = os.path.abspath(path)
+        return os.path.basename(path) if os.path.dirname(path) == self.folder else path
+
+    def cached(self, path):
+        """Return the cached entry for path if the file has not changed since it was probed"""
+        entry = self.entries.get(self.entry_key(path))
+        if entry and (entry.get('size'), entry.get('mtime_ns')) == self.file_key(path):
+            return entry
+        return None
+
+    def store(self, path, info):
+        size, mtime_ns = self.file_key(path)
+        entry = dict(info, size=size, mtime_ns=mtime_ns)
+        with self._lock:
+            self.entries[self.entry_key(path)] = entry
+            self.probed += 1
+        return entry
+
+    def probe_all(self, paths, workers=AUDIO_PROBE_WORKERS):
+        """Return {path: info} for every path, probing only new or changed files (in parallel)"""
+        results = {}
+        missing = []
+        for path in paths:
+            entry = self.cached(path)
+            if entry is None:
+                missing.append(path)
+            else:
+                results[path] = entry
+        if missing:
+            with ThreadPoolExecutor(max_workers=max(1, workers or os.cpu_count() or 1)) as pool:
+                for path, info in zip(missing, pool.map(probe_audio, missing)):
+                    results[path] = self.store(path, info)
+            self.save()
+        return results
+
+    def get(self, path):
+        """Return info for one file, probing it if needed"""
+        return self.probe_all([path])[path]
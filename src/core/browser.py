@@ -0,0 +1,339 @@
+# src/core/browser.py
+
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+from config.settings import (
+    BROWSER_MAX_PAGES, BROWSER_READY_TIMEOUT, BROWSER_POLL_INTERVAL, BROWSER_OFFLINE,
+    CHROMEDRIVER_PATH, CHROME_BINARY, DRIVER_CACHE_FILE, DRIVER_DOWNLOAD_TIMEOUT
+)
+from core.log import get_logger
+from core.trace import Tracer
+
+logger = get_logger('browser')
+
+# True once the document, its <img> elements and its web fonts have finished loading
+READY_SCRIPT = """
+if (document.readyState !== 'complete') { return false; }
+var images = Array.prototype.slice.call(document.images);
+for (var i = 0; i < images.length; i++) {
+    if (!images[i].complete) { return false; }
+}
+if (document.fonts && document.fonts.status !== 'loaded') { return false; }
+return true;
+"""
+
+# Resolves once every <img> is decoded, so the first screenshot never shows a half-painted image
+DECODE_SCRIPT = """
+var done = arguments[arguments.length - 1];
+var images = Array.prototype.slice.call(document.images);
+Promise.all(images.map(function (img) { return img.decode ? img.decode().catch(function () {}) : null; }))
+    .then(function () { return document.fonts ? document.fonts.ready : null; })
+    .then(function () { requestAnimationFrame(function () { done(true); }); }, function () { done(false); });
+"""
+
+PAGE_SIZE_SCRIPT = "return [Math.max(document.body.scrollWidth, document.body.offsetWidth, document.documentElement.clientWidth, document.documentElement.scrollWidth, document.documentElement.offsetWidth), Math.max(document.body.scrollHeight, document.body.offsetHeight, document.documentElement.clientHeight, document.documentElement.scrollHeight, document.documentElement.offsetHeight)];"
+
+VIEWPORT_SCRIPT = "return [window.innerWidth, window.innerHeight];"
+
+# Tiled pages hold one <iframe class="autovid-tile"> per frame; the scripts below apply the single-page
+# checks to every tile's document
+TILE_READY_SCRIPT = """
+if (document.readyState !== 'complete') { return false; }
+var frames = document.querySelectorAll('iframe.autovid-tile');
+for (var i = 0; i < frames.length; i++) {
+    var doc = frames[i].contentDocument;
+    if (!doc || doc.readyState !== 'complete') { return false; }
+    for (var j = 0; j < doc.images.length; j++) {
+        if (!doc.images[j].complete) { return false; }
+    }
+    if (doc.fonts && doc.fonts.status !== 'loaded') { return false; }
+}
+return true;
+"""
+
+TILE_DECODE_SCRIPT = """
+var done = arguments[arguments.length - 1];
+var waits = [];
+Array.prototype.forEach.call(document.querySelectorAll('iframe.autovid-tile'), function (frame) {
+    var doc = frame.contentDocument;
+    Array.prototype.forEach.call(doc.images, function (img) { waits.push(img.decode ? img.decode().catch(function () {}) : null); });
+    if (doc.fonts) { waits.push(doc.fonts.ready); }
+});
+Promise.all(waits).then(function () { requestAnimationFrame(function () { done(true); }); }, function () { done(false); });
+"""
+
+# Grows every tile to its page's full size (as fit_window_to_page does for one page), lays the tiles out in a
+# grid of arguments[0] columns and returns each tile's rectangle and the size of the whole grid
+TILE_LAYOUT_SCRIPT = """
+var columns = arguments[0];
+var frames = Array.prototype.slice.call(document.querySelectorAll('iframe.autovid-tile'));
+function pageSize(doc) {
+    var body = doc.body, root = doc.documentElement;
+    return [Math.max(body.scrollWidth, body.offsetWidth, root.clientWidth, root.scrollWidth, root.offsetWidth),
+            Math.max(body.scrollHeight, body.offsetHeight, root.clientHeight, root.scrollHeight, root.offsetHeight)];
+}
+for (var pass = 0; pass < 3; pass++) {
+    frames.forEach(function (frame) {
+        var size = pageSize(frame.contentDocument);
+        frame.style.width = size[0] + 'px';
+        frame.style.height = size[1] + 'px';
+    });
+}
+var cellWidth = 0, cellHeight = 0;
+frames.forEach(function (frame) {
+    cellWidth = Math.max(cellWidth, frame.offsetWidth);
+    cellHeight = Math.max(cellHeight, frame.offsetHeight);
+});
+var rects = frames.map(function (frame, i) {
+    var left = (i % columns) * cellWidth, top = Math.floor(i / columns) * cellHeight;
+    frame.style.left = left + 'px';
+    frame.style.top = top + 'px';
+    return [left, top, frame.offsetWidth, frame.offsetHeight];
+});
+var size = [columns * cellWidth, Math.ceil(frames.length / columns) * cellHeight];
+document.body.style.width = size[0] + 'px';
+document.body.style.height = size[1] + 'px';
+return {'rects': rects, 'size': size};
+"""
+
+class DriverNotFoundError(RuntimeError):
+    """No usable chromedriver could be found (or downloaded)"""
+
+def load_cached_driver(cache_file=DRIVER_CACHE_FILE):
+    """Return the chromedriver path saved by an earlier download, if it is still there"""
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            driver_path = json.load(f).get('driver_path')
+    except (FileNotFoundError, ValueError):
+        return None
+    if driver_path and os.access(driver_path, os.X_OK):
+        return driver_path
+    return None
+
+def save_cached_driver(driver_path, cache_file=DRIVER_CACHE_FILE):
+    os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+    temp_path = f"{cache_file}.{os.getpid()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump({'driver_path': driver_path, 'saved_at': time.time()}, f, indent=4)
+    os.replace(temp_path, cache_file)
+
+def download_driver(timeout=DRIVER_DOWNLOAD_TIMEOUT):
+    """Fetch a chromedriver matching the installed Chrome with webdriver_manager, giving up after timeout seconds"""
+    from webdriver_manager.chrome import ChromeDriverManager
+
+    pool = ThreadPoolExecutor(max_workers=1)
+    future = pool.submit(lambda: ChromeDriverManager().install())
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        raise DriverNotFoundError(
+            f"Downloading chromedriver did not finish within {timeout}s. Check the network, or put chromedriver "
+            "on PATH / set AUTOVID_CHROMEDRIVER to its path."
+        )
+    except Exception as e:
+        raise DriverNotFoundError(f"Could not download chromedriver: {e}") from e
+    finally:
+        # A hung download is abandoned rather than waited for
+        pool.shutdown(wait=False)
+
+def resolve_driver_path(offline=BROWSER_OFFLINE, refresh=False):
+    """
+    Find chromedriver without going online when possible: CHROMEDRIVER_PATH, then the path cached by an
+    earlier download, then chromedriver on PATH. Only if none exists (or refresh is set, e.g. after a Chrome
+    update) is it downloaded, and the new path is cached for later runs.
+    """
+    if CHROMEDRIVER_PATH:
+        if not os.access(CHROMEDRIVER_PATH, os.X_OK):
+            raise DriverNotFoundError(f"AUTOVID_CHROMEDRIVER points to a missing or non-executable file: {CHROMEDRIVER_PATH}")
+        return CHROMEDRIVER_PATH
+    if not refresh:
+        driver_path = load_cached_driver() or shutil.which('chromedriver')
+        if driver_path:
+            return driver_path
+    if offline:
+        raise DriverNotFoundError(
+            "No chromedriver found and offline mode is on (AUTOVID_OFFLINE). Run `python src/cli.py --install-driver` "
+            "once while online, put chromedriver on PATH, or set AUTOVID_CHROMEDRIVER to its path."
+        )
+    driver_path = download_driver()
+    save_cached_driver(driver_path)
+    return driver_path
+
+def start_chrome_driver():
+    """Start a headless Chrome driver"""
+    from selenium.common.exceptions import SessionNotCreatedException
+
+    driver_path = resolve_driver_path()
+    try:
+        return launch_chrome(driver_path)
+    except SessionNotCreatedException:
+        # Usually a cached driver that no longer matches an updated Chrome: fetch a matching one once
+        if CHROMEDRIVER_PATH or BROWSER_OFFLINE:
+            raise
+        logger.warning(f"chromedriver at {driver_path} could not start Chrome, fetching a matching driver")
+        return launch_chrome(resolve_driver_path(refresh=True))
+
+def launch_chrome(driver_path):
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+
+    service = Service(driver_path)
+    options = webdriver.ChromeOptions()
+    if CHROME_BINARY:
+        options.binary_location = CHROME_BINARY
+    options.add_argument("--headless")
+    options.add_argument("--hide-scrollbars")
+    return webdriver.Chrome(service=service, options=options)
+
+def wait_for(condition, timeout=BROWSER_READY_TIMEOUT, poll=BROWSER_POLL_INTERVAL):
+    """Poll condition() until it returns a truthy value or the timeout passes; returns the last value"""
+    deadline = time.monotonic() + timeout
+    while True:
+        result = condition()
+        if result or time.monotonic() >= deadline:
+            return result
+        time.sleep(poll)
+
+def wait_until_ready(driver, timeout=BROWSER_READY_TIMEOUT):
+    """Wait until the page, its images and fonts are loaded and decoded"""
+    ready = wait_for(lambda: driver.execute_script(READY_SCRIPT), timeout=timeout)
+    if not ready:
+        logger.warning(f"Page not ready after {timeout}s, taking screenshot anyway")
+        return False
+    driver.set_script_timeout(timeout)
+    return bool(driver.execute_async_script(DECODE_SCRIPT))
+
+def wait_until_tiles_ready(driver, timeout=BROWSER_READY_TIMEOUT):
+    """wait_until_ready for a tiled page: every tile's page, images and fonts"""
+    ready = wait_for(lambda: driver.execute_script(TILE_READY_SCRIPT), timeout=timeout)
+    if not ready:
+        logger.warning(f"Tiled page not ready after {timeout}s, taking screenshot anyway")
+        return False
+    driver.set_script_timeout(timeout)
+    return bool(driver.execute_async_script(TILE_DECODE_SCRIPT))
+
+def layout_tiles(driver, columns):
+    """Size and place the tiles of a tiled page; returns ([x, y, width, height] per tile, [width, height])"""
+    layout = driver.execute_script(TILE_LAYOUT_SCRIPT, columns)
+    return [list(rect) for rect in layout['rects']], list(layout['size'])
+
+def fit_window_to_page(driver, timeout=BROWSER_READY_TIMEOUT):
+    """
+    Resize the window to the full page size and wait until the viewport has followed.
+    Raises RuntimeError if it never does, rather than let the frame be screenshotted at the wrong size;
+    render_frame then retries on a fresh browser and a tiled page falls back to single renders.
+    """
+    width, height = driver.execute_script(PAGE_SIZE_SCRIPT)
+    if list(driver.execute_script(VIEWPORT_SCRIPT)) == [width, height]:
+        return width, height
+    driver.set_window_size(width, height)
+    if not wait_for(lambda: list(driver.execute_script(VIEWPORT_SCRIPT)) == [width, height], timeout=timeout):
+        viewport_width, viewport_height = driver.execute_script(VIEWPORT_SCRIPT)
+        raise RuntimeError(f"Browser viewport stayed at {viewport_width}x{viewport_height} instead of the page's {width}x{height} after {timeout}s")
+    return width, height
+
+class DriverPool:
+    """
+    Pool of warm headless browsers.
+    Drivers are leased per render, recycled after max_pages renders and replaced when a render fails.
+    """
+
+    def __init__(self, size=1, max_pages=BROWSER_MAX_PAGES, driver_factory=start_chrome_driver, tracer=None):
+        self.size = max(1, size)
+        self.tracer = tracer or Tracer()
+        self.max_pages = max_pages
+        self.driver_factory = driver_factory
+        self._idle = queue.LifoQueue()
+        self._pages = {}
+        self._created = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def warm(self, count=None):
+        """Start drivers up front instead of on first lease"""
+        for _ in range(min(count or self.size, self.size)):
+            driver = self._create()
+            if driver is None:
+                break
+            self._idle.put(driver)
+
+    def _create(self):
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Driver pool is closed")
+            if self._created >= self.size:
+                return None
+            self._created += 1
+        try:
+            with self.tracer.span('driver_start'):
+                driver = self.driver_factory()
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            raise
+        self._pages[id(driver)] = 0
+        return driver
+
+    def acquire(self, timeout=None):
+        """Take an idle driver, starting a new one while below the pool size"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                pass
+            driver = self._create()
+            if driver is not None:
+                return driver
+            # Wait briefly, then retry: a leased driver may be retired instead of returned
+            try:
+                return self._idle.get(timeout=0.5)
+            except queue.Empty:
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise TimeoutError("No browser became available in the driver pool")
+
+    def release(self, driver, broken=False):
+        """Return a driver to the pool, or retire it if it crashed or served max_pages renders"""
+        pages = self._pages.get(id(driver), 0) + 1
+        self._pages[id(driver)] = pages
+        if broken or self._closed or (self.max_pages and pages >= self.max_pages):
+            self._discard(driver)
+        else:
+            self._idle.put(driver)
+
+    def _discard(self, driver):
+        self._pages.pop(id(driver), None)
+        with self._lock:
+            self._created -= 1
+        try:
+            driver.quit()
+        except Exception as e:
+            logger.warning(f"Failed to quit browser: {e}")
+
+    @contextmanager
+    def lease(self, timeout=None):
+        """Lease a driver for one render"""
+        driver = self.acquire(timeout=timeout)
+        try:
+            yield driver
+        except BaseException:
+            self.release(driver, broken=True)
+            raise
+        else:
+            self.release(driver)
+
+    def close(self):
+        """Quit every idle driver; leased drivers are quit when they are released"""
+        self._closed = True
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(driver)
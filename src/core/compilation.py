@@ -0,0 +1,145 @@
+# src/core/compilation.py
+
+import hashlib
+import json
+import os
+import subprocess
+import tempfile
+from config.settings import SEGMENT_CACHE_DIR, SEGMENT_CACHE_MAX_BYTES
+from core.audio_index import probe_audio
+from core.encoder import get_ffmpeg_binary, encode_segment, segment_profile
+from core.frame_cache import FrameCache, hash_file
+from core.log import get_logger
+
+logger = get_logger('compilation')
+
+def segment_cache():
+    """Content-addressed store of encoded segments, shared by every batch"""
+    return FrameCache(cache_dir=SEGMENT_CACHE_DIR, max_bytes=SEGMENT_CACHE_MAX_BYTES, extension='.mp4')
+
+def segment_key(frame_path, audio_hash, profile=None):
+    """Cache key of a segment: the frame's bytes, the audio fingerprint and the encoding parameters"""
+    profile = json.dumps(profile or segment_profile(), sort_keys=True)
+    return hashlib.sha256(f"segment:{profile}:{hash_file(frame_path)}:{audio_hash}".encode()).hexdigest()
+
+def encode_segment_cached(frame_path, audio_path, output_path, audio_hash, cache=None, on_progress=None, duration=None):
+    """Place the segment at output_path from the cache, or encode and cache it; returns 'hit' or 'miss'"""
+    key = segment_key(frame_path, audio_hash) if cache is not None else None
+    if key and cache.get(key, output_path):
+        return 'hit'
+    duration = duration or probe_audio(audio_path).get('duration')
+    encode_segment(frame_path, audio_path, output_path, duration=duration, on_progress=on_progress)
+    if key is None:
+        return None
+    cache.put(key, output_path)
+    return 'miss'
+
+def format_timestamp(seconds):
+    """Chapter timestamp as M:SS, or H:MM:SS from an hour on"""
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes}:{seconds:02d}"
+
+def chapter_title(item):
+    return f"{item['artist']} - {item['song']} ({item['year']})"
+
+def build_chapters(items):
+    """
+    Chapters for segments joined in order.
+    Each item needs 'duration' (of its segment file, which is what the concat demuxer advances by) and the
+    song, artist and year recorded for it.
+    """
+    chapters = []
+    start = 0.0
+    for item in items:
+        end = start + item['duration']
+        chapters.append({'title': chapter_title(item), 'start': round(start, 3), 'end': round(end, 3), 'video': item['path']})
+        start = end
+    return chapters
+
+def escape_ffmetadata(value):
+    """Escape the characters FFMETADATA files treat as special"""
+    for char in ('\\', '=', ';', '#', '\n'):
+        value = value.replace(char, '\\' + char)
+    return value
+
+def write_ffmetadata(chapters, path, title=None):
+    """Write chapters in ffmpeg's metadata format so they are embedded in the joined MP4"""
+    lines = [';FFMETADATA1']
+    if title:
+        lines.append(f"title={escape_ffmetadata(title)}")
+    for chapter in chapters:
+        lines += [
+            '[CHAPTER]',
+            'TIMEBASE=1/1000',
+            f"START={int(round(chapter['start'] * 1000))}",
+            f"END={int(round(chapter['end'] * 1000))}",
+            f"title={escape_ffmetadata(chapter['title'])}",
+        ]
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("\n".join(lines) + "\n")
+
+def write_timestamps(chapters, path):
+    """Plain chapter list ("0:00 Artist - Song (Year)"), e.g. for a video description"""
+    with open(path, 'w', encoding='utf-8') as f:
+        for chapter in chapters:
+            f.write(f"{format_timestamp(chapter['start'])} {chapter['title']}\n")
+
+def concat_segments(segments, output_path, metadata_path=None, temp_dir=None):
+    """Join segments encoded with the same parameters into one MP4 with stream copy (no re-encode)"""
+    handle, list_path = tempfile.mkstemp(suffix='.txt', dir=temp_dir)
+    with os.fdopen(handle, 'w', encoding='utf-8') as f:
+        for segment in segments:
+            escaped = os.path.abspath(segment).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+    command = [get_ffmpeg_binary(), '-hide_banner', '-loglevel', 'error', '-y',
+               '-f', 'concat', '-safe', '0', '-i', list_path]
+    if metadata_path:
+        command += ['-f', 'ffmetadata', '-i', metadata_path, '-map_metadata', '1', '-map_chapters', '1']
+    command += ['-map', '0', '-c', 'copy', '-movflags', '+faststart', output_path]
+    try:
+        process = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    finally:
+        os.remove(list_path)
+    if process.returncode != 0:
+        error = process.stderr.decode('utf-8', errors='replace').strip()
+        raise RuntimeError(f"ffmpeg failed to join segments into {output_path}: {error}")
+    return output_path
+
+def build_compilation(items, output_path, title=None):
+    """
+    Join finished segments into one video with chapters.
+    items are dicts with 'path' (the segment) and the song, artist and year, in playing order. Writes
+    output_path, a .chapters.txt list and a .chapters.json next to it; returns the chapters.
+    """
+    if not items:
+        raise ValueError("No videos to join into a compilation")
+    items = [dict(item) for item in items]
+    for item in items:
+        duration = probe_audio(item['path']).get('duration')
+        if not duration:
+            raise RuntimeError(f"Could not read the duration of segment {item['path']}")
+        item['duration'] = duration
+    chapters = build_chapters(items)
+
+    base, _ = os.path.splitext(output_path)
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    partial_path = f"{base}.partial.mp4"
+    with tempfile.TemporaryDirectory() as temp_dir:
+        metadata_path = os.path.join(temp_dir, 'chapters.ffmeta')
+        write_ffmetadata(chapters, metadata_path, title)
+        try:
+            concat_segments([item['path'] for item in items], partial_path, metadata_path, temp_dir)
+            os.replace(partial_path, output_path)
+        finally:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+
+    write_timestamps(chapters, f"{base}.chapters.txt")
+    with open(f"{base}.chapters.json", 'w', encoding='utf-8') as f:
+        json.dump(chapters, f, ensure_ascii=False, indent=4)
+    logger.info(f"Joined {len(items)} songs into {output_path} ({format_timestamp(chapters[-1]['end'])})")
+    return chapters
@@ -0,0 +1,257 @@
+# src/core/compositor.py
+
+import json
+import os
+from functools import lru_cache
+from PIL import Image, ImageDraw, ImageFilter, ImageFont, ImageOps
+from config.settings import TEMPLATE_DIR, RENDER_BACKENDS
+from core.utils import find_template_asset
+
+# Tried in order when a layout does not name a font, or its font is missing
+FALLBACK_FONTS = {
+    'regular': ['NotoSans-Regular.ttf', 'DejaVuSans.ttf', 'Arial.ttf', 'arial.ttf'],
+    'bold': ['NotoSans-Bold.ttf', 'DejaVuSans-Bold.ttf', 'Arial Bold.ttf', 'arialbd.ttf'],
+}
+
+def layout_path_for(html_template, rendition=None):
+    """
+    Return the declarative layout that sits next to an HTML template (default.html -> default.layout.json),
+    or the one for a rendition (default.9x16.layout.json)
+    """
+    root = os.path.splitext(html_template)[0]
+    return f"{root}.{rendition}.layout.json" if rendition else f"{root}.layout.json"
+
+def resolve_backend(html_template, backend='auto'):
+    """Pick the frame backend for a template: 'pillow', 'browser', or None when there is no template"""
+    if not html_template:
+        return None
+    if backend not in RENDER_BACKENDS:
+        raise ValueError(f"Unknown render backend: {backend}")
+    has_layout = os.path.exists(layout_path_for(html_template))
+    if backend == 'auto':
+        return 'pillow' if has_layout else 'browser'
+    if backend == 'pillow' and not has_layout:
+        raise FileNotFoundError(f"The pillow backend needs a layout file: {layout_path_for(html_template)}")
+    return backend
+
+def load_layout(layout_path):
+    """Load a layout JSON file"""
+    with open(layout_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+@lru_cache(maxsize=64)
+def load_font(name, size, weight='regular', template_dir=TEMPLATE_DIR):
+    """Load a TrueType font by path or file name, falling back to common system fonts"""
+    candidates = []
+    if name:
+        candidates += [os.path.join(template_dir, name), name]
+    candidates += FALLBACK_FONTS.get(weight, FALLBACK_FONTS['regular'])
+    for candidate in candidates:
+        try:
+            return ImageFont.truetype(candidate, size)
+        except OSError:
+            continue
+    return ImageFont.load_default()
+
+def recenter_layout(layout, size):
+    """
+    Move a layout onto a canvas of another size, keeping its content centred like a flexbox page would.
+    Layers that cover the whole canvas are stretched to the new one.
+    """
+    width, height = layout.get('size', (1920, 1080))
+    offset_x = (size[0] - width) // 2
+    offset_y = (size[1] - height) // 2
+    layers = []
+    for layer in layout['layers']:
+        layer = dict(layer)
+        if 'box' in layer:
+            x, y, box_width, box_height = layer['box']
+            if (x, y, box_width, box_height) == (0, 0, width, height):
+                layer['box'] = [0, 0, size[0], size[1]]
+            else:
+                layer['box'] = [x + offset_x, y + offset_y, box_width, box_height]
+        layers.append(layer)
+    return dict(layout, size=list(size), layers=layers)
+
+def scale_layout(layout, factor):
+    """Scale a layout's canvas, boxes, text sizes and effects by factor, e.g. to render a small preview directly"""
+    def scaled(value):
+        return max(1, round(value * factor))
+
+    width, height = layout.get('size', (1920, 1080))
+    layers = []
+    for layer in layout['layers']:
+        layer = dict(layer)
+        if 'box' in layer:
+            layer['box'] = [round(value * factor) for value in layer['box']]
+        if layer['type'] == 'text':
+            size = layer.get('size', 24)
+            layer['min_size'] = scaled(layer.get('min_size', max(8, size // 2)))
+            layer['size'] = scaled(size)
+        if layer['type'] == 'shadow':
+            layer['blur'] = layer.get('blur', 12) * factor
+            layer['offset'] = [round(value * factor) for value in layer.get('offset', (0, 6))]
+        if isinstance(layer.get('radius'), (int, float)):
+            layer['radius'] = round(layer['radius'] * factor)
+        layers.append(layer)
+    return dict(layout, size=[scaled(width), scaled(height)], layers=layers)
+
+def fit_image(image, size, fit='cover', scale=1.0):
+    """Resize an image into a box; 'cover' crops to fill, 'contain' letterboxes, 'stretch' ignores aspect ratio"""
+    width, height = size
+    if fit == 'stretch':
+        return image.resize((width, height), Image.LANCZOS)
+    if fit == 'contain':
+        return ImageOps.contain(image, (width, height), Image.LANCZOS)
+    # Like CSS background-size: cover, optionally zoomed (background-size: 120%)
+    ratio = max(width / image.width, height / image.height) * scale
+    resized = image.resize((max(1, round(image.width * ratio)), max(1, round(image.height * ratio))), Image.LANCZOS)
+    left = (resized.width - width) // 2
+    top = (resized.height - height) // 2
+    return resized.crop((left, top, left + width, top + height))
+
+def rounded_mask(size, radius):
+    """Build an alpha mask with rounded corners; radius 'circle' gives an ellipse"""
+    mask = Image.new('L', size, 0)
+    draw = ImageDraw.Draw(mask)
+    if radius == 'circle':
+        draw.ellipse((0, 0, size[0] - 1, size[1] - 1), fill=255)
+    else:
+        draw.rounded_rectangle((0, 0, size[0] - 1, size[1] - 1), radius=radius, fill=255)
+    return mask
+
+class Compositor:
+    """
+    Renders title cards from a declarative layout with Pillow, without a browser.
+
+    A layout has a canvas "size", a "background_color" and a list of "layers" drawn in order:
+      image  - "source" is "cover" (the song image) or a template asset name; "box" is [x, y, w, h]
+      shadow - a blurred rounded box under the next layer
+      text   - "text" may use {song_name}, {song_artist} and {song_year}; shrinks, then truncates to fit "box"
+    Layers that do not depend on the song are composited once and reused for every render.
+    prepare_image, if given, maps an asset's path to the file actually loaded (e.g. a scaled-down copy).
+    """
+
+    def __init__(self, layout, template_dir=TEMPLATE_DIR, prepare_image=None):
+        self.layout = layout
+        self.template_dir = template_dir
+        self.prepare_image = prepare_image
+        self.size = tuple(layout.get('size', (1920, 1080)))
+        self._assets = {}
+        self._base = None
+        self._base_layers = 0
+
+    @classmethod
+    def from_template(cls, html_template, rendition=None, size=None, fit_within=None, prepare_image=None):
+        """
+        Create a compositor from the layout next to an HTML template.
+        For a rendition, its own layout file is used when there is one; otherwise the main layout is recentred to size.
+        With fit_within (width, height) the layout is scaled down to fit that box, for previews.
+        """
+        template_dir = os.path.dirname(html_template)
+        if rendition and os.path.exists(layout_path_for(html_template, rendition)):
+            layout = load_layout(layout_path_for(html_template, rendition))
+        else:
+            layout = load_layout(layout_path_for(html_template))
+            if size and tuple(size) != tuple(layout.get('size', (1920, 1080))):
+                layout = recenter_layout(layout, size)
+        if fit_within:
+            width, height = layout.get('size', (1920, 1080))
+            factor = min(fit_within[0] / width, fit_within[1] / height)
+            if factor < 1:
+                layout = scale_layout(layout, factor)
+        return cls(layout, template_dir=template_dir, prepare_image=prepare_image)
+
+    def render(self, image_path, song_name, artist_name, year):
+        """Render a title card and return it as an RGB image"""
+        canvas = self.base().copy()
+        context = {'song_name': song_name, 'song_artist': artist_name, 'song_year': year}
+        cover = None
+        for layer in self.layout['layers'][self._base_layers:]:
+            if layer.get('source') == 'cover' and cover is None:
+                cover = Image.open(image_path)
+                cover = ImageOps.exif_transpose(cover).convert('RGB')
+            self.draw_layer(canvas, layer, context, cover)
+        return canvas.convert('RGB')
+
+    def base(self):
+        """Composite the leading layers that are the same for every song"""
+        if self._base is None:
+            self._base = Image.new('RGBA', self.size, self.layout.get('background_color', '#000000'))
+            for layer in self.layout['layers']:
+                if self.is_dynamic(layer):
+                    break
+                self.draw_layer(self._base, layer, {}, None)
+                self._base_layers += 1
+        return self._base
+
+    @staticmethod
+    def is_dynamic(layer):
+        return layer.get('source') == 'cover' or (layer['type'] == 'text' and '{' in layer.get('text', ''))
+
+    def asset(self, name):
+        """Load a template asset once"""
+        if name not in self._assets:
+            path = find_template_asset(name, self.template_dir) or find_template_asset(name)
+            if path is None:
+                raise FileNotFoundError(f"Template asset not found: {name}")
+            if self.prepare_image is not None:
+                path = self.prepare_image(path)
+            self._assets[name] = ImageOps.exif_transpose(Image.open(path)).convert('RGB')
+        return self._assets[name]
+
+    def draw_layer(self, canvas, layer, context, cover):
+        kind = layer['type']
+        if kind == 'image':
+            self.draw_image(canvas, layer, cover)
+        elif kind == 'shadow':
+            self.draw_shadow(canvas, layer)
+        elif kind == 'text':
+            self.draw_text(canvas, layer, context)
+        else:
+            raise ValueError(f"Unknown layout layer type: {kind}")
+
+    def draw_image(self, canvas, layer, cover):
+        x, y, width, height = layer['box']
+        source = cover if layer['source'] == 'cover' else self.asset(layer['source'])
+        tile = fit_image(source, (width, height), layer.get('fit', 'cover'), layer.get('scale', 1.0))
+        radius = layer.get('radius')
+        mask = rounded_mask(tile.size, radius) if radius else None
+        canvas.paste(tile, (x + (width - tile.width) // 2, y + (height - tile.height) // 2), mask)
+
+    def draw_shadow(self, canvas, layer):
+        x, y, width, height = layer['box']
+        blur = layer.get('blur', 12)
+        offset_x, offset_y = layer.get('offset', (0, 6))
+        color = tuple(layer.get('color', (0, 0, 0, 51)))
+        shadow = Image.new('RGBA', canvas.size, (0, 0, 0, 0))
+        ImageDraw.Draw(shadow).rounded_rectangle(
+            (x + offset_x, y + offset_y, x + offset_x + width, y + offset_y + height),
+            radius=layer.get('radius', 0), fill=color
+        )
+        canvas.alpha_composite(shadow.filter(ImageFilter.GaussianBlur(blur)))
+
+    def draw_text(self, canvas, layer, context):
+        x, y, width, height = layer['box']
+        text = layer['text'].format(**context)
+        size = layer.get('size', 24)
+        min_size = layer.get('min_size', max(8, size // 2))
+        weight = layer.get('weight', 'regular')
+        draw = ImageDraw.Draw(canvas)
+
+        font = load_font(layer.get('font'), size, weight, self.template_dir)
+        while draw.textlength(text, font=font) > width and size > min_size:
+            size -= 2
+            font = load_font(layer.get('font'), size, weight, self.template_dir)
+        if draw.textlength(text, font=font) > width:
+            while text and draw.textlength(f"{text}...", font=font) > width:
+                text = text[:-1]
+            text = f"{text.rstrip()}..."
+
+        align = layer.get('align', 'left')
+        text_width = draw.textlength(text, font=font)
+        if align == 'center':
+            x += (width - text_width) / 2
+        elif align == 'right':
+            x += width - text_width
+        draw.text((x, y), text, font=font, fill=layer.get('color', '#000000'))
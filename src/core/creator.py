@@ -0,0 +1,1218 @@
+# src/core/creator.py
+
+import math
+import os
+import random
+import shutil
+import traceback
+import tempfile
+import multiprocessing
+import queue
+import threading
+from multiprocessing import util as multiprocessing_util
+from concurrent.futures import ProcessPoolExecutor, CancelledError, as_completed
+from html import escape as html_escape
+from io import BytesIO
+import time
+from PIL import Image
+from config.settings import NAMES_FILE, TRACKING_DB, DEFAULT_ENCODER, DEFAULT_WORKERS, DEFAULT_RENDER_BACKEND, FRAME_CACHE_ENABLED, INGEST_ENABLED, INGEST_MAX_SIZE, INGEST_MEMORY_BUDGET, TRACE_ENABLED, METADATA_SEED, METADATA_UNIQUE_ARTISTS, DEFAULT_OVERLAYS, OVERLAY_AUDIO_RATE, BROWSER_TILE_FRAMES, BROWSER_TILE_START_SIZE, ASSET_SERVER_PAGES, QUEUE_LEASE_SECONDS, PIPELINE_RENDER_THREADS, PIPELINE_ENCODE_THREADS, PIPELINE_QUEUE_SIZE
+from core.compositor import Compositor, resolve_backend, layout_path_for, fit_image
+from core.frame_cache import FrameCache, frame_key, template_fingerprint
+from core.browser import DriverPool, start_chrome_driver, wait_until_ready, fit_window_to_page, wait_until_tiles_ready, layout_tiles
+from core.encoder import encode_video, encode_renditions, resolve_renditions
+from core.ingest import ImageIngest
+from core.assets import AssetServer
+from core.compilation import build_compilation, encode_segment_cached, segment_cache
+from core.job_queue import JobQueue, node_name, remove_stale_partials, work_queue
+from core.pipeline import Pipeline, PipelineCancelled, Stage
+from core.planner import Calibration, calibrate, calibration_key, estimate_batch
+from core.metadata import MetadataGenerator
+from core.tracking_store import TrackingStore
+from core.audio_index import AudioIndex, probe_audio
+from core.manifest import BatchManifest, fingerprint_file, is_complete_mp4, PENDING, RENDERED, ENCODED, FAILED
+from core.utils import load_names, sanitize_filename, parse_filename, find_template_asset, TEMPLATE_ASSETS
+from core.log import get_logger, configure_logging, current_level
+from core.trace import Tracer, TRACE_NAME, load_trace, summarize, format_table
+from core.progress import ProgressTracker, throttle
+
+logger = get_logger('creator')
+
+def output_path(output_folder, song_name, artist_name, year, rendition=None):
+    """Where a song's video (or one rendition of it) is written"""
+    output_video_name = f"{sanitize_filename(artist_name)}_{sanitize_filename(song_name)}_{year}"
+    if rendition:
+        output_video_name += f"_{rendition['name']}"
+    return os.path.join(output_folder, f"{output_video_name}.mp4")
+
+def save_frame(image, path, **options):
+    """
+    Save a frame as PNG through a temp file renamed over path. A frame placed by a frame cache hit is a hard
+    link to the cache entry, so saving onto it in place would overwrite the entry of another key.
+    """
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        image.save(temp_path, format='PNG', **options)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def resolve_workers(workers):
+    """Turn a requested worker count into a usable one (0 or None means one per CPU core)"""
+    if not workers:
+        return os.cpu_count() or 1
+    return max(1, int(workers))
+
+class VideoRenderer:
+    """
+    Renders the frame for and encodes a single video at a time.
+    Every worker process owns one renderer, so each has its own browser, temp dir and encoder.
+    With renditions (e.g. ['16x9', '9x16', '1x1']) each song gets one frame per rendition and all of its
+    videos are encoded in a single ffmpeg pass that shares the audio stream.
+    With overlays (e.g. ['progress', 'waveform']) they are animated over the static frame while it is encoded.
+    """
+
+    def __init__(self, html_template, output_folder, screenshots_dir, encoder=DEFAULT_ENCODER, driver_factory=start_chrome_driver, backend=DEFAULT_RENDER_BACKEND, frame_cache=FRAME_CACHE_ENABLED, prescale=INGEST_ENABLED, memory_budget=INGEST_MEMORY_BUDGET, trace_path=None, trace_fields=None, renditions=None, tile_frames=BROWSER_TILE_FRAMES, compilation=False, browsers=1, overlays=None):
+        self.html_template = html_template
+        self.output_folder = output_folder
+        self.screenshots_dir = screenshots_dir
+        self.encoder = encoder
+        self.renditions = resolve_renditions(renditions)
+        self.overlays = []
+        if overlays:
+            # Overlays are drawn with NumPy, which batches without them never load
+            from core.overlays import resolve_overlays
+            self.overlays = resolve_overlays(overlays)
+        # In compilation mode every video is a fixed-format segment, reused from the segment cache when possible
+        self.compilation = compilation
+        self.segment_cache = segment_cache() if compilation else None
+        self.tracer = Tracer(trace_path, **(trace_fields or {}))
+        self.backend = resolve_backend(html_template, backend)
+        self.template = None
+        self.template_variables = set()
+        self.compositor = None
+        self.rendition_compositors = {}
+        if self.backend == 'pillow':
+            self.compositor = Compositor.from_template(html_template)
+        elif self.backend == 'browser':
+            self.load_template()
+        # Every browser may have a page of each rendition waiting to load
+        self.asset_server = AssetServer(max_pages=max(ASSET_SERVER_PAGES, max(1, browsers) * max(1, len(self.renditions))))
+        # Browser frames rendered ahead by prerender(), waiting for create_video to pick them up
+        self.tile_frames = max(1, tile_frames or 1)
+        self.prerendered = {}
+        # Covers are prescaled once for every rendition (here and in prerender), so the bound must hold the
+        # largest side of any of them: a square cover cut down to 1080 would be upscaled again for 9x16
+        ingest_size = INGEST_MAX_SIZE
+        if self.renditions:
+            side = max(max(rendition['size']) for rendition in self.renditions)
+            ingest_size = (max(side, INGEST_MAX_SIZE[0]), max(side, INGEST_MAX_SIZE[1]))
+        self.ingest = ImageIngest(max_size=ingest_size, memory_budget=memory_budget) if prescale else None
+        self.frame_cache = None
+        self.fingerprint = None
+        if frame_cache and self.backend:
+            self.frame_cache = FrameCache()
+            if self.backend == 'pillow':
+                layouts = [layout_path_for(html_template)] + [
+                    layout_path_for(html_template, r['name']) for r in self.renditions
+                    if os.path.exists(layout_path_for(html_template, r['name']))
+                ]
+                self.fingerprint = template_fingerprint(html_template, self.backend, layouts, os.path.dirname(html_template))
+            else:
+                self.fingerprint = template_fingerprint(html_template, self.backend)
+        # Browsers start on the first templated render and stay warm between renders
+        self.driver_pool = DriverPool(size=browsers, driver_factory=driver_factory, tracer=self.tracer)
+        self.temp_dir = tempfile.mkdtemp()
+
+    def close(self):
+        """Quit the browser and remove the temp dir"""
+        self.driver_pool.close()
+        self.asset_server.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def load_template(self):
+        """Parse the HTML template for the browser backend (again after it was edited, for previews)"""
+        from jinja2 import Environment, Template, meta
+        with open(self.html_template, 'r') as file:
+            source = file.read()
+        self.template = Template(source)
+        # Templates that still inline base64 images get them from the asset cache instead of disk
+        self.template_variables = meta.find_undeclared_variables(Environment().parse(source))
+
+    def render(self, job, on_frame=None, on_progress=None):
+        """Render one planned job and return a dict with the output path and frame cache status"""
+        with self.tracer.context(video=os.path.basename(job['audio'])), self.tracer.span('video'):
+            return self.create_video(job['image'], job['audio'], job['song'], job['artist'], job['year'], on_frame=on_frame, on_progress=on_progress,
+                                     audio_hash=job.get('audio_hash'), duration=job.get('duration'))
+
+    def render_frames(self, job):
+        """First half of render(): the job's frames, ready for encode()"""
+        with self.tracer.context(video=os.path.basename(job['audio'])):
+            return self.create_frames(job['image'], job['song'], job['artist'], job['year'])
+
+    def encode(self, job, frames, on_progress=None):
+        """Second half of render(): encode frames from render_frames() into the job's videos"""
+        with self.tracer.context(video=os.path.basename(job['audio'])):
+            return self.encode_frames(frames, job['audio'], job['song'], job['artist'], job['year'], on_progress=on_progress,
+                                      audio_hash=job.get('audio_hash'), duration=job.get('duration'))
+
+    def create_video(self, image_path, audio_path, song_name, artist_name, year, on_frame=None, on_progress=None, audio_hash=None, duration=None):
+        """Create a video from the given image and audio"""
+        frames = self.create_frames(image_path, song_name, artist_name, year)
+        if on_frame is not None:
+            on_frame(frames['frames'][0])
+        return self.encode_frames(frames, audio_path, song_name, artist_name, year, on_progress=on_progress, audio_hash=audio_hash, duration=duration)
+
+    def create_frames(self, image_path, song_name, artist_name, year):
+        """Render (or fetch from the frame cache) one frame per rendition; returns the frames and the cache status"""
+        started = time.perf_counter()
+        logger.debug(f"Image path: {image_path}")
+        if not os.path.exists(image_path):
+            raise FileNotFoundError(f"Image file not found: {image_path}")
+
+        # Work from a copy scaled to the output size instead of the full-resolution original
+        if self.ingest is not None:
+            with self.tracer.span('ingest'):
+                image_path = self.ingest.prepare(image_path)
+
+        # One frame per rendition, or the single frame of a plain output
+        renditions = self.renditions or [None]
+        frames = []
+        cache_statuses = []
+        for rendition in renditions:
+            cache_status = None
+            if self.backend:
+                screenshot_path, cache_status = self.cached_frame(image_path, song_name, artist_name, year, rendition)
+            elif rendition:
+                screenshot_path = self.fit_frame(image_path, song_name, artist_name, year, rendition)
+            else:
+                screenshot_path = image_path
+            logger.debug(f"Screenshot path: {screenshot_path}")
+            frames.append(screenshot_path)
+            cache_statuses.append(cache_status)
+        if None in cache_statuses:
+            cache_status = None
+        else:
+            cache_status = 'hit' if all(status == 'hit' for status in cache_statuses) else 'miss'
+        return {'frames': frames, 'frame_cache': cache_status, 'seconds': time.perf_counter() - started}
+
+    def encode_frames(self, frames, audio_path, song_name, artist_name, year, on_progress=None, audio_hash=None, duration=None):
+        """Encode the frames from create_frames() with the audio; returns the output paths and cache statuses"""
+        cache_status = frames['frame_cache']
+        frame_seconds = frames.get('seconds')
+        frames = frames['frames']
+        renditions = self.renditions or [None]
+        output_paths = [self.output_path(song_name, artist_name, year, rendition) for rendition in renditions]
+
+        # Encode under temporary names so an interrupted encode never looks like a finished video; the names
+        # are per process, so two nodes that both end up rendering a queued job never write the same file
+        partial_paths = [f"{base}.partial-{node_name()}{ext}" for base, ext in map(os.path.splitext, output_paths)]
+        segment_status = None
+        started = time.perf_counter()
+        try:
+            encoder = 'segment' if self.compilation else 'overlay' if self.overlays else self.encoder
+            with self.tracer.span('encode', encoder=encoder, outputs=len(output_paths)):
+                if self.compilation:
+                    segment_status = encode_segment_cached(frames[0], audio_path, partial_paths[0], audio_hash or fingerprint_file(audio_path),
+                                                           cache=self.segment_cache, on_progress=on_progress, duration=duration)
+                elif self.overlays:
+                    from core.overlays import decode_audio, encode_overlay_video
+
+                    # Every rendition animates its own frame; the audio is decoded for the overlays once
+                    samples = decode_audio(audio_path)
+                    song_seconds = len(samples) / OVERLAY_AUDIO_RATE
+                    for index, (frame, partial, rendition) in enumerate(zip(frames, partial_paths, renditions)):
+                        # Each encode reports 0 to the song's length; scale them into consecutive shares of it
+                        # so the item's progress only moves forward across renditions
+                        report = None
+                        if on_progress:
+                            report = lambda seconds, index=index: on_progress((index * song_seconds + seconds) / len(renditions))
+                        encode_overlay_video(frame, audio_path, partial, self.overlays, samples=samples,
+                                             video_bitrate=rendition['video_bitrate'] if rendition else None, on_progress=report)
+                elif not self.renditions:
+                    encode_video(frames[0], audio_path, partial_paths[0], encoder=self.encoder, tracer=self.tracer, on_progress=on_progress)
+                elif self.encoder == 'still':
+                    outputs = [(frame, partial, rendition['video_bitrate']) for frame, partial, rendition in zip(frames, partial_paths, renditions)]
+                    encode_renditions(outputs, audio_path, on_progress=on_progress, temp_dir=self.temp_dir)
+                else:
+                    # moviepy has no multi-output mode, so each rendition is its own encode
+                    for frame, partial in zip(frames, partial_paths):
+                        encode_video(frame, audio_path, partial, encoder=self.encoder, tracer=self.tracer, on_progress=on_progress)
+            for partial_path, output_path in zip(partial_paths, output_paths):
+                os.replace(partial_path, output_path)
+        finally:
+            for partial_path in partial_paths:
+                if os.path.exists(partial_path):
+                    os.remove(partial_path)
+
+        return {'output': output_paths[0], 'outputs': output_paths, 'frame': frames[0], 'frames': frames, 'frame_cache': cache_status, 'segment_cache': segment_status,
+                'frame_seconds': round(frame_seconds, 3) if frame_seconds is not None else None, 'encode_seconds': round(time.perf_counter() - started, 3)}
+
+    def output_path(self, song_name, artist_name, year, rendition=None):
+        return output_path(self.output_folder, song_name, artist_name, year, rendition)
+
+    def cached_frame(self, image_path, song_name, artist_name, year, rendition=None):
+        """Return (frame path, 'hit'/'miss'/None), rendering only when the frame cache has no match"""
+        if self.frame_cache is None:
+            return self.render_template_frame(image_path, song_name, artist_name, year, rendition), None
+        key = self.frame_key(image_path, song_name, artist_name, year, rendition)
+        screenshot_path = self.screenshot_path(song_name, artist_name, year, rendition)
+        if self.frame_cache.get(key, screenshot_path):
+            return screenshot_path, 'hit'
+        screenshot_path = self.render_template_frame(image_path, song_name, artist_name, year, rendition)
+        self.frame_cache.put(key, screenshot_path)
+        return screenshot_path, 'miss'
+
+    def frame_key(self, image_path, song_name, artist_name, year, rendition=None):
+        fingerprint = self.fingerprint
+        if rendition:
+            fingerprint = f"{fingerprint}:{rendition['name']}:{rendition['size'][0]}x{rendition['size'][1]}"
+        return frame_key(fingerprint, image_path, song_name, artist_name, year)
+
+    def render_template_frame(self, image_path, song_name, artist_name, year, rendition=None):
+        if self.compositor is not None:
+            return self.compose_frame(image_path, song_name, artist_name, year, rendition)
+        prerendered = self.prerendered.pop((image_path, song_name, artist_name, year, rendition['name'] if rendition else None), None)
+        if prerendered and os.path.exists(prerendered):
+            return prerendered
+        return self.render_frame(image_path, song_name, artist_name, year, rendition=rendition)
+
+    def screenshot_path(self, song_name, artist_name, year, rendition=None):
+        suffix = f"_{rendition['name']}" if rendition else ""
+        return os.path.join(self.screenshots_dir, f"{song_name}_{artist_name}_{year}{suffix}.png")
+
+    @staticmethod
+    def conform_frame(image, rendition):
+        """Crop and scale a frame to the rendition's exact size when the template did not produce it"""
+        if rendition and image.size != tuple(rendition['size']):
+            return fit_image(image.convert('RGB'), tuple(rendition['size']))
+        return image
+
+    def fit_frame(self, image_path, song_name, artist_name, year, rendition):
+        """Without a template, a rendition's frame is the image itself cropped to fill its size"""
+        screenshot_path = self.screenshot_path(song_name, artist_name, year, rendition)
+        with self.tracer.span('png_save'):
+            with Image.open(image_path) as image:
+                save_frame(self.conform_frame(image, rendition), screenshot_path, compress_level=1)
+        return screenshot_path
+
+    def rendition_compositor(self, rendition):
+        if rendition is None:
+            return self.compositor
+        if rendition['name'] not in self.rendition_compositors:
+            self.rendition_compositors[rendition['name']] = Compositor.from_template(self.html_template, rendition['name'], rendition['size'])
+        return self.rendition_compositors[rendition['name']]
+
+    def compose_frame(self, image_path, song_name, artist_name, year, rendition=None):
+        """Render the template's layout with Pillow, no browser involved"""
+        with self.tracer.span('template_render', backend='pillow'):
+            image = self.conform_frame(self.rendition_compositor(rendition).render(image_path, song_name, artist_name, year), rendition)
+        screenshot_path = self.screenshot_path(song_name, artist_name, year, rendition)
+        with self.tracer.span('png_save'):
+            save_frame(image, screenshot_path, compress_level=1)
+        return screenshot_path
+
+    def render_frame(self, image_path, song_name, artist_name, year, attempts=2, rendition=None):
+        """Screenshot the template on a leased browser, retrying once on a fresh browser if it crashes"""
+        for attempt in range(1, attempts + 1):
+            try:
+                with self.driver_pool.lease() as driver:
+                    return self.create_screenshot(driver, self.template, image_path, song_name, artist_name, year, rendition)
+            except Exception as e:
+                if attempt == attempts:
+                    raise
+                logger.warning(f"Render failed on attempt {attempt}, retrying with a new browser: {e}")
+
+    def create_screenshot(self, driver, template, image_path, song_name, artist_name, year, rendition=None):
+        """
+        Create a screenshot using the HTML template.
+        For a rendition the window starts at its size and the template gets frame_width/frame_height to lay out for it.
+        """
+        with self.tracer.span('template_render', backend='browser'):
+            page_url = self.asset_server.page_url(self.render_page(template, image_path, song_name, artist_name, year, rendition))
+
+        try:
+            with self.tracer.span('page_load'):
+                if rendition:
+                    driver.set_window_size(*rendition['size'])
+
+                driver.get(page_url)
+
+                # Wait for the page, its images and fonts to finish loading
+                wait_until_ready(driver)
+
+                # Size the window to the full page content
+                fit_window_to_page(driver)
+
+            with self.tracer.span('screenshot'):
+                # Take the screenshot
+                screenshot = driver.get_screenshot_as_png()
+                image = self.conform_frame(Image.open(BytesIO(screenshot)), rendition)
+        finally:
+            self.asset_server.unpublish(page_url)
+
+        # Save the screenshot
+        screenshot_path = self.screenshot_path(song_name, artist_name, year, rendition)
+        logger.debug(f"Saving screenshot to: {screenshot_path}")
+        with self.tracer.span('png_save'):
+            save_frame(image, screenshot_path)
+
+        return screenshot_path
+
+    def render_page(self, template, image_path, song_name, artist_name, year, rendition=None):
+        """Fill the HTML template for one frame"""
+        frame_variables = {}
+        if rendition:
+            frame_variables = {'frame_width': rendition['size'][0], 'frame_height': rendition['size'][1]}
+
+        # Images are passed by URL (<name>_url, image_url); the browser keeps the template assets cached
+        # between renders. The base64 variables are only filled for templates that use them.
+        server = self.asset_server
+        image_data = {}
+        for img_name in TEMPLATE_ASSETS:
+            img_path = find_template_asset(img_name)
+            image_data[f"{img_name}_url"] = server.file_url(img_path) if img_path else ''
+            inline = img_path and img_name in self.template_variables
+            image_data[img_name] = server.store.base64(img_path) if inline else ''
+        image_data['image_url'] = server.file_url(image_path)
+        if 'image_base64' in self.template_variables:
+            image_data['image_base64'] = server.store.base64(image_path)
+
+        return template.render(
+            song_name=song_name,
+            song_artist=artist_name,
+            song_year=year,
+            **image_data,
+            **frame_variables
+        )
+
+    def prerender(self, jobs):
+        """
+        Render the browser frames of several jobs ahead of create_video, tile_frames of them per page load.
+        Frames already in the frame cache are skipped. If a tiled page fails, its frames are left to be
+        rendered one at a time. Returns the number of frames rendered.
+        """
+        if self.backend != 'browser' or self.tile_frames < 2:
+            return 0
+        pending = {}
+        for job in jobs:
+            if not os.path.exists(job['image']):
+                continue
+            image_path = job['image']
+            if self.ingest is not None:
+                with self.tracer.span('ingest'):
+                    image_path = self.ingest.prepare(image_path)
+            for rendition in self.renditions or [None]:
+                item = (image_path, job['song'], job['artist'], job['year'], rendition)
+                if self.frame_cache is not None and os.path.exists(self.frame_cache.path_for(self.frame_key(*item))):
+                    continue
+                # Tiles of one page share a rendition, so they share a frame size
+                pending.setdefault(rendition['name'] if rendition else None, []).append(item)
+
+        rendered = 0
+        for items in pending.values():
+            for start in range(0, len(items), self.tile_frames):
+                tile = items[start:start + self.tile_frames]
+                if len(tile) == 1:
+                    continue
+                try:
+                    with self.driver_pool.lease() as driver:
+                        paths = self.create_tiled_screenshots(driver, self.template, tile)
+                except Exception as e:
+                    logger.warning(f"Tiled render of {len(tile)} frames failed, rendering them one at a time: {e}")
+                    continue
+                for (image_path, song_name, artist_name, year, rendition), path in zip(tile, paths):
+                    self.prerendered[(image_path, song_name, artist_name, year, rendition['name'] if rendition else None)] = path
+                rendered += len(tile)
+        return rendered
+
+    def create_tiled_screenshots(self, driver, template, items):
+        """
+        Screenshot several frames with one page load: each frame's page goes in its own iframe (so template
+        styles cannot collide), the iframes are laid out in a grid and one screenshot is cut into per-frame PNGs.
+        items are (image_path, song_name, artist_name, year, rendition) tuples sharing one rendition.
+        """
+        rendition = items[0][4]
+        columns = math.ceil(math.sqrt(len(items)))
+        # Tiles start at the size a single render's window would, then grow to their pages' size
+        width, height = rendition['size'] if rendition else BROWSER_TILE_START_SIZE
+        with self.tracer.span('template_render', backend='browser', tiles=len(items)):
+            tiles = []
+            for image_path, song_name, artist_name, year, _ in items:
+                html_content = self.render_page(template, image_path, song_name, artist_name, year, rendition)
+                tiles.append(
+                    f'<iframe class="autovid-tile" scrolling="no" srcdoc="{html_escape(html_content, quote=True)}" '
+                    f'style="position: absolute; left: 0; top: 0; border: 0; width: {width}px; height: {height}px"></iframe>'
+                )
+            page_url = self.asset_server.page_url(
+                '<!DOCTYPE html><html><head><meta charset="UTF-8" /></head>'
+                f'<body style="margin: 0; overflow: hidden; position: relative">{"".join(tiles)}</body></html>'
+            )
+
+        try:
+            with self.tracer.span('page_load', tiles=len(items)):
+                driver.get(page_url)
+                wait_until_tiles_ready(driver)
+                rects, _ = layout_tiles(driver, columns)
+                page_width, _ = fit_window_to_page(driver)
+
+            with self.tracer.span('screenshot', tiles=len(items)):
+                screenshot = Image.open(BytesIO(driver.get_screenshot_as_png()))
+                screenshot.load()
+        finally:
+            self.asset_server.unpublish(page_url)
+        # Rectangles are in CSS pixels; the screenshot is in device pixels
+        scale = screenshot.size[0] / page_width if page_width else 1
+
+        paths = []
+        with self.tracer.span('png_save', tiles=len(items)):
+            for (_, song_name, artist_name, year, _), (left, top, tile_width, tile_height) in zip(items, rects):
+                box = [round(value * scale) for value in (left, top, left + tile_width, top + tile_height)]
+                image = self.conform_frame(screenshot.crop(box), rendition)
+                screenshot_path = self.screenshot_path(song_name, artist_name, year, rendition)
+                logger.debug(f"Saving screenshot to: {screenshot_path}")
+                save_frame(image, screenshot_path)
+                paths.append(screenshot_path)
+        return paths
+
+
+# Renderer owned by the current pool worker process, the queue its encode progress goes back on and the
+# event that stops its encodes when the batch is cancelled
+_worker_renderer = None
+_progress_queue = None
+_cancel_event = None
+
+def _init_worker(renderer_options, log_level=None, progress_queue=None, cancel_event=None):
+    """Pool initializer: give this worker process its own renderer"""
+    global _worker_renderer, _progress_queue, _cancel_event
+    _progress_queue = progress_queue
+    _cancel_event = cancel_event
+    if log_level:
+        configure_logging(log_level)
+    _worker_renderer = VideoRenderer(**renderer_options)
+    # Pool workers leave through multiprocessing's exit hooks, not atexit
+    multiprocessing_util.Finalize(None, _worker_renderer.close, exitpriority=10)
+
+def _render_job(job):
+    """Pool task: render one job with this worker's renderer"""
+    if _progress_queue is None:
+        return _worker_renderer.render(job)
+    _progress_queue.put(('start', job['audio'], 0.0))
+    # Throttled here as well, so a fast encoder does not flood the queue between processes
+    report = throttle(lambda seconds: _progress_queue.put(('progress', job['audio'], seconds)))
+
+    def on_progress(seconds):
+        if _cancel_event is not None and _cancel_event.is_set():
+            raise PipelineCancelled(f"Stopped while encoding {os.path.basename(job['audio'])}")
+        report(seconds)
+    return _worker_renderer.render(job, on_progress=on_progress)
+
+def _render_jobs(jobs):
+    """Pool task: render a chunk of jobs, their browser frames tiled onto shared page loads"""
+    _worker_renderer.prerender(jobs)
+    outcomes = []
+    for job in jobs:
+        try:
+            outcomes.append((_render_job(job), None))
+        except Exception as e:
+            outcomes.append((None, e))
+    return outcomes
+
+def queue_renderer(job_queue, driver_factory=start_chrome_driver):
+    """Build a VideoRenderer with the options a job queue was submitted with"""
+    options = job_queue.options()
+    renderer_options = dict(options['renderer'], driver_factory=driver_factory)
+    if options.get('trace'):
+        # One trace file per node, since appends from several machines to one shared file can interleave
+        renderer_options['trace_path'] = job_queue.path('traces', f"{job_queue.node}.jsonl")
+        renderer_options['trace_fields'] = {'node': job_queue.node}
+    return VideoRenderer(**renderer_options)
+
+def _run_queue_node(folder, driver_factory, lease_seconds, log_level=None, progress_callback=None):
+    """Work on the queue as one node until it is drained"""
+    if log_level:
+        configure_logging(log_level)
+    job_queue = JobQueue(folder, lease_seconds=lease_seconds)
+    return work_queue(job_queue, lambda: queue_renderer(job_queue, driver_factory), progress_callback=progress_callback)
+
+def run_queue_workers(folder, nodes=1, driver_factory=start_chrome_driver, lease_seconds=QUEUE_LEASE_SECONDS, progress_callback=None):
+    """
+    Work on a shared job queue until every job is finished; returns the number of videos rendered here.
+    With nodes > 1 each worker process is a node of its own, with its own leases, so one machine can stand in
+    for several. progress_callback must be picklable then (e.g. print).
+    """
+    if nodes <= 1:
+        return _run_queue_node(folder, driver_factory, lease_seconds, progress_callback=progress_callback)
+    context = multiprocessing.get_context()
+    with ProcessPoolExecutor(max_workers=nodes, mp_context=context) as pool:
+        futures = [pool.submit(_run_queue_node, folder, driver_factory, lease_seconds, current_level(), progress_callback) for _ in range(nodes)]
+        return sum(future.result() for future in futures)
+
+class VideoCreator:
+    """
+    Batch engine that turns folders of images and audio into videos.
+    Has no GUI dependency so it can be driven from the Qt thread or the CLI.
+    """
+
+    def __init__(self, image_folder, audio_folder, html_template, single_image=None, single_audio=None, custom_artist=None, custom_year=None, output_folder=None, progress_callback=None, encoder=DEFAULT_ENCODER, workers=DEFAULT_WORKERS, backend=DEFAULT_RENDER_BACKEND, frame_cache=FRAME_CACHE_ENABLED, prescale=INGEST_ENABLED, memory_budget=INGEST_MEMORY_BUDGET, resume=False, audio_files=None, driver_factory=start_chrome_driver, tracking_db=TRACKING_DB, trace=TRACE_ENABLED, trace_path=None, progress_event_callback=None, renditions=None, seed=METADATA_SEED, unique_artists=METADATA_UNIQUE_ARTISTS, tile_frames=BROWSER_TILE_FRAMES, compilation=None, render_threads=PIPELINE_RENDER_THREADS, encode_threads=PIPELINE_ENCODE_THREADS, pipeline_depth=PIPELINE_QUEUE_SIZE, overlays=DEFAULT_OVERLAYS):
+        self.image_folder = os.path.abspath(image_folder)
+        self.audio_folder = os.path.abspath(audio_folder)
+        self.html_template = html_template
+        self.single_image = single_image
+        self.single_audio = single_audio
+        self.custom_artist = custom_artist
+        self.custom_year = custom_year
+        self.output_folder = output_folder or os.path.join(os.path.dirname(os.path.dirname(__file__)), 'output')
+        self.progress_callback = progress_callback
+        self.progress_event_callback = progress_event_callback
+        self.progress = None
+        self.encoder = encoder
+        self.renditions = list(renditions) if renditions else None
+        self.overlays = list(overlays or [])
+        self.tile_frames = max(1, tile_frames or 1)
+        # Path of the joined mix to build after the batch, or None for separate videos only
+        self.compilation = compilation
+        self.compilation_path = None
+        self.chapters = []
+        self.workers = resolve_workers(workers)
+        # With one worker process, frames render on render_threads while up to pipeline_depth wait for encode_threads
+        self.render_threads = max(1, render_threads or 1)
+        self.encode_threads = max(1, encode_threads or 1)
+        self.pipeline_depth = max(1, pipeline_depth or 1)
+        # Set by cancel(); once set, no further songs are started
+        self.cancel_event = threading.Event()
+        self._cancel_hooks = []
+        self.backend = backend
+        self.frame_cache = frame_cache
+        self.prescale = prescale
+        self.memory_budget = memory_budget
+        self.resume = resume
+        self.audio_files = audio_files
+        self.driver_factory = driver_factory
+        self.tracking_db = tracking_db
+        self.seed = seed
+        self.unique_artists = unique_artists
+        self.random = random.Random(seed)
+        self.metadata = None
+        self.manifest = None
+        self.screenshots_dir = os.path.join(self.output_folder, 'screenshots')
+        self.trace_path = (trace_path or os.path.join(self.output_folder, TRACE_NAME)) if trace else None
+        self.tracer = Tracer()
+        self.batch_id = None
+        self.trace_summary = []
+        self.results = []
+        self.failures = []
+        self.skipped = []
+        self.cancelled = []
+        self.started_at = None
+        self.finished_at = None
+
+    def report_progress(self, message):
+        """Forward a progress message to the registered callback, if any"""
+        if self.progress_callback:
+            self.progress_callback(message)
+
+    def report_event(self, event):
+        """Forward a structured progress event (see core.progress) to the registered callback, if any"""
+        if self.progress_event_callback:
+            self.progress_event_callback(event)
+
+    def cancel(self):
+        """
+        Stop the batch from another thread: no new songs are started and running encodes are stopped.
+        Stopped songs keep their manifest state, so --resume picks them up again.
+        """
+        if self.cancel_event.is_set():
+            return
+        self.cancel_event.set()
+        self.report_progress("Stopping...")
+        for hook in list(self._cancel_hooks):
+            hook()
+
+    def run(self):
+        """Process the whole batch and return a (success, message) tuple"""
+        self.started_at = time.time()
+        self.results = []
+        self.failures = []
+        self.skipped = []
+        self.cancelled = []
+        self.trace_summary = []
+        # Each run starts from the seed and rebuilds the used-metadata index from the tracking store
+        self.random = random.Random(self.seed)
+        self.metadata = None
+        # Tags this run's spans, since the trace file is appended to by every batch in the folder
+        self.batch_id = f"{int(self.started_at)}-{os.getpid()}"
+        self.tracer = Tracer(self.trace_path, batch=self.batch_id)
+        try:
+            return self._run()
+        except Exception as e:
+            error_message = f"Error creating video: {str(e)}\n{traceback.format_exc()}"
+            logger.error(error_message)
+            return False, error_message
+        finally:
+            self.finished_at = time.time()
+            self.report_trace()
+            self.update_calibration()
+
+    def _run(self):
+        if self.compilation and self.renditions:
+            return False, "A compilation is built from one video per song and cannot be combined with renditions."
+
+        # Load names
+        first_names, last_names = load_names(NAMES_FILE)
+
+        image_files, audio_files = self.list_inputs()
+        if not image_files or not audio_files:
+            return False, "No image or audio files found."
+        audio_info = self.probe_audio(audio_files)
+
+        # Create output and screenshots directories
+        os.makedirs(self.output_folder, exist_ok=True)
+        os.makedirs(self.screenshots_dir, exist_ok=True)
+
+        # The manifest records every item's state so an interrupted batch can be resumed
+        self.manifest = BatchManifest.load(self.output_folder) if self.resume else BatchManifest(self.output_folder)
+
+        tracking = TrackingStore(self.tracking_db)
+        try:
+            # Metadata and images are picked up front so workers only render and encode
+            jobs = self.plan_jobs(audio_files, image_files, first_names, last_names, tracking, audio_info)
+            jobs = self.skip_finished(jobs)
+            for job in jobs:
+                self.manifest.update(job, PENDING, save=False)
+            self.manifest.save()
+
+            self.progress = ProgressTracker(jobs, self.report_event)
+            if self.workers > 1 and len(jobs) > 1:
+                self.run_pool(jobs, tracking)
+            elif jobs:
+                self.run_pipeline(jobs, tracking)
+            self.progress.close()
+        finally:
+            tracking.close()
+
+        total = len(jobs) + len(self.skipped)
+        if self.cancel_event.is_set():
+            return False, (f"Stopped: created {len(self.results) + len(self.skipped)} of {total} videos in: {self.output_folder}"
+                           f" ({len(self.cancelled)} not started or interrupted, {len(self.failures)} failed; resume to finish)")
+        compiled = ""
+        if self.compilation and (self.results or self.skipped):
+            compiled = f"\nCompilation: {self.build_compilation(audio_files)}"
+        if not self.failures:
+            if self.skipped:
+                return True, f"Videos created successfully in: {self.output_folder} ({len(self.skipped)} of {total} already done){compiled}"
+            return True, f"Videos created successfully in: {self.output_folder}{compiled}"
+        failed = "\n".join(f"{os.path.basename(f['audio'])}: {f['error']}" for f in self.failures)
+        message = f"Created {len(self.results) + len(self.skipped)} of {total} videos in: {self.output_folder}{compiled}\nFailed:\n{failed}"
+        return bool(self.results or self.skipped), message
+
+    def calibration_key(self):
+        renditions = [rendition['name'] for rendition in resolve_renditions(self.renditions)]
+        profile = 'segment' if self.compilation else f"overlay:{','.join(self.overlays)}" if self.overlays else None
+        return calibration_key(self.encoder, resolve_backend(self.html_template, self.backend), renditions, profile)
+
+    def plan(self, calibrate_missing=True, recalibrate=False):
+        """
+        Dry run: resolve metadata, output names, collisions and time and disk estimates for the batch without
+        rendering or encoding it. Nothing is written to the output folder, the manifest or the tracking store.
+        Estimates need a calibration for the batch's settings; when there is none (or recalibrate is set) a
+        short sample of the batch's own inputs is encoded first. Returns a report for core.planner.format_plan.
+        """
+        self.random = random.Random(self.seed)
+        self.metadata = None
+        first_names, last_names = load_names(NAMES_FILE)
+        image_files, audio_files = self.list_inputs()
+        if not image_files or not audio_files:
+            raise ValueError("No image or audio files found.")
+        audio_info = self.probe_audio(audio_files)
+        self.manifest = BatchManifest.load(self.output_folder) if self.resume else BatchManifest(self.output_folder)
+        tracking = TrackingStore(self.tracking_db)
+        try:
+            jobs = self.plan_jobs(audio_files, image_files, first_names, last_names, tracking, audio_info)
+        finally:
+            tracking.close()
+
+        renditions = resolve_renditions(self.renditions) or [None]
+        items = []
+        for job in jobs:
+            done = self.resume and self.manifest.is_done(job)
+            outputs = [output_path(self.output_folder, job['song'], job['artist'], job['year'], rendition) for rendition in renditions]
+            items.append(dict(job, outputs=outputs, state='done' if done else 'planned'))
+        todo = [item for item in items if item['state'] != 'done']
+
+        # create_video replaces whatever is at an output path, so flag names that are taken
+        collisions = []
+        owners = {}
+        for item in todo:
+            for path in item['outputs']:
+                owners.setdefault(path.lower(), []).append(item)
+                if os.path.exists(path):
+                    collisions.append(f"{os.path.basename(path)} already exists and would be overwritten by {os.path.basename(item['audio'])}")
+        for path, owner_items in owners.items():
+            if len(owner_items) > 1:
+                names = ', '.join(os.path.basename(item['audio']) for item in owner_items)
+                collisions.append(f"{os.path.basename(owner_items[0]['outputs'][0])} would be written by each of {names}")
+
+        warnings = []
+        key = self.calibration_key()
+        calibration = Calibration()
+        entry = calibration.get(key)
+        readable = [item for item in todo if item.get('duration')]
+        if (recalibrate or (entry is None and calibrate_missing)) and readable:
+            sample = next((item for item in readable if os.path.exists(item['image'])), None)
+            try:
+                if sample is None:
+                    raise FileNotFoundError("none of the planned images exist")
+                entry = calibrate(calibration, key, self.renderer_options(), VideoRenderer, sample['image'], sample['audio'],
+                                  lambda path: probe_audio(path).get('duration'))
+            except Exception as e:
+                logger.warning(f"Calibration failed: {e}")
+                warnings.append(f"calibration failed: {e}")
+        estimate = None
+        if entry:
+            estimate = estimate_batch(todo, entry, workers=self.workers, render_threads=self.render_threads, encode_threads=self.encode_threads)
+            for item, item_estimate in zip(todo, estimate.pop('items')):
+                item.update(item_estimate)
+        for item in items:
+            item.setdefault('encode_seconds', None)
+            item.setdefault('bytes', None)
+
+        free_bytes = None
+        folder = os.path.abspath(self.output_folder)
+        while not os.path.exists(folder) and os.path.dirname(folder) != folder:
+            folder = os.path.dirname(folder)
+        if os.path.exists(folder):
+            free_bytes = shutil.disk_usage(folder).free
+        if estimate and free_bytes is not None and estimate['bytes'] > free_bytes:
+            warnings.append(f"the videos need about {estimate['bytes'] // (1024 * 1024)} MB but only {free_bytes // (1024 * 1024)} MB are free")
+
+        return {
+            'image_folder': self.image_folder,
+            'audio_folder': self.audio_folder,
+            'output_folder': self.output_folder,
+            'images': len(image_files),
+            'count': len(todo),
+            'done': len(items) - len(todo),
+            'audio_seconds': round(sum(item['duration'] for item in readable), 3),
+            'items': items,
+            'unreadable': [item['audio'] for item in todo if not item.get('duration')],
+            'collisions': collisions,
+            'estimate': estimate or {'seconds': None, 'bytes': None, 'unknown': len(todo)},
+            'calibration': dict(entry, key=key) if entry else None,
+            'free_bytes': free_bytes,
+            'warnings': warnings,
+        }
+
+    def update_calibration(self):
+        """Refine this machine's calibration with the timings and output sizes of the batch just finished"""
+        measured = [result for result in self.results if result.get('duration') and result.get('encode_seconds')]
+        if not measured:
+            return
+        try:
+            audio_seconds = sum(result['duration'] for result in measured)
+            size = sum(os.path.getsize(path) for result in measured for path in result['outputs'] if os.path.exists(path))
+            rates = {'bytes_per_second': size / audio_seconds}
+            calibration = Calibration()
+            # Timings are only comparable to a lone sample encode when nothing else ran alongside
+            if self.workers == 1 and self.render_threads == 1 and self.encode_threads == 1:
+                encoded = [result for result in measured if result.get('segment_cache') != 'hit']
+                overhead = (calibration.get(self.calibration_key()) or {}).get('encode_overhead') or 0.0
+                encoding = sum(result['encode_seconds'] - overhead for result in encoded)
+                if encoded and encoding > 0:
+                    rates['encode_speed'] = sum(result['duration'] for result in encoded) / encoding
+                rendered = [result for result in measured if result.get('frame_cache') != 'hit' and result.get('frame_seconds') is not None]
+                if rendered:
+                    rates['frame_seconds'] = sum(result['frame_seconds'] for result in rendered) / len(rendered)
+            calibration.update(self.calibration_key(), audio_seconds, 'batch', **rates)
+            calibration.save()
+        except Exception as e:
+            logger.warning(f"Could not update the calibration: {e}")
+
+    def list_inputs(self):
+        """The batch's image and audio files"""
+        if self.single_image and self.single_audio:
+            image_files = [self.single_image]
+            audio_files = [self.single_audio]
+        else:
+            # Sorted so a seeded batch draws the same names whatever order the filesystem lists files in
+            image_files = [os.path.join(self.image_folder, f) for f in sorted(os.listdir(self.image_folder)) if f.lower().endswith(('.png', '.jpg', '.jpeg'))]
+            audio_files = [os.path.join(self.audio_folder, f) for f in sorted(os.listdir(self.audio_folder)) if f.lower().endswith('.mp3')]
+        if self.audio_files is not None:
+            audio_files = list(self.audio_files)
+        return image_files, audio_files
+
+    def probe_audio(self, audio_files):
+        """Durations and tags from the cached audio index; only new or changed files are probed"""
+        if not audio_files:
+            return {}
+        with self.tracer.span('audio_probe', files=len(audio_files)):
+            return AudioIndex(os.path.dirname(os.path.abspath(audio_files[0]))).probe_all(audio_files)
+
+    def submit(self, job_queue):
+        """
+        Plan the batch and add it to a shared job queue instead of rendering it here; returns (success, message).
+        Metadata is drawn now, against the tracking store and the jobs already queued, so every node renders
+        the same names. Audio files that are already queued are left as they are.
+        """
+        if self.compilation:
+            return False, "A compilation is joined on one machine and cannot be built from a job queue."
+        self.random = random.Random(self.seed)
+        self.metadata = None
+        first_names, last_names = load_names(NAMES_FILE)
+        image_files, audio_files = self.list_inputs()
+        if not image_files or not audio_files:
+            return False, "No image or audio files found."
+        queued = job_queue.jobs() if job_queue.exists else []
+        queued_audio = {job['audio'] for job in queued}
+        audio_files = [audio for audio in audio_files if audio not in queued_audio]
+        audio_info = self.probe_audio(audio_files)
+
+        os.makedirs(self.output_folder, exist_ok=True)
+        os.makedirs(self.screenshots_dir, exist_ok=True)
+        self.manifest = BatchManifest.load(self.output_folder) if self.resume else BatchManifest(self.output_folder)
+        tracking = TrackingStore(self.tracking_db)
+        try:
+            # Queued jobs may not have reached the tracking store yet, so their names are reserved as well
+            for job in queued:
+                self.metadata_generator(first_names, last_names, tracking).add(job['song'], job['artist'], job['year'])
+            jobs = self.plan_jobs(audio_files, image_files, first_names, last_names, tracking, audio_info)
+        finally:
+            tracking.close()
+        added = job_queue.create(self.queue_options(), jobs)
+        return True, f"Queued {added} jobs in {job_queue.folder} ({len(queued)} already queued)"
+
+    def queue_options(self):
+        """What every node needs to render this batch's queued jobs"""
+        renderer_options = self.renderer_options()
+        # Nodes start their own browsers and write their own trace files (see queue_renderer)
+        del renderer_options['driver_factory']
+        renderer_options.update({'trace_path': None, 'trace_fields': None})
+        return {
+            'renderer': renderer_options,
+            'output_folder': self.output_folder,
+            'track': not self.single_audio,
+            'trace': self.trace_path is not None,
+        }
+
+    def build_compilation(self, audio_files):
+        """Join this batch's videos, in audio folder order, into the compilation; failed songs are left out"""
+        order = {audio: index for index, audio in enumerate(audio_files)}
+        finished = sorted(self.results + self.skipped, key=lambda item: order.get(item['audio'], len(order)))
+        output_path = self.compilation
+        if not os.path.isabs(output_path):
+            output_path = os.path.join(self.output_folder, output_path)
+        self.compilation_path = output_path
+        self.report_progress(f"Joining {len(finished)} videos into {os.path.basename(output_path)}")
+        with self.tracer.span('compilation', videos=len(finished)):
+            self.chapters = build_compilation(
+                [{'path': item['output'], 'song': item['song'], 'artist': item['artist'], 'year': item['year']} for item in finished],
+                output_path, title=os.path.splitext(os.path.basename(output_path))[0]
+            )
+        return output_path
+
+    def plan_jobs(self, audio_files, image_files, first_names, last_names, tracking, audio_info=None):
+        """Resolve metadata and image for every audio file"""
+        audio_info = audio_info or {}
+        planned = []
+        for audio in audio_files:
+            audio_hash = fingerprint_file(audio)
+            previous = self.manifest.resumable_metadata(audio, audio_hash) if self.resume else None
+            if previous and not os.path.exists(previous['image']):
+                previous = None
+            planned.append((audio, audio_hash, previous))
+        # Names kept from an interrupted run are reserved first so new draws cannot reuse them
+        for _, _, previous in planned:
+            if previous:
+                self.metadata_generator(first_names, last_names, tracking).add(previous['song'], previous['artist'], previous['year'])
+
+        jobs = []
+        for audio, audio_hash, previous in planned:
+            info = audio_info.get(audio, {})
+            if previous:
+                # Keep last run's choices so the item resumes under the same output name
+                song_name, artist_name, year, image = previous['song'], previous['artist'], previous['year'], previous['image']
+            else:
+                song_name, artist_name, year = self.generate_metadata(audio, first_names, last_names, tracking, info)
+                image = self.select_image(image_files)
+            jobs.append({
+                'audio': audio,
+                'image': image,
+                'song': song_name,
+                'artist': artist_name,
+                'year': year,
+                'audio_hash': audio_hash,
+                'image_hash': fingerprint_file(image) if os.path.exists(image) else None,
+                'duration': info.get('duration'),
+                'renditions': self.renditions,
+                'profile': 'segment' if self.compilation else None,
+            })
+        return jobs
+
+    def skip_finished(self, jobs):
+        """In resume mode, drop jobs whose video is already complete and clear out partial outputs"""
+        if not self.resume:
+            return jobs
+        renditions = resolve_renditions(self.renditions) or [None]
+        remaining = []
+        for job in jobs:
+            # Partial encodes left by the interrupted run; this batch has not started any of its own yet
+            remove_stale_partials([output_path(self.output_folder, job['song'], job['artist'], job['year'], rendition)
+                                   for rendition in renditions], max_age=0)
+            if self.manifest.is_done(job):
+                entry = self.manifest.get(job['audio'])
+                self.skipped.append(dict(job, output=entry['output'], outputs=entry.get('outputs')))
+                continue
+            for output in self.manifest.outputs(job['audio']):
+                if os.path.exists(output) and not is_complete_mp4(output):
+                    logger.debug(f"Removing incomplete video: {output}")
+                    os.remove(output)
+            remaining.append(job)
+        if self.skipped:
+            self.report_progress(f"Resuming: {len(self.skipped)} videos already done, {len(remaining)} to go")
+        return remaining
+
+    def renderer_options(self):
+        """Keyword arguments for the VideoRenderer each worker builds"""
+        return {
+            'html_template': self.html_template,
+            'output_folder': self.output_folder,
+            'screenshots_dir': self.screenshots_dir,
+            'encoder': self.encoder,
+            'backend': self.backend,
+            'frame_cache': self.frame_cache,
+            'prescale': self.prescale,
+            'memory_budget': self.memory_budget,
+            'driver_factory': self.driver_factory,
+            'trace_path': self.trace_path,
+            'trace_fields': {'batch': self.batch_id},
+            'renditions': self.renditions,
+            'tile_frames': self.tile_frames,
+            'compilation': bool(self.compilation),
+            'overlays': self.overlays,
+        }
+
+    def tiled(self):
+        """Whether browser frames are rendered several per page load"""
+        return self.tile_frames > 1 and resolve_backend(self.html_template, self.backend) == 'browser'
+
+    def run_pipeline(self, jobs, tracking):
+        """
+        Render and encode jobs in this process as a pipeline: the next songs' frames are rendered while
+        earlier songs encode, on render_threads and encode_threads threads. At most pipeline_depth rendered
+        frames wait for an encoder, so a slow encoder holds rendering back instead of piling up screenshots.
+        """
+        renderer = VideoRenderer(**dict(self.renderer_options(), browsers=self.render_threads))
+        # Tiled frames are rendered a chunk at a time, by whichever render thread reaches the chunk first
+        chunks = {}
+        if self.tiled():
+            for start in range(0, len(jobs), self.tile_frames):
+                chunk = {'jobs': jobs[start:start + self.tile_frames], 'lock': threading.Lock(), 'rendered': False}
+                for job in chunk['jobs']:
+                    chunks[job['audio']] = chunk
+
+        def render(job, _):
+            chunk = chunks.get(job['audio'])
+            if chunk is not None:
+                with chunk['lock']:
+                    if not chunk['rendered']:
+                        renderer.prerender(chunk['jobs'])
+                        chunk['rendered'] = True
+            self.report_progress(f"Processing {os.path.basename(job['audio'])}")
+            logger.debug(f"Processing audio: {job['audio']}")
+            frames = renderer.render_frames(job)
+            self.manifest.update(job, RENDERED, frame=frames['frames'][0])
+            return frames
+
+        def encode(job, frames):
+            self.progress.start(job['audio'])
+
+            def on_progress(seconds):
+                if self.cancel_event.is_set():
+                    raise PipelineCancelled(f"Stopped while encoding {os.path.basename(job['audio'])}")
+                self.progress.update(job['audio'], seconds)
+            return renderer.encode(job, frames, on_progress=on_progress)
+
+        pipeline = Pipeline([
+            Stage('render', render, workers=self.render_threads, queue_size=self.pipeline_depth),
+            Stage('encode', encode, workers=self.encode_threads, queue_size=self.pipeline_depth),
+        ], cancel_event=self.cancel_event)
+        try:
+            pipeline.run(jobs, lambda job, rendered: self.record_success(job, rendered, tracking), self.record_error)
+        finally:
+            renderer.close()
+
+    def run_pool(self, jobs, tracking):
+        """Render jobs across a pool of worker processes; results are merged here"""
+        workers = min(self.workers, len(jobs))
+        self.report_progress(f"Processing {len(jobs)} files with {workers} workers")
+        # Longest songs first, so one long encode does not end up running alone at the end of the batch
+        jobs = sorted(jobs, key=lambda job: job.get('duration') or 0, reverse=True)
+        context = multiprocessing.get_context()
+        progress_queue = context.Queue()
+        cancel_event = context.Event()
+        stop = threading.Event()
+        reader = threading.Thread(target=self.read_progress, args=(progress_queue, stop), daemon=True)
+        reader.start()
+        try:
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(self.renderer_options(), current_level(), progress_queue, cancel_event)
+            ) as pool:
+                tiled = self.tiled()
+                if tiled:
+                    # Each task renders a chunk so its frames share page loads; chunks stay small enough to keep every worker busy
+                    chunk_size = max(1, min(self.tile_frames, math.ceil(len(jobs) / workers)))
+                    futures = {pool.submit(_render_jobs, jobs[i:i + chunk_size]): jobs[i:i + chunk_size] for i in range(0, len(jobs), chunk_size)}
+                else:
+                    futures = {pool.submit(_render_job, job): [job] for job in jobs}
+
+                def cancel_pool():
+                    # Queued songs are dropped; running ones stop at their next progress report
+                    cancel_event.set()
+                    for future in futures:
+                        future.cancel()
+                self._cancel_hooks.append(cancel_pool)
+                if self.cancel_event.is_set():
+                    cancel_pool()
+                done = 0
+                for future in as_completed(futures):
+                    chunk = futures[future]
+                    try:
+                        outcomes = future.result() if tiled else [(future.result(), None)]
+                    except Exception as e:
+                        outcomes = [(None, e)] * len(chunk)
+                    for job, (rendered, error) in zip(chunk, outcomes):
+                        done += 1
+                        if error is not None:
+                            self.record_error(job, error)
+                        else:
+                            self.record_success(job, rendered, tracking)
+                        self.report_progress(f"Processed {os.path.basename(job['audio'])} ({done}/{len(jobs)})")
+        finally:
+            self._cancel_hooks = []
+            stop.set()
+            reader.join()
+            progress_queue.close()
+
+    def read_progress(self, progress_queue, stop):
+        """Feed encode progress from pool workers into the progress tracker until stop is set"""
+        while not stop.is_set():
+            try:
+                kind, audio, seconds = progress_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if kind == 'start':
+                self.progress.start(audio)
+            else:
+                self.progress.update(audio, seconds)
+
+    def record_success(self, job, rendered, tracking):
+        """Record a finished video and write it to the tracking store"""
+        with self.tracer.context(video=os.path.basename(job['audio'])), self.tracer.span('tracking_write'):
+            self.update_tracking(tracking, job['song'], job['artist'], job['year'], job['image'], rendered['output'])
+        self.manifest.update(job, ENCODED, output=rendered['output'], outputs=rendered.get('outputs'), frame=rendered.get('frame'), error=None)
+        self.results.append(dict(job, **rendered))
+        self.progress.finish(job['audio'], success=True)
+
+    def record_error(self, job, error):
+        """Record a song that did not finish: cancelled, or failed"""
+        # An encode that breaks while the batch is stopping was most likely stopped by it
+        if isinstance(error, (PipelineCancelled, CancelledError)) or self.cancel_event.is_set():
+            self.record_cancelled(job)
+        else:
+            self.record_failure(job, error)
+
+    def record_cancelled(self, job):
+        """Record a song the batch was stopped before finishing; its manifest state is left for --resume"""
+        logger.debug(f"Cancelled: {job['audio']}")
+        self.cancelled.append(job)
+        self.progress.cancel(job['audio'])
+
+    def record_failure(self, job, error):
+        """Record a failed video without stopping the batch"""
+        logger.error(f"Error creating video for {job['audio']}: {error}")
+        self.report_progress(f"Failed {os.path.basename(job['audio'])}: {error}")
+        self.manifest.update(job, FAILED, error=str(error))
+        self.failures.append(dict(job, error=str(error)))
+        self.progress.finish(job['audio'], success=False)
+
+    def summary(self, success=None, message=None):
+        """Return a JSON-serialisable summary of the last run"""
+        elapsed = None
+        if self.started_at is not None and self.finished_at is not None:
+            elapsed = round(self.finished_at - self.started_at, 3)
+        return {
+            'success': success,
+            'message': message,
+            'output_folder': self.output_folder,
+            'template': self.html_template or None,
+            'encoder': self.encoder,
+            'renditions': self.renditions,
+            'workers': self.workers,
+            'backend': resolve_backend(self.html_template, self.backend),
+            'frame_cache': self.frame_cache_report(),
+            'compilation': {'path': self.compilation_path, 'chapters': list(self.chapters)} if self.compilation else None,
+            'videos': list(self.results),
+            'failures': list(self.failures),
+            'skipped': list(self.skipped),
+            'cancelled': list(self.cancelled),
+            'manifest': self.manifest.path if self.manifest else None,
+            'trace': {'path': self.trace_path, 'batch': self.batch_id, 'stages': list(self.trace_summary)},
+            'count': len(self.results),
+            'audio_seconds': round(sum(r.get('duration') or 0 for r in self.results), 3),
+            'elapsed_seconds': elapsed,
+        }
+
+    def report_trace(self):
+        """Total up this batch's spans (from every worker) and log them as a table"""
+        if not self.tracer.enabled:
+            return
+        self.trace_summary = summarize(load_trace(self.trace_path, batch=self.batch_id))
+        if self.trace_summary:
+            logger.info(f"Stage timings ({self.trace_path}):\n{format_table(self.trace_summary)}")
+
+    def frame_cache_report(self):
+        """Count frame cache hits and misses across all workers"""
+        hits = sum(1 for r in self.results if r.get('frame_cache') == 'hit')
+        misses = sum(1 for r in self.results if r.get('frame_cache') == 'miss')
+        return {
+            'enabled': self.frame_cache,
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / (hits + misses), 3) if hits + misses else None,
+        }
+
+    def generate_metadata(self, audio, first_names, last_names, tracking, audio_info=None):
+        """Generate or retrieve metadata for the audio file"""
+        song_name, _, _ = parse_filename(os.path.basename(audio))
+        if not song_name and audio_info:
+            song_name = audio_info.get('title')
+        if not song_name:
+            song_name = os.path.splitext(os.path.basename(audio))[0]
+
+        artist_name, year = self.metadata_generator(first_names, last_names, tracking).generate(
+            song_name, artist_name=self.custom_artist or None, year=self.custom_year or None
+        )
+        return song_name, artist_name, year
+
+    def metadata_generator(self, first_names, last_names, tracking):
+        """The run's MetadataGenerator, indexing the tracking store's history on first use"""
+        if self.metadata is None:
+            with self.tracer.span('metadata_index'):
+                self.metadata = MetadataGenerator.from_tracking(
+                    tracking, first_names, last_names, unique_artists=self.unique_artists, rng=self.random
+                )
+            logger.debug(f"Indexed {len(self.metadata.combinations)} used metadata combinations")
+        return self.metadata
+
+    def select_image(self, image_files):
+        if self.single_image:
+            return os.path.join(self.image_folder, self.single_image)
+        return self.random.choice(image_files)  # image_files should already contain full paths
+
+    def update_tracking(self, tracking, song_name, artist_name, year, image, output=None):
+        """Record the video in the tracking store (committed immediately)"""
+        if not self.single_audio:
+            tracking.record(song_name, artist_name, year, image, output)
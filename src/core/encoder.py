@@ -0,0 +1,259 @@
+# src/core/encoder.py
+
+import os
+import subprocess
+import tempfile
+import threading
+from config.settings import DEFAULT_FPS, STILL_IMAGE_FPS, STILL_IMAGE_PRESET, RENDITIONS, COMPILATION_SIZE, COMPILATION_FPS, COMPILATION_AUDIO_RATE, COMPILATION_AUDIO_BITRATE
+from core.trace import Tracer
+
+# Audio codecs that can be stream-copied straight into an MP4 container
+MP4_COPY_AUDIO_EXTENSIONS = ('.mp3', '.m4a', '.aac')
+
+ENCODERS = ('still', 'moviepy')
+
+def get_ffmpeg_binary():
+    """Return the ffmpeg binary, resolved the same way moviepy does"""
+    binary = os.getenv('FFMPEG_BINARY')
+    if binary and binary != 'ffmpeg-imageio':
+        return binary
+    import imageio_ffmpeg
+    return imageio_ffmpeg.get_ffmpeg_exe()
+
+def can_copy_audio(audio_path, output_path):
+    """Check whether the audio stream can be muxed into the output without re-encoding"""
+    if not output_path.lower().endswith('.mp4'):
+        return False
+    return audio_path.lower().endswith(MP4_COPY_AUDIO_EXTENSIONS)
+
+def build_still_command(image_path, audio_path, output_path, fps=STILL_IMAGE_FPS, preset=STILL_IMAGE_PRESET):
+    """Build the ffmpeg command line for a single looped frame plus audio"""
+    return build_multi_output_command([(image_path, output_path, None)], audio_path, fps=fps, preset=preset)
+
+def build_multi_output_command(outputs, audio_path, fps=STILL_IMAGE_FPS, preset=STILL_IMAGE_PRESET):
+    """
+    Build one ffmpeg command that writes several videos sharing the same audio.
+    outputs is a list of (frame path, output path, video bitrate or None); the audio is demuxed once and
+    stream-copied into every output, so callers pass audio that can be copied when there is more than one.
+    """
+    command = [get_ffmpeg_binary(), '-hide_banner', '-loglevel', 'error', '-y']
+    for image_path, _, _ in outputs:
+        command += ['-loop', '1', '-framerate', str(fps), '-i', image_path]
+    command += ['-i', audio_path]
+    audio_input = len(outputs)
+    for index, (_, output_path, video_bitrate) in enumerate(outputs):
+        audio_codec = ['-c:a', 'copy'] if can_copy_audio(audio_path, output_path) else ['-c:a', 'aac', '-b:a', '192k']
+        # No bitrate means x264's default constant-quality mode
+        bitrate = ['-b:v', str(video_bitrate)] if video_bitrate else []
+        command += [
+            '-map', f'{index}:v:0', '-map', f'{audio_input}:a:0',
+            # libx264 with yuv420p needs even dimensions
+            '-vf', 'scale=trunc(iw/2)*2:trunc(ih/2)*2,setsar=1,format=yuv420p',
+            '-c:v', 'libx264', '-tune', 'stillimage', '-preset', preset, *bitrate,
+            '-r', str(fps),
+            *audio_codec,
+            '-shortest', '-movflags', '+faststart',
+            output_path
+        ]
+    return command
+
+def encode_still_video(image_path, audio_path, output_path, fps=STILL_IMAGE_FPS, preset=STILL_IMAGE_PRESET, on_progress=None):
+    """
+    Encode a still image and an audio file into a video with ffmpeg.
+    The image is encoded once at a low frame rate and the audio is copied when the container allows it.
+    on_progress(seconds) is called with the encoded position as ffmpeg reports it.
+    """
+    command = build_still_command(image_path, audio_path, output_path, fps=fps, preset=preset)
+    if on_progress is None:
+        process = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        returncode, stderr = process.returncode, process.stderr
+    else:
+        returncode, stderr = run_with_progress(command, on_progress)
+    if returncode != 0:
+        error = stderr.decode('utf-8', errors='replace').strip()
+        raise RuntimeError(f"ffmpeg failed to encode {output_path}: {error}")
+    return output_path
+
+def run_with_progress(command, on_progress, feed=None):
+    """
+    Run ffmpeg with -progress on stdout, reporting out_time as it goes; returns (returncode, stderr).
+    feed(stdin), if given, writes ffmpeg's piped input on its own thread while progress is read.
+    """
+    command = command[:1] + ['-progress', 'pipe:1', '-nostats'] + command[1:]
+    # stderr goes to a file so a chatty ffmpeg can never block on a full pipe while we read stdout
+    with tempfile.TemporaryFile() as stderr:
+        process = subprocess.Popen(command, stdin=subprocess.PIPE if feed else None, stdout=subprocess.PIPE, stderr=stderr)
+        feeder = None
+        feed_errors = []
+        if feed is not None:
+            feeder = threading.Thread(target=feed_input, args=(process.stdin, feed, feed_errors), name='ffmpeg-feed', daemon=True)
+            feeder.start()
+        try:
+            for line in process.stdout:
+                key, _, value = line.decode('ascii', errors='replace').strip().partition('=')
+                if key == 'out_time_us' and value.isdigit():
+                    on_progress(int(value) / 1000000)
+        except BaseException:
+            # on_progress raising (e.g. the batch was cancelled) stops the encode
+            process.kill()
+            process.wait()
+            raise
+        finally:
+            if feeder is not None:
+                feeder.join()
+        process.wait()
+        # A feed that failed left the input short, so the output would end early without ffmpeg noticing
+        if feed_errors:
+            raise feed_errors[0]
+        stderr.seek(0)
+        return process.returncode, stderr.read()
+
+def feed_input(stdin, feed, errors):
+    """
+    Run feed(stdin), then close ffmpeg's input. A pipe that ffmpeg closed first (because it failed or was
+    killed) ends the feed quietly; any other error is added to errors.
+    """
+    try:
+        feed(stdin)
+    except BrokenPipeError:
+        pass
+    except Exception as e:
+        errors.append(e)
+    finally:
+        try:
+            stdin.close()
+        except BrokenPipeError:
+            pass
+
+def encode_renditions(outputs, audio_path, fps=STILL_IMAGE_FPS, preset=STILL_IMAGE_PRESET, on_progress=None, temp_dir=None):
+    """
+    Encode several renditions of a video in a single ffmpeg pass.
+    outputs is a list of (frame path, output path, video bitrate or None). Audio that cannot be copied into
+    MP4 is encoded to AAC once first, so every rendition copies the same encoded stream.
+    """
+    shared_audio = None
+    if not all(can_copy_audio(audio_path, output_path) for _, output_path, _ in outputs):
+        handle, shared_audio = tempfile.mkstemp(suffix='.m4a', dir=temp_dir)
+        os.close(handle)
+        process = subprocess.run(
+            [get_ffmpeg_binary(), '-hide_banner', '-loglevel', 'error', '-y', '-i', audio_path,
+             '-vn', '-c:a', 'aac', '-b:a', '192k', shared_audio],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+        if process.returncode != 0:
+            os.remove(shared_audio)
+            error = process.stderr.decode('utf-8', errors='replace').strip()
+            raise RuntimeError(f"ffmpeg failed to encode the audio of {audio_path}: {error}")
+        audio_path = shared_audio
+    try:
+        command = build_multi_output_command(outputs, audio_path, fps=fps, preset=preset)
+        if on_progress is None:
+            process = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            returncode, stderr = process.returncode, process.stderr
+        else:
+            returncode, stderr = run_with_progress(command, on_progress)
+    finally:
+        if shared_audio:
+            os.remove(shared_audio)
+    if returncode != 0:
+        error = stderr.decode('utf-8', errors='replace').strip()
+        raise RuntimeError(f"ffmpeg failed to encode {', '.join(output for _, output, _ in outputs)}: {error}")
+    return [output for _, output, _ in outputs]
+
+def segment_profile():
+    """The fixed parameters compilation segments are encoded with; part of every segment's cache key"""
+    return {
+        'size': list(COMPILATION_SIZE),
+        'fps': COMPILATION_FPS,
+        'preset': STILL_IMAGE_PRESET,
+        'audio_rate': COMPILATION_AUDIO_RATE,
+        'audio_bitrate': COMPILATION_AUDIO_BITRATE,
+    }
+
+def build_segment_command(image_path, audio_path, output_path, profile=None, duration=None):
+    """
+    Build the ffmpeg command for a compilation segment.
+    Unlike build_still_command every input ends up with the same frame size, frame rate, pixel format and
+    AAC audio layout, which is what joining segments with stream copy requires. With the audio's duration
+    the segment is cut to exactly that length; -shortest alone lets a looped image run seconds past the audio.
+    """
+    profile = profile or segment_profile()
+    width, height = profile['size']
+    length = ['-t', f"{duration:.3f}"] if duration else ['-shortest']
+    return [
+        get_ffmpeg_binary(), '-hide_banner', '-loglevel', 'error', '-y',
+        '-loop', '1', '-framerate', str(profile['fps']), '-i', image_path,
+        '-i', audio_path,
+        '-map', '0:v:0', '-map', '1:a:0',
+        # Letterbox to the profile size instead of stretching frames of another aspect ratio
+        '-vf', f'scale={width}:{height}:force_original_aspect_ratio=decrease,pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,setsar=1,format=yuv420p',
+        '-c:v', 'libx264', '-tune', 'stillimage', '-preset', profile['preset'], '-profile:v', 'high',
+        '-r', str(profile['fps']),
+        '-c:a', 'aac', '-b:a', profile['audio_bitrate'], '-ar', str(profile['audio_rate']), '-ac', '2',
+        *length, '-movflags', '+faststart',
+        output_path
+    ]
+
+def encode_segment(image_path, audio_path, output_path, profile=None, duration=None, on_progress=None):
+    """Encode a compilation segment (see build_segment_command)"""
+    command = build_segment_command(image_path, audio_path, output_path, profile, duration)
+    if on_progress is None:
+        process = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        returncode, stderr = process.returncode, process.stderr
+    else:
+        returncode, stderr = run_with_progress(command, on_progress)
+    if returncode != 0:
+        error = stderr.decode('utf-8', errors='replace').strip()
+        raise RuntimeError(f"ffmpeg failed to encode segment {output_path}: {error}")
+    return output_path
+
+def resolve_renditions(names):
+    """Look up rendition names (e.g. ['16x9', '9x16']) in RENDITIONS; None or empty means a single plain output"""
+    if not names:
+        return []
+    renditions = []
+    for name in names:
+        if name not in RENDITIONS:
+            raise ValueError(f"Unknown rendition: {name} (choose from {', '.join(RENDITIONS)})")
+        renditions.append(dict(RENDITIONS[name], name=name))
+    return renditions
+
+def moviepy_progress_logger(duration, on_progress):
+    """A proglog logger that reports moviepy's frame bar as encoded seconds instead of drawing it on the console"""
+    from proglog import ProgressBarLogger
+
+    class ProgressLogger(ProgressBarLogger):
+        def bars_callback(self, bar, attr, value, old_value=None):
+            if bar == 't' and attr == 'index':
+                total = self.bars[bar].get('total')
+                if total:
+                    on_progress(duration * min(1.0, (value + 1) / total))
+
+    return ProgressLogger()
+
+def encode_moviepy_video(image_path, audio_path, output_path, fps=DEFAULT_FPS, tracer=None, on_progress=None):
+    """Encode a still image and an audio file through moviepy (the original, slower path)"""
+    from moviepy.editor import ImageClip, AudioFileClip
+
+    with (tracer or Tracer()).span('audio_open'):
+        audio_clip = AudioFileClip(audio_path)
+    try:
+        img_clip = ImageClip(image_path).set_duration(audio_clip.duration)
+        video_clip = img_clip.set_audio(audio_clip)
+        progress_logger = 'bar' if on_progress is None else moviepy_progress_logger(audio_clip.duration, on_progress)
+        video_clip.write_videofile(output_path, fps=fps, logger=progress_logger)
+    finally:
+        audio_clip.close()
+    return output_path
+
+def encode_video(image_path, audio_path, output_path, encoder='still', tracer=None, on_progress=None):
+    """
+    Encode a video with the selected encoder ('still' or 'moviepy').
+    ffmpeg opens the audio itself on the still path, so only moviepy records an audio_open span.
+    on_progress(seconds) receives the encoded position in the audio.
+    """
+    if encoder == 'still':
+        return encode_still_video(image_path, audio_path, output_path, on_progress=on_progress)
+    if encoder == 'moviepy':
+        return encode_moviepy_video(image_path, audio_path, output_path, tracer=tracer, on_progress=on_progress)
+    raise ValueError(f"Unknown encoder: {encoder}")
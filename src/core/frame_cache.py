@@ -0,0 +1,147 @@
+# src/core/frame_cache.py
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+from config.settings import FRAME_CACHE_DIR, FRAME_CACHE_MAX_BYTES
+from core.utils import find_template_asset, TEMPLATE_ASSETS
+
+# Bump when the way frames are rendered changes, so old entries stop matching
+CACHE_VERSION = 1
+
+def hash_file(path, chunk_size=1024 * 1024):
+    """Return the sha256 hex digest of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def template_fingerprint(html_template, backend, extra_files=(), asset_dir=None):
+    """
+    Hash everything about a template that affects its rendered frames:
+    the backend, the template source, any extra files (e.g. its layout) and its image assets.
+    """
+    digest = hashlib.sha256(f"v{CACHE_VERSION}:{backend}".encode())
+    for path in [html_template, *extra_files]:
+        digest.update(os.path.basename(path).encode())
+        digest.update(hash_file(path).encode())
+    for name in TEMPLATE_ASSETS:
+        asset_path = find_template_asset(name, asset_dir) if asset_dir else find_template_asset(name)
+        digest.update(name.encode())
+        digest.update(hash_file(asset_path).encode() if asset_path else b'-')
+    return digest.hexdigest()
+
+def frame_key(fingerprint, image_path, song_name, artist_name, year):
+    """Content address of one frame: template fingerprint + cover bytes + render variables"""
+    variables = json.dumps([song_name, artist_name, year], ensure_ascii=False)
+    return hashlib.sha256(f"{fingerprint}:{hash_file(image_path)}:{variables}".encode()).hexdigest()
+
+class FrameCache:
+    """
+    Content-addressed store of rendered frames with size-based LRU eviction.
+    Entries are PNG files named by key; a hit refreshes the entry's mtime, which is what eviction orders by.
+    Several processes may share one cache directory. Other files (e.g. encoded segments) can be stored the
+    same way by passing their extension.
+    """
+
+    def __init__(self, cache_dir=FRAME_CACHE_DIR, max_bytes=FRAME_CACHE_MAX_BYTES, extension='.png'):
+        self.cache_dir = cache_dir
+        self.extension = extension
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._total_bytes = None
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def path_for(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}{self.extension}")
+
+    def get(self, key, destination):
+        """Copy a cached frame to destination; returns True on a hit"""
+        path = self.path_for(key)
+        try:
+            os.utime(path)
+            self.place(path, destination)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return False
+        with self._lock:
+            self.hits += 1
+        return True
+
+    def put(self, key, source):
+        """Store a rendered frame under key and evict old entries if the cache is over its size limit"""
+        path = self.path_for(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        shutil.copyfile(source, temp_path)
+        size = os.path.getsize(temp_path)
+        os.replace(temp_path, path)
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = sum(entry_size for _, entry_size, _ in self.entries())
+            else:
+                self._total_bytes += size
+            over_limit = self.max_bytes and self._total_bytes > self.max_bytes
+        if over_limit:
+            self.evict()
+
+    @staticmethod
+    def place(path, destination):
+        """Hard-link a cached frame into place, copying when linking is not possible"""
+        if os.path.exists(destination):
+            os.remove(destination)
+        try:
+            os.link(path, destination)
+        except OSError:
+            shutil.copyfile(path, destination)
+
+    def entries(self):
+        """List (mtime, size, path) for every cached frame"""
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(self.extension):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def evict(self):
+        """Remove least recently used frames until the cache fits in max_bytes"""
+        if not self.max_bytes:
+            return
+        # Rescan rather than trust the running total: other processes may share the directory
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                self.evictions += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+        with self._lock:
+            self._total_bytes = total
+
+    def stats(self):
+        """Hit/miss report for this cache instance"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else None,
+        }
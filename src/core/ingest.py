@@ -0,0 +1,114 @@
+# src/core/ingest.py
+
+import hashlib
+import os
+import threading
+from PIL import Image, ImageOps
+from config.settings import INGEST_CACHE_DIR, INGEST_CACHE_MAX_BYTES, INGEST_MAX_SIZE, INGEST_MEMORY_BUDGET
+from core.frame_cache import FrameCache
+
+EXIF_ORIENTATION = 0x0112
+# EXIF orientations that swap width and height
+TRANSPOSED_ORIENTATIONS = (5, 6, 7, 8)
+# Bump when the normalisation below changes, so cached images are rebuilt
+INGEST_VERSION = 1
+
+def probe_image(path):
+    """Read an image's size, mode, format and EXIF orientation from its header without decoding pixels"""
+    with Image.open(path) as image:
+        orientation = image.getexif().get(EXIF_ORIENTATION, 1)
+        width, height = image.size
+        if orientation in TRANSPOSED_ORIENTATIONS:
+            width, height = height, width
+        return {
+            'width': width,
+            'height': height,
+            'mode': image.mode,
+            'format': image.format,
+            'orientation': orientation,
+        }
+
+def fit_within(size, max_size):
+    """Scale (width, height) down to fit max_size, never up, rounded to even dimensions for the encoder"""
+    width, height = size
+    ratio = min(1.0, max_size[0] / width, max_size[1] / height)
+    width = max(2, int(width * ratio) // 2 * 2)
+    height = max(2, int(height * ratio) // 2 * 2)
+    return width, height
+
+def decoded_bytes(image):
+    """Memory needed to hold an opened image's pixels once it is decoded"""
+    bands = len(image.getbands())
+    bits = 1 if image.mode == '1' else 16 if image.mode.startswith('I;16') else 32 if image.mode in ('I', 'F') else 8
+    return image.size[0] * image.size[1] * max(1, bands * bits // 8)
+
+class ImageIngest:
+    """
+    Prepares source images for rendering and encoding.
+    Each image is scaled down to the output size once, EXIF-rotated, converted to RGB with even
+    dimensions and cached on disk, so workers never hold full-resolution originals in memory.
+    The cache is evicted least recently used first once it grows over max_bytes, like the frame cache.
+    """
+
+    def __init__(self, max_size=INGEST_MAX_SIZE, memory_budget=INGEST_MEMORY_BUDGET, cache_dir=INGEST_CACHE_DIR, max_bytes=INGEST_CACHE_MAX_BYTES):
+        self.max_size = tuple(max_size)
+        self.memory_budget = memory_budget
+        self.cache_dir = cache_dir
+        self.store = FrameCache(cache_dir=cache_dir, max_bytes=max_bytes, extension='.jpg')
+
+    def cache_key(self, path):
+        """Cache key for a source image: its path, size, mtime and the target size"""
+        stat = os.stat(path)
+        key = f"v{INGEST_VERSION}:{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}:{self.max_size[0]}x{self.max_size[1]}"
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def needs_preparing(self, info, target):
+        return (
+            target != (info['width'], info['height'])
+            or info['orientation'] != 1
+            or info['mode'] != 'RGB'
+            or info['format'] not in ('JPEG', 'PNG')
+        )
+
+    def prepare(self, path):
+        """Return a path to an encoder-ready version of the image, creating it if needed"""
+        info = probe_image(path)
+        target = fit_within((info['width'], info['height']), self.max_size)
+        if not self.needs_preparing(info, target):
+            return path
+
+        key = self.cache_key(path)
+        cached = self.store.path_for(key)
+        try:
+            # Refreshes the entry for eviction, which orders by mtime
+            os.utime(cached)
+            return cached
+        except FileNotFoundError:
+            pass
+
+        with Image.open(path) as image:
+            # JPEGs can be decoded at 1/2, 1/4 or 1/8 scale, which keeps large photos small in memory
+            draft_size = target[::-1] if info['orientation'] in TRANSPOSED_ORIENTATIONS else target
+            image.draft('RGB', draft_size)
+            needed = decoded_bytes(image)
+            if self.memory_budget and needed > self.memory_budget:
+                raise ValueError(
+                    f"Image {path} needs {needed // (1024 * 1024)} MB to decode, "
+                    f"over the {self.memory_budget // (1024 * 1024)} MB per-worker memory budget"
+                )
+            image = ImageOps.exif_transpose(image)
+            if image.mode in ('RGBA', 'LA', 'P'):
+                image = image.convert('RGBA')
+                background = Image.new('RGBA', image.size, (0, 0, 0, 255))
+                image = Image.alpha_composite(background, image)
+            image = image.convert('RGB')
+            if image.size != target:
+                image = image.resize(target, Image.LANCZOS, reducing_gap=3.0)
+
+            temp_path = os.path.join(self.cache_dir, f"{key}.{os.getpid()}.{threading.get_ident()}.tmp")
+            image.save(temp_path, 'JPEG', quality=95, subsampling=0)
+        try:
+            self.store.put(key, temp_path)
+        finally:
+            os.remove(temp_path)
+        return cached
@@ -0,0 +1,379 @@
+# src/core/job_queue.py
+
+import glob
+import hashlib
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from config.settings import TRACKING_DB, QUEUE_LEASE_SECONDS, QUEUE_MAX_ATTEMPTS, QUEUE_POLL_INTERVAL
+from core.log import get_logger
+from core.manifest import BatchManifest, ENCODED, FAILED
+from core.tracking_store import TrackingStore
+
+logger = get_logger('job_queue')
+
+QUEUE_VERSION = 1
+
+def node_name():
+    """Identifies this worker process across every machine sharing the queue"""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+def read_json(path):
+    """Read a JSON record, or None if it is missing or half-written"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+def write_json(path, data):
+    """Write a JSON record atomically: temp file in the same folder, then rename over the target"""
+    temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=4)
+    os.replace(temp_path, path)
+
+def create_exclusive(path, data):
+    """
+    Create path with data only if it does not exist yet; raises FileExistsError otherwise.
+    Uses link() of a finished temp file, which is atomic on NFS as well, so a reader never sees a partial
+    record. Filesystems without hard links fall back to O_EXCL.
+    """
+    temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    try:
+        os.link(temp_path, path)
+    except FileExistsError:
+        raise
+    except OSError:
+        fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+    finally:
+        os.remove(temp_path)
+
+class JobQueue:
+    """
+    A batch shared through a folder every render node can reach (e.g. on a NAS).
+    The submitting node writes one record per job; workers anywhere claim a job by creating its lease file,
+    renew the lease while they work and record the result in done/. A lease that is not renewed expires, so
+    the job is picked up again if its worker dies. Nodes never write the tracking store: one collector
+    imports the done/ records into it (see collect_results). Node clocks are assumed to be in sync (NTP).
+
+    Layout: queue.json (batch options), jobs/, leases/, done/, failed/, collected/, traces/
+    """
+
+    def __init__(self, folder, node=None, lease_seconds=QUEUE_LEASE_SECONDS, max_attempts=QUEUE_MAX_ATTEMPTS):
+        self.folder = os.path.abspath(folder)
+        self.node = node or node_name()
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+    def path(self, *parts):
+        return os.path.join(self.folder, *parts)
+
+    @property
+    def exists(self):
+        return os.path.exists(self.path('queue.json'))
+
+    def create(self, options, jobs):
+        """Write the batch options (once) and a record for every job not queued yet; returns the number added"""
+        for name in ('jobs', 'leases', 'done', 'failed', 'collected', 'traces'):
+            os.makedirs(self.path(name), exist_ok=True)
+        if not self.exists:
+            write_json(self.path('queue.json'), {'version': QUEUE_VERSION, 'created_at': time.time(), 'options': options})
+        existing = {job['audio'] for job in self.jobs()}
+        added = 0
+        sequence = len(self.job_files())
+        for job in jobs:
+            if job['audio'] in existing:
+                continue
+            # Ids sort in submission order, so workers take jobs in the order they were planned
+            job_id = f"{sequence:06d}-{hashlib.sha1(os.path.abspath(job['audio']).encode()).hexdigest()[:12]}"
+            sequence += 1
+            try:
+                # Exclusive, so a node submitting the same audio file at the same time cannot overwrite the job
+                create_exclusive(self.path('jobs', f"{job_id}.json"), {'id': job_id, 'job': job, 'submitted_at': time.time()})
+            except FileExistsError:
+                logger.info(f"{os.path.basename(job['audio'])} was queued by another node at the same time")
+                continue
+            added += 1
+        return added
+
+    def options(self):
+        data = read_json(self.path('queue.json'))
+        if data is None:
+            raise FileNotFoundError(f"No job queue in {self.folder}")
+        if data.get('version') != QUEUE_VERSION:
+            raise ValueError(f"Job queue {self.folder} was written by an incompatible version")
+        return data['options']
+
+    def job_files(self):
+        try:
+            return sorted(name for name in os.listdir(self.path('jobs')) if name.endswith('.json'))
+        except FileNotFoundError:
+            return []
+
+    def job_ids(self):
+        return [name[:-len('.json')] for name in self.job_files()]
+
+    def jobs(self):
+        """Every queued job, in submission order"""
+        return [job for job in (self.get(job_id) for job_id in self.job_ids()) if job]
+
+    def get(self, job_id):
+        record = read_json(self.path('jobs', f"{job_id}.json"))
+        return record['job'] if record else None
+
+    def is_finished(self, job_id, done=None):
+        """Done, or failed max_attempts times"""
+        if done is not None and f"{job_id}.json" in done:
+            return True
+        if done is None and os.path.exists(self.path('done', f"{job_id}.json")):
+            return True
+        failure = read_json(self.path('failed', f"{job_id}.json"))
+        return bool(failure and failure.get('attempts', 0) >= self.max_attempts)
+
+    def lease_path(self, job_id):
+        return self.path('leases', f"{job_id}.lease")
+
+    def claim(self):
+        """Lease the next unfinished job that nobody holds a live lease on; returns (job_id, job, lease) or None"""
+        done = set(os.listdir(self.path('done')))
+        for job_id in self.job_ids():
+            if self.is_finished(job_id, done):
+                continue
+            lease = self.acquire(job_id)
+            if lease is None:
+                continue
+            # Another node may have finished it between the listing and the lease
+            if os.path.exists(self.path('done', f"{job_id}.json")):
+                self.release(lease)
+                continue
+            return job_id, self.get(job_id), lease
+        return None
+
+    def acquire(self, job_id):
+        """Create the job's lease, taking over an expired one; returns the lease or None if it is held"""
+        path = self.lease_path(job_id)
+        lease = {'job': job_id, 'node': self.node, 'token': uuid.uuid4().hex, 'expires_at': time.time() + self.lease_seconds}
+        try:
+            create_exclusive(path, lease)
+            return lease
+        except FileExistsError:
+            pass
+        current = read_json(path)
+        if current is None or current.get('expires_at', 0) > time.time():
+            return None
+        # Expired: move it aside. Only one node's rename succeeds, and a lease renewed in the meantime is put back
+        stale_path = f"{path}.{lease['token']}.stale"
+        try:
+            os.rename(path, stale_path)
+        except FileNotFoundError:
+            return None
+        moved = read_json(stale_path)
+        if moved and moved.get('expires_at', 0) > time.time():
+            try:
+                os.link(stale_path, path)
+            except OSError:
+                pass
+            os.remove(stale_path)
+            return None
+        os.remove(stale_path)
+        logger.warning(f"Lease on job {job_id} held by {current.get('node')} expired, taking it over")
+        try:
+            create_exclusive(path, lease)
+            return lease
+        except FileExistsError:
+            return None
+
+    def renew(self, lease):
+        """
+        Extend a lease; returns False if it was lost. A lease that has lapsed counts as lost even while its file
+        is still ours: another node may be taking it over, and rewriting it would race with that.
+        """
+        path = self.lease_path(lease['job'])
+        current = read_json(path)
+        if not current or current.get('token') != lease['token']:
+            return False
+        if current.get('expires_at', 0) <= time.time():
+            return False
+        lease['expires_at'] = time.time() + self.lease_seconds
+        write_json(path, lease)
+        return True
+
+    def release(self, lease):
+        """Give a lease up, if it is still ours"""
+        path = self.lease_path(lease['job'])
+        current = read_json(path)
+        if current and current.get('token') == lease['token']:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def complete(self, job_id, lease, result):
+        """Record a finished job; a job finished twice (after a lease takeover) keeps the first result"""
+        record = {'id': job_id, 'job': self.get(job_id), 'result': result, 'node': self.node, 'finished_at': time.time()}
+        try:
+            create_exclusive(self.path('done', f"{job_id}.json"), record)
+        except FileExistsError:
+            logger.info(f"Job {job_id} was already finished by another node")
+        self.release(lease)
+
+    def fail(self, job_id, lease, error):
+        """Record a failed attempt; the job is retried until it has failed max_attempts times"""
+        path = self.path('failed', f"{job_id}.json")
+        failure = read_json(path) or {'id': job_id, 'attempts': 0}
+        failure.update({'attempts': failure['attempts'] + 1, 'error': str(error), 'node': self.node, 'failed_at': time.time()})
+        write_json(path, failure)
+        self.release(lease)
+
+    def status(self):
+        """Counts of done, failed (for good), leased and waiting jobs"""
+        done = set(os.listdir(self.path('done')))
+        counts = {'total': 0, 'done': 0, 'failed': 0, 'leased': 0, 'waiting': 0}
+        for job_id in self.job_ids():
+            counts['total'] += 1
+            if f"{job_id}.json" in done:
+                counts['done'] += 1
+            elif self.is_finished(job_id, done):
+                counts['failed'] += 1
+            else:
+                lease = read_json(self.lease_path(job_id))
+                counts['leased' if lease and lease.get('expires_at', 0) > time.time() else 'waiting'] += 1
+        return counts
+
+    def failures(self):
+        """Jobs that failed for good, with their last error"""
+        failed = []
+        for job_id in self.job_ids():
+            failure = read_json(self.path('failed', f"{job_id}.json"))
+            if failure and failure.get('attempts', 0) >= self.max_attempts and not os.path.exists(self.path('done', f"{job_id}.json")):
+                failed.append(dict(failure, job=self.get(job_id)))
+        return failed
+
+    def uncollected(self):
+        """done/ records the collector has not imported yet"""
+        collected = set(os.listdir(self.path('collected')))
+        for name in sorted(os.listdir(self.path('done'))):
+            if name.endswith('.json') and name not in collected:
+                record = read_json(self.path('done', name))
+                if record:
+                    yield record
+
+    def mark_collected(self, job_id):
+        try:
+            create_exclusive(self.path('collected', f"{job_id}.json"), {'id': job_id, 'collected_at': time.time()})
+        except FileExistsError:
+            pass
+
+def remove_stale_partials(outputs, max_age):
+    """Delete partial encodes of finished outputs left behind by nodes that died while encoding them"""
+    for output in outputs:
+        base, ext = os.path.splitext(output)
+        for partial in glob.glob(f"{glob.escape(base)}.partial-*{ext}"):
+            try:
+                # A recent one may belong to a node still finishing a job that was taken over from it
+                if time.time() - os.path.getmtime(partial) > max_age:
+                    os.remove(partial)
+                    logger.debug(f"Removed stale partial video: {partial}")
+            except OSError:
+                pass
+
+def collect_results(job_queue, tracking_db=TRACKING_DB):
+    """
+    Import finished jobs into the tracking store and the output folder's manifest; returns the records imported.
+    Run it on one node only: SQLite must not be shared over a network filesystem. Safe to repeat, since
+    imported records are marked and a combination already in the store is not recorded again.
+    """
+    options = job_queue.options()
+    records = list(job_queue.uncollected())
+    failures = job_queue.failures()
+    if not records and not failures:
+        return []
+    manifest = BatchManifest.load(options['output_folder'])
+    tracking = TrackingStore(tracking_db)
+    try:
+        for record in records:
+            job, result = record['job'], record['result']
+            if options.get('track', True) and not tracking.has_combination(job['artist'], job['song'], job['year']):
+                tracking.record(job['song'], job['artist'], job['year'], job['image'], result['output'])
+            manifest.update(job, ENCODED, save=False, output=result['output'], outputs=result.get('outputs'),
+                            frame=result.get('frame'), error=None, node=record['node'])
+            remove_stale_partials(result.get('outputs') or [result['output']], job_queue.lease_seconds)
+        for failure in failures:
+            manifest.update(failure['job'], FAILED, save=False, error=failure['error'], node=failure['node'])
+        manifest.save()
+    finally:
+        tracking.close()
+    # Marked only once the manifest is saved, so an interrupted collect is simply repeated
+    for record in records:
+        job_queue.mark_collected(record['id'])
+    logger.info(f"Collected {len(records)} finished jobs from {job_queue.folder}")
+    return records
+
+class LeaseKeeper:
+    """Renews a lease in the background while its job runs"""
+
+    def __init__(self, job_queue, lease):
+        self.job_queue = job_queue
+        self.lease = lease
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.job_queue.lease_seconds / 3):
+            if not self.job_queue.renew(self.lease):
+                self.lost = True
+                logger.warning(f"Lost the lease on job {self.lease['job']}; another node may render it too")
+                return
+
+def work_queue(job_queue, renderer_factory, stop_event=None, progress_callback=None, poll_interval=QUEUE_POLL_INTERVAL):
+    """
+    Claim and render jobs until every job is finished (or stop_event is set); returns the number rendered.
+    While other nodes hold the remaining jobs this keeps polling, so a job whose worker died is picked up
+    once its lease expires.
+    """
+    renderer = None
+    rendered = 0
+    try:
+        while not (stop_event and stop_event.is_set()):
+            claimed = job_queue.claim()
+            if claimed is None:
+                status = job_queue.status()
+                if not status['waiting'] and not status['leased']:
+                    break
+                time.sleep(poll_interval)
+                continue
+            job_id, job, lease = claimed
+            if renderer is None:
+                renderer = renderer_factory()
+            if progress_callback:
+                progress_callback(f"[{job_queue.node}] Processing {os.path.basename(job['audio'])}")
+            try:
+                with LeaseKeeper(job_queue, lease):
+                    result = renderer.render(job)
+            except Exception as e:
+                logger.error(f"Job {job_id} ({os.path.basename(job['audio'])}) failed: {e}")
+                job_queue.fail(job_id, lease, e)
+            else:
+                job_queue.complete(job_id, lease, result)
+                rendered += 1
+    finally:
+        if renderer is not None:
+            renderer.close()
+    return rendered
@@ -0,0 +1,43 @@
+# src/core/log.py
+
+import logging
+import sys
+from config.settings import LOG_LEVEL
+
+LOGGER_NAME = 'autovid'
+LOG_FORMAT = '%(levelname)s - %(message)s'
+LOG_LEVELS = ('DEBUG', 'INFO', 'WARNING', 'ERROR', 'OFF')
+
+def get_logger(name=None):
+    """Return the application logger, or a child of it for one module"""
+    return logging.getLogger(f"{LOGGER_NAME}.{name}" if name else LOGGER_NAME)
+
+def configure_logging(level=LOG_LEVEL, stream=None):
+    """
+    Send application log records to stderr (or stream) at the given level.
+    'OFF' silences the application logger entirely.
+    """
+    logger = get_logger()
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    level = str(level).upper()
+    if level == 'OFF':
+        logger.addHandler(logging.NullHandler())
+        logger.setLevel(logging.CRITICAL + 1)
+    else:
+        handler = logging.StreamHandler(stream or sys.stderr)
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        logger.addHandler(handler)
+        logger.setLevel(level)
+    # Records stop here instead of also reaching the root logger's handlers
+    logger.propagate = False
+    return logger
+
+def current_level():
+    """The configured level name, so worker processes can log the same way"""
+    logger = get_logger()
+    if not logger.handlers:
+        return None
+    if logger.level > logging.CRITICAL:
+        return 'OFF'
+    return logging.getLevelName(logger.level)
@@ -0,0 +1,156 @@
+# src/core/manifest.py
+
+import hashlib
+import json
+import os
+import struct
+import threading
+import time
+from core.log import get_logger
+
+logger = get_logger('manifest')
+
+MANIFEST_NAME = 'autovid_manifest.json'
+MANIFEST_VERSION = 1
+
+PENDING = 'pending'
+RENDERED = 'rendered'
+ENCODED = 'encoded'
+FAILED = 'failed'
+
+def fingerprint_file(path, sample_size=64 * 1024):
+    """Cheap content hash: file size plus the first and last 64 KB"""
+    size = os.path.getsize(path)
+    digest = hashlib.sha256(str(size).encode())
+    with open(path, 'rb') as f:
+        digest.update(f.read(sample_size))
+        if size > sample_size:
+            f.seek(max(sample_size, size - sample_size))
+            digest.update(f.read(sample_size))
+    return digest.hexdigest()
+
+def is_complete_mp4(path):
+    """Check that an MP4's top-level boxes span the whole file and include moov and mdat"""
+    try:
+        file_size = os.path.getsize(path)
+        seen = set()
+        with open(path, 'rb') as f:
+            offset = 0
+            while offset < file_size:
+                f.seek(offset)
+                header = f.read(8)
+                if len(header) < 8:
+                    return False
+                box_size, box_type = struct.unpack('>I4s', header)
+                if box_size == 1:
+                    box_size = struct.unpack('>Q', f.read(8))[0]
+                elif box_size == 0:
+                    box_size = file_size - offset
+                if box_size < 8:
+                    return False
+                seen.add(box_type)
+                offset += box_size
+            return offset == file_size and b'moov' in seen and b'mdat' in seen
+    except OSError:
+        return False
+
+class BatchManifest:
+    """
+    Per-item state of a batch, stored as JSON in the output folder.
+    Each audio file moves pending -> rendered -> encoded (or failed) and keeps its metadata,
+    input fingerprints and output path, so an interrupted batch can be resumed.
+    """
+
+    def __init__(self, output_folder):
+        self.path = os.path.join(output_folder, MANIFEST_NAME)
+        self.items = {}
+        self.created_at = time.time()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, output_folder):
+        """Load the manifest of a previous batch, or start an empty one"""
+        manifest = cls(output_folder)
+        try:
+            with open(manifest.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return manifest
+        except ValueError:
+            logger.warning(f"Ignoring unreadable manifest: {manifest.path}")
+            return manifest
+        if data.get('version') == MANIFEST_VERSION:
+            manifest.items = data.get('items', {})
+            manifest.created_at = data.get('created_at', manifest.created_at)
+        return manifest
+
+    def save(self):
+        """Write the manifest atomically"""
+        with self._lock:
+            data = {
+                'version': MANIFEST_VERSION,
+                'created_at': self.created_at,
+                'updated_at': time.time(),
+                'items': self.items,
+            }
+            temp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=4)
+            os.replace(temp_path, self.path)
+
+    def get(self, audio):
+        return self.items.get(os.path.abspath(audio))
+
+    def outputs(self, audio):
+        """Every video recorded for an item: all of its renditions, or its single output"""
+        entry = self.get(audio) or {}
+        if entry.get('outputs'):
+            return list(entry['outputs'])
+        return [entry['output']] if entry.get('output') else []
+
+    def is_done(self, job):
+        """True when the job's videos were encoded from the same inputs, renditions and profile and the files on disk are complete"""
+        entry = self.get(job['audio'])
+        if not entry or entry.get('state') != ENCODED:
+            return False
+        if entry.get('audio_hash') != job.get('audio_hash') or entry.get('image_hash') != job.get('image_hash'):
+            return False
+        if entry.get('renditions') != job.get('renditions') or entry.get('profile') != job.get('profile'):
+            return False
+        outputs = self.outputs(job['audio'])
+        return bool(outputs) and all(os.path.exists(output) and is_complete_mp4(output) for output in outputs)
+
+    def resumable_metadata(self, audio, audio_hash):
+        """Metadata picked for an unfinished item last time, so its output name stays the same"""
+        entry = self.get(audio)
+        if entry and entry.get('audio_hash') == audio_hash and entry.get('song'):
+            return entry
+        return None
+
+    def update(self, job, state, save=True, **fields):
+        """Set an item's state and fields, then persist the manifest"""
+        with self._lock:
+            entry = self.items.setdefault(os.path.abspath(job['audio']), {})
+            entry.update({
+                'audio': job['audio'],
+                'image': job['image'],
+                'song': job['song'],
+                'artist': job['artist'],
+                'year': job['year'],
+                'audio_hash': job.get('audio_hash'),
+                'image_hash': job.get('image_hash'),
+                'renditions': job.get('renditions'),
+                'profile': job.get('profile'),
+            })
+            entry.update(fields)
+            entry['state'] = state
+            entry['updated_at'] = time.time()
+        if save:
+            self.save()
+
+    def counts(self):
+        """Number of items in each state"""
+        counts = {}
+        for entry in self.items.values():
+            counts[entry.get('state')] = counts.get(entry.get('state'), 0) + 1
+        return counts
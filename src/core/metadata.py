@@ -0,0 +1,91 @@
+# src/core/metadata.py
+
+import random
+from config.settings import MIN_YEAR, MAX_YEAR, METADATA_UNIQUE_ARTISTS, METADATA_MAX_ATTEMPTS
+from core.log import get_logger
+from core.tracking_store import combination_key
+
+logger = get_logger('metadata')
+
+class MetadataExhaustedError(RuntimeError):
+    """Every artist/year combination for a song has already been used"""
+
+class MetadataGenerator:
+    """
+    Draws artist names and years that have not been used with a song before.
+    Used combinations (and, with unique_artists, used artist/song pairs) are loaded into sets once per run,
+    so a draw is a few hash lookups however long the history grows. Random draws are tried first; only when
+    those keep hitting used combinations are the song's remaining candidates walked in order, from a random
+    starting point. Every name handed out is added to the index, so one batch cannot collide with itself.
+    """
+
+    def __init__(self, first_names, last_names, used=(), min_year=MIN_YEAR, max_year=MAX_YEAR, seed=None,
+                 unique_artists=METADATA_UNIQUE_ARTISTS, max_attempts=METADATA_MAX_ATTEMPTS, rng=None):
+        if min_year > max_year:
+            raise ValueError(f"MIN_YEAR ({min_year}) is after MAX_YEAR ({max_year})")
+        self.first_names = list(first_names)
+        self.last_names = list(last_names)
+        self.years = [str(year) for year in range(min_year, max_year + 1)]
+        # Pass rng to share one seeded stream with other random choices in the batch
+        self.random = rng or random.Random(seed)
+        self.unique_artists = unique_artists
+        self.max_attempts = max_attempts
+        self.combinations = set()
+        self.artist_songs = set()
+        for artist_name, song_name, year in used:
+            self.add(song_name, artist_name, year)
+
+    @classmethod
+    def from_tracking(cls, tracking, first_names, last_names, **kwargs):
+        """Build a generator whose index holds everything in the tracking store"""
+        return cls(first_names, last_names, used=tracking.used_metadata(), **kwargs)
+
+    def add(self, song_name, artist_name, year):
+        """Mark a combination as used"""
+        self.combinations.add(combination_key(artist_name, song_name, year))
+        self.artist_songs.add((artist_name, song_name))
+
+    def is_used(self, song_name, artist_name, year):
+        if combination_key(artist_name, song_name, year) in self.combinations:
+            return True
+        return self.unique_artists and (artist_name, song_name) in self.artist_songs
+
+    def generate(self, song_name, artist_name=None, year=None):
+        """
+        Return an unused (artist_name, year) for the song and reserve it.
+        A given artist_name or year is kept as is; if both are given the pair is returned even when it
+        was used before, since it was asked for explicitly.
+        """
+        if artist_name is not None and year is not None:
+            if self.is_used(song_name, artist_name, str(year)):
+                logger.warning(f"{artist_name} - {song_name} ({year}) has been used before")
+            self.add(song_name, artist_name, str(year))
+            return artist_name, str(year)
+
+        artists = [artist_name] if artist_name is not None else None
+        years = [str(year)] if year is not None else self.years
+        if artists is None and (not self.first_names or not self.last_names):
+            raise MetadataExhaustedError("No first or last names were loaded to generate artist names from")
+        size = (len(artists) if artists else len(self.first_names) * len(self.last_names)) * len(years)
+
+        def candidate(index):
+            index, year_index = divmod(index, len(years))
+            if artists:
+                return artists[index], years[year_index]
+            first, last = divmod(index, len(self.last_names))
+            return f"{self.first_names[first]} {self.last_names[last]}", years[year_index]
+
+        for _ in range(min(self.max_attempts, size)):
+            artist, draw_year = candidate(self.random.randrange(size))
+            if not self.is_used(song_name, artist, draw_year):
+                self.add(song_name, artist, draw_year)
+                return artist, draw_year
+
+        # Nearly every candidate is taken: walk them all once from a random offset
+        start = self.random.randrange(size)
+        for offset in range(size):
+            artist, draw_year = candidate((start + offset) % size)
+            if not self.is_used(song_name, artist, draw_year):
+                self.add(song_name, artist, draw_year)
+                return artist, draw_year
+        raise MetadataExhaustedError(f"Every artist/year combination for '{song_name}' has already been used")
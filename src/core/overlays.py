@@ -0,0 +1,206 @@
+# src/core/overlays.py
+
+import math
+import subprocess
+import numpy as np
+from PIL import Image
+from config.settings import (OVERLAY_TYPES, OVERLAY_FPS, OVERLAY_AUDIO_RATE, OVERLAY_HEIGHTS, OVERLAY_MARGIN, OVERLAY_GAP,
+                             OVERLAY_COLOR, OVERLAY_OPACITY, OVERLAY_TRACK_OPACITY, STILL_IMAGE_PRESET)
+from core.encoder import get_ffmpeg_binary, can_copy_audio, run_with_progress
+
+def decode_audio(audio_path, rate=OVERLAY_AUDIO_RATE):
+    """Decode an audio file to mono float32 samples at rate, in one ffmpeg pass"""
+    process = subprocess.run(
+        [get_ffmpeg_binary(), '-hide_banner', '-loglevel', 'error', '-i', audio_path,
+         '-vn', '-ac', '1', '-ar', str(rate), '-f', 'f32le', 'pipe:1'],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    if process.returncode != 0:
+        error = process.stderr.decode('utf-8', errors='replace').strip()
+        raise RuntimeError(f"ffmpeg could not decode {audio_path} for overlays: {error}")
+    return np.frombuffer(process.stdout, dtype=np.float32)
+
+def split_even(samples, parts):
+    """The samples as a (parts, n) array, zero-padded at the end so they divide evenly"""
+    size = max(1, math.ceil(len(samples) / parts))
+    padded = np.zeros(parts * size, dtype=np.float32)
+    padded[:len(samples)] = samples[:parts * size]
+    return padded.reshape(parts, size)
+
+def column_peaks(samples, columns):
+    """Peak amplitude of the audio under each pixel column of a waveform, 0..1 of the loudest column"""
+    peaks = np.abs(split_even(samples, columns)).max(axis=1)
+    top = peaks.max()
+    return peaks / top if top > 0 else peaks
+
+def frame_levels(samples, frames):
+    """Loudness (RMS) of each video frame's slice of the audio, 0..1 of the loudest frame"""
+    levels = np.sqrt(np.mean(np.square(split_even(samples, frames)), axis=1))
+    top = levels.max()
+    return levels / top if top > 0 else levels
+
+def tint(base, mask, color=OVERLAY_COLOR, opacity=OVERLAY_OPACITY):
+    """base (H, W, 3) with color blended over it where mask (H, W, 0..1) is set"""
+    alpha = mask[..., None] * opacity
+    blended = base.astype(np.float32)
+    blended += (np.asarray(color, dtype=np.float32) - blended) * alpha
+    return np.rint(blended).astype(np.uint8)
+
+class Overlay:
+    """
+    One animated band of the overlay strip: a full-width bar, lit from the left up to position(frame).
+    prepare() tints the band's area of the frame twice (lit and unlit) once per song; drawing a frame then
+    copies slices of those and blends the one column under the moving edge, so it stays smooth at low fps.
+    """
+
+    def __init__(self, height):
+        self.height = height
+        self.lit = None
+        self.unlit = None
+
+    def analyze(self, samples, frames, fps, duration):
+        """Precompute what position() needs from the audio"""
+        self.fractions = np.minimum(1.0, np.arange(frames) / fps / duration) if duration else np.ones(frames)
+
+    def mask(self, width):
+        return np.ones((self.height, width), dtype=np.float32)
+
+    def position(self, index):
+        """How far the lit part reaches in frame index, 0..1"""
+        return self.fractions[index]
+
+    def prepare(self, base, samples, frames, fps, duration):
+        self.analyze(samples, frames, fps, duration)
+        mask = self.mask(base.shape[1])
+        self.lit = tint(base, mask, opacity=OVERLAY_OPACITY)
+        self.unlit = tint(base, mask, opacity=OVERLAY_TRACK_OPACITY)
+
+    def draw(self, band, index):
+        edge = self.position(index) * band.shape[1]
+        column = int(edge)
+        band[:, :column] = self.lit[:, :column]
+        band[:, column:] = self.unlit[:, column:]
+        if column < band.shape[1] and edge > column:
+            lit, unlit = self.lit[:, column].astype(np.float32), self.unlit[:, column]
+            band[:, column] = np.rint(unlit + (lit - unlit) * (edge - column))
+
+class ProgressOverlay(Overlay):
+    """A progress bar that fills as the song plays"""
+
+class WaveformOverlay(Overlay):
+    """The whole song's waveform, lit up to the play position"""
+
+    def analyze(self, samples, frames, fps, duration):
+        super().analyze(samples, frames, fps, duration)
+        self.samples = samples
+
+    def mask(self, width):
+        # One vectorized pass: each column's peak becomes a bar mirrored around the band's middle
+        half = np.maximum(0.5, column_peaks(self.samples, width) * self.height / 2)
+        rows = np.abs(np.arange(self.height, dtype=np.float32) + 0.5 - self.height / 2)
+        return (rows[:, None] <= half[None, :]).astype(np.float32)
+
+class MeterOverlay(Overlay):
+    """A level meter following the loudness of the audio under each frame"""
+
+    def analyze(self, samples, frames, fps, duration):
+        self.levels = frame_levels(samples, frames)
+
+    def position(self, index):
+        return self.levels[index]
+
+OVERLAY_CLASSES = {'progress': ProgressOverlay, 'waveform': WaveformOverlay, 'meter': MeterOverlay}
+
+def resolve_overlays(names):
+    """Check overlay names against OVERLAY_TYPES; None or empty means no overlays"""
+    unknown = [name for name in names or [] if name not in OVERLAY_TYPES]
+    if unknown:
+        raise ValueError(f"Unknown overlay: {', '.join(unknown)} (choose from {', '.join(OVERLAY_TYPES)})")
+    return list(names or [])
+
+class OverlayStrip:
+    """
+    The overlays of one video, stacked top to bottom in a strip along the bottom of its frame.
+    Everything that depends on the song (waveform, levels, tinted copies of the frame) is computed in
+    prepare(); draw(index) then only updates a reused strip buffer, which is all that is sent to ffmpeg
+    per frame. Sizes scale with the frame's height.
+    """
+
+    def __init__(self, names, frame_size, fps=OVERLAY_FPS):
+        scale = frame_size[1] / 1080
+        even = lambda value: max(2, round(value * scale / 2) * 2)
+        self.fps = fps
+        self.width = frame_size[0] // 2 * 2
+        self.overlays = [OVERLAY_CLASSES[name](even(OVERLAY_HEIGHTS[name])) for name in resolve_overlays(names)]
+        self.rows = []
+        top = 0
+        for overlay in self.overlays:
+            self.rows.append((top, top + overlay.height))
+            top += overlay.height + even(OVERLAY_GAP)
+        self.height = self.rows[-1][1] if self.rows else 0
+        self.y = frame_size[1] // 2 * 2 - even(OVERLAY_MARGIN) - self.height
+        self.frames = 0
+        self.buffer = None
+
+    def prepare(self, frame, samples, rate=OVERLAY_AUDIO_RATE):
+        """Analyse the song's samples against the frame (a PIL image); returns the number of video frames"""
+        duration = len(samples) / rate
+        self.frames = max(1, math.ceil(duration * self.fps))
+        base = np.asarray(frame.convert('RGB'))[self.y:self.y + self.height, :self.width]
+        self.buffer = base.copy()
+        for overlay, (top, bottom) in zip(self.overlays, self.rows):
+            overlay.prepare(self.buffer[top:bottom], samples, self.frames, self.fps, duration)
+        return self.frames
+
+    def draw(self, index):
+        """The strip for video frame index"""
+        for overlay, (top, bottom) in zip(self.overlays, self.rows):
+            overlay.draw(self.buffer[top:bottom], index)
+        return self.buffer
+
+    def write(self, stdin):
+        """Write every frame's strip as raw RGB"""
+        for index in range(self.frames):
+            stdin.write(self.draw(index))
+
+def build_overlay_command(frame_path, audio_path, output_path, strip, video_bitrate=None, preset=STILL_IMAGE_PRESET):
+    """
+    Build the ffmpeg command for a video with overlays: the frame, the strips piped in as raw video on stdin
+    and laid over it at the strip's position, and the audio.
+    The frame is decoded and converted once and repeated by the loop filter; looping the input instead
+    (-loop 1) would decode the PNG again for every video frame, which doubles the encode time.
+    """
+    audio_codec = ['-c:a', 'copy'] if can_copy_audio(audio_path, output_path) else ['-c:a', 'aac', '-b:a', '192k']
+    bitrate = ['-b:v', str(video_bitrate)] if video_bitrate else []
+    # libx264 with yuv420p needs even dimensions; the strip was cut from the same cropped frame
+    frame_filter = "crop=trunc(iw/2)*2:trunc(ih/2)*2,setsar=1,format=yuv420p,loop=loop=-1:size=1"
+    return [
+        get_ffmpeg_binary(), '-hide_banner', '-loglevel', 'error', '-y',
+        '-framerate', str(strip.fps), '-i', frame_path,
+        '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', f"{strip.width}x{strip.height}", '-framerate', str(strip.fps), '-i', 'pipe:0',
+        '-i', audio_path,
+        '-filter_complex', f"[0:v]{frame_filter}[frame];[frame][1:v]overlay=0:{strip.y}:shortest=1:format=yuv420[v]",
+        '-map', '[v]', '-map', '2:a:0',
+        '-c:v', 'libx264', '-preset', preset, *bitrate,
+        '-r', str(strip.fps),
+        *audio_codec,
+        '-shortest', '-movflags', '+faststart',
+        output_path
+    ]
+
+def encode_overlay_video(frame_path, audio_path, output_path, overlays, samples=None, fps=OVERLAY_FPS, video_bitrate=None, on_progress=None):
+    """
+    Encode a frame and an audio file with animated overlays (see OverlayStrip).
+    samples are the audio decoded by decode_audio; pass them to share one decode between several encodes.
+    """
+    if samples is None:
+        samples = decode_audio(audio_path)
+    with Image.open(frame_path) as frame:
+        strip = OverlayStrip(overlays, frame.size, fps)
+        strip.prepare(frame, samples)
+    command = build_overlay_command(frame_path, audio_path, output_path, strip, video_bitrate)
+    returncode, stderr = run_with_progress(command, on_progress or (lambda seconds: None), feed=strip.write)
+    if returncode != 0:
+        error = stderr.decode('utf-8', errors='replace').strip()
+        raise RuntimeError(f"ffmpeg failed to encode {output_path} with overlays: {error}")
+    return output_path
@@ -0,0 +1,119 @@
+# src/core/pipeline.py
+
+import queue
+import threading
+from config.settings import PIPELINE_QUEUE_SIZE
+from core.log import get_logger
+
+logger = get_logger('pipeline')
+
+_DONE = object()
+
+class PipelineCancelled(Exception):
+    """The batch was stopped before this item finished"""
+
+class Stage:
+    """One step of a pipeline: function(item, value) returns the value handed to the next stage"""
+
+    def __init__(self, name, function, workers=1, queue_size=PIPELINE_QUEUE_SIZE):
+        self.name = name
+        self.function = function
+        self.workers = max(1, workers)
+        self.queue_size = max(1, queue_size)
+
+class Pipeline:
+    """
+    Runs items through stages that work concurrently, each on its own threads.
+    Stages are connected by bounded queues, so a slow stage holds the ones before it back (at most
+    queue_size items wait in front of each stage) instead of letting work pile up. Results arrive in the
+    calling thread, in completion order, which keeps writes like tracking commits in one place.
+    An item that raises skips the remaining stages and is reported with its error. Once cancel_event is
+    set no new items are started; items not started yet or waiting between stages are reported with
+    PipelineCancelled.
+    """
+
+    def __init__(self, stages, cancel_event=None):
+        self.stages = list(stages)
+        self.cancel_event = cancel_event or threading.Event()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def run(self, items, on_result, on_error):
+        """
+        Feed items through every stage; calls on_result(item, value) or on_error(item, error) for each.
+        Returns when every item has been reported.
+        """
+        queues = [queue.Queue(maxsize=stage.queue_size) for stage in self.stages]
+        results = queue.Queue(maxsize=self.stages[-1].queue_size)
+        outputs = queues[1:] + [results]
+        remaining = [stage.workers for stage in self.stages]
+        lock = threading.Lock()
+
+        def feed():
+            try:
+                # Items fed after a cancel are not dropped: the first stage passes them on as cancelled, so
+                # every item still reaches on_error
+                for item in items:
+                    queues[0].put((item, None, None))
+            finally:
+                for _ in range(self.stages[0].workers):
+                    queues[0].put(_DONE)
+
+        def work(index):
+            stage = self.stages[index]
+            output = outputs[index]
+            while True:
+                task = queues[index].get()
+                if task is _DONE:
+                    break
+                item, value, error = task
+                if error is None and self.cancelled:
+                    error = PipelineCancelled(f"Stopped before {stage.name}")
+                if error is None:
+                    try:
+                        value = stage.function(item, value)
+                    except Exception as e:
+                        error = e
+                output.put((item, value, error))
+            # The stage's last thread to finish tells the next stage there is nothing more to come
+            with lock:
+                remaining[index] -= 1
+                last = remaining[index] == 0
+            if last:
+                for _ in range(self.stages[index + 1].workers if index + 1 < len(self.stages) else 1):
+                    output.put(_DONE)
+
+        threads = [threading.Thread(target=feed, name='pipeline-feed', daemon=True)]
+        for index, stage in enumerate(self.stages):
+            threads += [threading.Thread(target=work, args=(index,), name=f"pipeline-{stage.name}-{n}", daemon=True)
+                        for n in range(stage.workers)]
+        for thread in threads:
+            thread.start()
+
+        failure = None
+        while True:
+            task = results.get()
+            if task is _DONE:
+                break
+            item, value, error = task
+            if failure is not None:
+                continue
+            try:
+                if error is None:
+                    on_result(item, value)
+                else:
+                    on_error(item, error)
+            except BaseException as e:
+                # Stop the batch, but keep draining so no stage thread is left blocked on a full queue
+                logger.error(f"Pipeline stopped: {e}")
+                failure = e
+                self.cancel()
+        for thread in threads:
+            thread.join()
+        if failure is not None:
+            raise failure
@@ -0,0 +1,233 @@
+# src/core/planner.py
+
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from config.settings import CALIBRATION_FILE, CALIBRATION_SAMPLE_SECONDS, CALIBRATION_HISTORY_SECONDS
+from core.encoder import get_ffmpeg_binary
+from core.log import get_logger
+from core.progress import format_duration
+
+logger = get_logger('planner')
+
+CALIBRATION_VERSION = 1
+
+def calibration_key(encoder, backend, renditions=None, profile=None):
+    """Which measurements apply to a batch: frames and encodes cost differ per encoder, renderer and output set"""
+    return '|'.join([profile or encoder, backend or 'none', ','.join(renditions or []) or 'single'])
+
+def format_size(size):
+    """Format a byte count as 512 KB, 3.4 MB or 1.20 GB"""
+    if size is None:
+        return "--"
+    if size >= 1024 ** 3:
+        return f"{size / 1024 ** 3:.2f} GB"
+    if size >= 1024 ** 2:
+        return f"{size / 1024 ** 2:.1f} MB"
+    return f"{max(1, round(size / 1024))} KB"
+
+class Calibration:
+    """
+    Per-machine speed measurements, stored between runs as JSON.
+    Each entry (see calibration_key) holds the seconds to render one frame, the time a renderer takes to
+    start, and a single encode's fixed overhead plus its speed in audio seconds per wall second, and the
+    output bytes per audio second. Entries come from sample encodes and are refined by every finished batch.
+    """
+
+    def __init__(self, path=CALIBRATION_FILE):
+        self.path = path
+        self.entries = {}
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except ValueError:
+            logger.warning(f"Ignoring unreadable calibration file: {self.path}")
+            return
+        if data.get('version') == CALIBRATION_VERSION:
+            self.entries = data.get('entries', {})
+
+    def save(self):
+        """Write the calibration atomically"""
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': CALIBRATION_VERSION, 'entries': self.entries}, f, indent=4)
+        os.replace(temp_path, self.path)
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def update(self, key, audio_seconds, source, **rates):
+        """
+        Blend new measurements (over audio_seconds of audio) into the entry.
+        Older measurements weigh as much as the audio behind them, up to CALIBRATION_HISTORY_SECONDS, so
+        the entry follows the machine as it changes without jumping on one odd batch.
+        """
+        rates = {name: value for name, value in rates.items() if value is not None}
+        if not rates or audio_seconds <= 0:
+            return
+        entry = self.entries.setdefault(key, {'audio_seconds': 0.0})
+        history = min(entry.get('audio_seconds', 0.0), CALIBRATION_HISTORY_SECONDS)
+        weight = audio_seconds / (audio_seconds + history)
+        for name, value in rates.items():
+            previous = entry.get(name)
+            entry[name] = value if previous is None else previous + (value - previous) * weight
+        entry['audio_seconds'] = entry.get('audio_seconds', 0.0) + audio_seconds
+        entry['source'] = source
+        entry['updated_at'] = time.time()
+
+def cut_sample(audio_path, destination, seconds=CALIBRATION_SAMPLE_SECONDS):
+    """Copy the first seconds of an audio file (no re-encode) for a calibration encode"""
+    process = subprocess.run(
+        [get_ffmpeg_binary(), '-hide_banner', '-loglevel', 'error', '-y', '-i', audio_path,
+         '-t', str(seconds), '-map', '0:a', '-c', 'copy', destination],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    if process.returncode != 0:
+        error = process.stderr.decode('utf-8', errors='replace').strip()
+        raise RuntimeError(f"ffmpeg could not cut a calibration sample from {audio_path}: {error}")
+    return destination
+
+def measure_sample(renderer_factory, job, short_job):
+    """
+    Render and encode sample jobs in a throwaway renderer and time them.
+    Two frames are rendered so the renderer's start-up (e.g. launching the browser) can be told apart from
+    the cost of a frame, and two lengths of audio are encoded so ffmpeg's fixed start-up cost can be told
+    apart from its speed. Returns the rates for Calibration.update.
+    """
+    started = time.perf_counter()
+    renderer = renderer_factory()
+    try:
+        renderer.render_frames(job)
+        first_frame = time.perf_counter() - started
+        frame_started = time.perf_counter()
+        frames = renderer.render_frames(dict(job, song=f"{job['song']} 2"))
+        frame_seconds = time.perf_counter() - frame_started
+        timings = []
+        for sample_job in (short_job, job):
+            encode_started = time.perf_counter()
+            rendered = renderer.encode(sample_job, frames)
+            timings.append(time.perf_counter() - encode_started)
+        size = sum(os.path.getsize(path) for path in rendered['outputs'])
+    finally:
+        renderer.close()
+    # encode time = overhead + duration / speed, through the two measured points
+    (short_seconds, long_seconds), extra_audio = timings, job['duration'] - short_job['duration']
+    if extra_audio > 0 and long_seconds > short_seconds:
+        speed = extra_audio / (long_seconds - short_seconds)
+        overhead = max(0.0, short_seconds - short_job['duration'] / speed)
+    else:
+        speed, overhead = job['duration'] / long_seconds, 0.0
+    return {
+        'frame_seconds': frame_seconds,
+        'startup_seconds': max(0.0, first_frame - frame_seconds),
+        'encode_overhead': overhead,
+        'encode_speed': speed,
+        'bytes_per_second': size / job['duration'],
+    }
+
+def calibrate(calibration, key, renderer_options, renderer_class, image_path, audio_path, duration_probe, seconds=CALIBRATION_SAMPLE_SECONDS):
+    """Measure this machine with short samples of the batch's own inputs and store the result under key"""
+    temp_dir = tempfile.mkdtemp(prefix='autovid-calibrate-')
+    try:
+        extension = os.path.splitext(audio_path)[1]
+        sample = cut_sample(audio_path, os.path.join(temp_dir, f"sample{extension}"), seconds)
+        short_sample = cut_sample(audio_path, os.path.join(temp_dir, f"short{extension}"), max(1, seconds // 4))
+        duration = duration_probe(sample)
+        short_duration = duration_probe(short_sample)
+        if not duration or not short_duration:
+            raise RuntimeError(f"Could not read the duration of the calibration samples from {audio_path}")
+        options = dict(renderer_options, output_folder=temp_dir, screenshots_dir=temp_dir, frame_cache=False, trace_path=None)
+
+        def renderer_factory():
+            renderer = renderer_class(**options)
+            # A cached segment would make the sample encode look free
+            renderer.segment_cache = None
+            return renderer
+        job = {'audio': sample, 'image': image_path, 'song': 'Calibration', 'artist': 'AutoVid', 'year': '2000',
+               'audio_hash': None, 'duration': duration}
+        short_job = dict(job, audio=short_sample, song='Calibration short', duration=short_duration)
+        logger.info(f"Calibrating with {format_duration(short_duration)} and {format_duration(duration)} samples of {os.path.basename(audio_path)}")
+        rates = measure_sample(renderer_factory, job, short_job)
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    calibration.update(key, duration, 'sample', **rates)
+    calibration.save()
+    return calibration.get(key)
+
+def estimate_batch(items, entry, workers=1, render_threads=1, encode_threads=1, cpus=None):
+    """
+    Estimate wall time and disk use of a batch from a calibration entry.
+    items are the planned jobs still to do (with 'duration'). With several worker processes, work is
+    spread over min(workers, cpus) cores; with one, rendering and encoding overlap, so the slower stage
+    sets the pace. Frames are assumed not to be in the frame cache, so the estimate errs long.
+    """
+    cpus = cpus or os.cpu_count() or 1
+    frame_seconds = entry.get('frame_seconds') or 0.0
+    speed = entry.get('encode_speed')
+    overhead = entry.get('encode_overhead') or 0.0
+    per_item = []
+    for item in items:
+        duration = item.get('duration')
+        encode = overhead + duration / speed if duration and speed else None
+        size = duration * entry['bytes_per_second'] if duration and entry.get('bytes_per_second') else None
+        per_item.append({'frame_seconds': frame_seconds, 'encode_seconds': encode, 'bytes': size})
+
+    known = [item for item in per_item if item['encode_seconds'] is not None]
+    frames = frame_seconds * len(per_item)
+    encodes = sum(item['encode_seconds'] for item in known)
+    if workers > 1 and len(per_item) > 1:
+        seconds = (frames + encodes) / min(workers, cpus, len(per_item))
+    else:
+        seconds = max(frames / max(1, render_threads), encodes / min(max(1, encode_threads), cpus)) + (frame_seconds if per_item else 0.0)
+    seconds += entry.get('startup_seconds') or 0.0
+    return {
+        'seconds': round(seconds, 1) if per_item else 0.0,
+        'bytes': int(sum(item['bytes'] for item in per_item if item['bytes'] is not None)),
+        'unknown': len(per_item) - len(known),
+        'items': per_item,
+    }
+
+def format_plan(report):
+    """Text form of VideoCreator.plan()'s report"""
+    lines = [f"Plan: {report['count']} songs to render ({report['done']} already done) -> {report['output_folder']}"]
+    for item in report['items']:
+        if item['state'] == 'done':
+            state = "already done"
+        elif not item['duration']:
+            state = "duration unknown"
+        elif item['encode_seconds'] is None:
+            state = "not estimated"
+        else:
+            state = f"~{format_duration(item['encode_seconds'])}, ~{format_size(item['bytes'])}"
+        duration = format_duration(item['duration']) if item['duration'] else "--"
+        lines.append(f"  {os.path.basename(item['audio'])} [{duration}] {item['artist']} - {item['song']} ({item['year']})"
+                     f" -> {', '.join(os.path.basename(output) for output in item['outputs'])} ({state})")
+    if report['unreadable']:
+        lines.append(f"Unreadable audio (will fail): {', '.join(os.path.basename(path) for path in report['unreadable'])}")
+    for collision in report['collisions']:
+        lines.append(f"Collision: {collision}")
+    estimate = report['estimate']
+    calibration = report['calibration']
+    if calibration:
+        basis = (f"{calibration.get('encode_speed', 0):.1f}x realtime per encode after {calibration.get('encode_overhead', 0):.1f}s start-up,"
+                 f" {calibration.get('frame_seconds', 0):.2f}s per frame;"
+                 f" from {calibration.get('source')} measurements of {format_duration(calibration.get('audio_seconds'))} of audio")
+        lines.append(f"Estimated time: {format_duration(estimate['seconds'])} for {format_duration(report['audio_seconds'])} of audio ({basis})")
+        disk = f"Estimated disk: {format_size(estimate['bytes'])}"
+        if report['free_bytes'] is not None:
+            disk += f" of {format_size(report['free_bytes'])} free"
+        lines.append(disk)
+    else:
+        lines.append("No calibration for these settings yet: run without --no-calibrate, or finish one batch, to get estimates")
+    for warning in report['warnings']:
+        lines.append(f"Warning: {warning}")
+    return "\n".join(lines)
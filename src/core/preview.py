@@ -0,0 +1,154 @@
+# src/core/preview.py
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from collections import OrderedDict
+from PIL import Image, ImageOps
+from config.settings import PREVIEW_SIZE, PREVIEW_CACHE_ITEMS
+from core.browser import start_chrome_driver
+from core.compositor import Compositor, resolve_backend, layout_path_for, fit_image
+from core.encoder import resolve_renditions
+from core.ingest import ImageIngest
+from core.log import get_logger
+from core.utils import find_template_asset, TEMPLATE_ASSETS
+
+logger = get_logger('preview')
+
+# Shown in place of metadata the user has not entered yet
+SAMPLE_SONG = "Sample Song"
+SAMPLE_ARTIST = "Sample Artist"
+SAMPLE_YEAR = "1984"
+
+def file_stamp(path):
+    """A file's path, mtime and size (None when it is missing); changes whenever the file is edited"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return [path, None, None]
+    return [os.path.abspath(path), stat.st_mtime_ns, stat.st_size]
+
+def template_stamp(html_template, rendition=None):
+    """Stamps of every file a template's frame is rendered from: the page, its layouts and its image assets"""
+    paths = [html_template, layout_path_for(html_template)]
+    if rendition:
+        paths.append(layout_path_for(html_template, rendition['name']))
+    for name in TEMPLATE_ASSETS:
+        paths += [find_template_asset(name, os.path.dirname(html_template)), find_template_asset(name)]
+    return [file_stamp(path) for path in paths if path]
+
+class TemplatePreview:
+    """
+    Renders a template's title card at reduced size, so a template can be checked without an encode.
+    Pillow layouts are composited at preview size directly; browser templates are screenshotted on a browser
+    that stays open between previews, then scaled down. Previews are kept in memory by the template's files,
+    the cover and the metadata, so returning to earlier input is instant and editing a template file renders
+    it again.
+    """
+
+    def __init__(self, size=PREVIEW_SIZE, cache_items=PREVIEW_CACHE_ITEMS, driver_factory=start_chrome_driver):
+        self.size = tuple(size)
+        self.cache_items = cache_items
+        self.driver_factory = driver_factory
+        self.previews = OrderedDict()
+        self.compositors = {}
+        self.renderer = None
+        self.renderer_stamp = None
+        # Covers and template assets are scaled down once and cached on disk; a square bound leaves enough
+        # pixels for any image box in the preview
+        self.ingest = ImageIngest(max_size=(self.size[0], self.size[0]))
+        self.temp_dir = tempfile.mkdtemp(prefix='autovid-preview-')
+        self._sample_cover = None
+
+    def close(self):
+        """Quit the preview browser and remove the temp dir"""
+        if self.renderer is not None:
+            self.renderer.close()
+            self.renderer = None
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def render(self, html_template, image_path=None, song_name=None, artist_name=None, year=None, backend='auto', renditions=None):
+        """
+        Preview a template (the cover alone when there is none) with the given cover and metadata; missing
+        values are filled with samples. With renditions, the first one is previewed.
+        Returns a dict with the RGB 'image', the 'backend' used, whether it was 'cached' and the 'seconds' taken.
+        """
+        started = time.perf_counter()
+        image_path = image_path or self.sample_cover()
+        song_name = song_name or SAMPLE_SONG
+        artist_name = artist_name or SAMPLE_ARTIST
+        year = year or SAMPLE_YEAR
+        backend = resolve_backend(html_template, backend)
+        rendition = (resolve_renditions(renditions) or [None])[0]
+        stamp = template_stamp(html_template, rendition) if backend else None
+
+        key = hashlib.sha1(json.dumps([
+            stamp, backend, rendition['name'] if rendition else None, file_stamp(image_path),
+            song_name, artist_name, year, self.size
+        ]).encode()).hexdigest()
+        image = self.previews.get(key)
+        cached = image is not None
+        if cached:
+            self.previews.move_to_end(key)
+        else:
+            image = self.render_frame(html_template, backend, stamp, image_path, song_name, artist_name, year, rendition)
+            self.previews[key] = image
+            while len(self.previews) > self.cache_items:
+                self.previews.popitem(last=False)
+        seconds = time.perf_counter() - started
+        logger.debug(f"Preview of {html_template or 'no template'} ({backend}): {'cached' if cached else f'{seconds * 1000:.0f} ms'}")
+        return {'image': image, 'backend': backend, 'cached': cached, 'seconds': seconds}
+
+    def render_frame(self, html_template, backend, stamp, image_path, song_name, artist_name, year, rendition):
+        cover = self.ingest.prepare(image_path)
+        if backend == 'pillow':
+            image = self.compositor(html_template, stamp, rendition).render(cover, song_name, artist_name, year)
+        elif backend == 'browser':
+            renderer = self.browser_renderer(html_template, stamp)
+            with Image.open(renderer.render_frame(cover, song_name, artist_name, year, rendition=rendition)) as frame:
+                image = frame.convert('RGB')
+        else:
+            with Image.open(cover) as frame:
+                image = ImageOps.exif_transpose(frame).convert('RGB')
+            if rendition:
+                image = fit_image(image, tuple(rendition['size']))
+        if image.width > self.size[0] or image.height > self.size[1]:
+            image = ImageOps.contain(image, self.size, Image.LANCZOS)
+        return image
+
+    def compositor(self, html_template, stamp, rendition):
+        """A compositor for the layout at preview size, rebuilt when any of the template's files changes"""
+        name = rendition['name'] if rendition else None
+        entry = self.compositors.get((html_template, name))
+        if entry is None or entry[0] != stamp:
+            compositor = Compositor.from_template(html_template, name, rendition['size'] if rendition else None,
+                                                  fit_within=self.size, prepare_image=self.ingest.prepare)
+            entry = self.compositors[(html_template, name)] = (stamp, compositor)
+        return entry[1]
+
+    def browser_renderer(self, html_template, stamp):
+        """A renderer whose browser is kept open across previews; the page is parsed again when it changes"""
+        # Imported here so Pillow previews never load the batch pipeline
+        from core.creator import VideoRenderer
+
+        if self.renderer is not None and self.renderer.html_template != html_template:
+            self.renderer.close()
+            self.renderer = None
+        if self.renderer is None:
+            self.renderer = VideoRenderer(html_template, self.temp_dir, self.temp_dir, driver_factory=self.driver_factory,
+                                          backend='browser', frame_cache=False, prescale=False)
+        elif self.renderer_stamp != stamp:
+            self.renderer.load_template()
+        self.renderer_stamp = stamp
+        return self.renderer
+
+    def sample_cover(self):
+        """A placeholder cover for when no image has been picked yet"""
+        if self._sample_cover is None:
+            gradient = Image.linear_gradient('L').resize((self.size[0], self.size[0]))
+            self._sample_cover = os.path.join(self.temp_dir, 'sample_cover.png')
+            ImageOps.colorize(gradient, '#483D8B', '#7B68EE').save(self._sample_cover)
+        return self._sample_cover
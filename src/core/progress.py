@@ -0,0 +1,148 @@
+# src/core/progress.py
+
+import os
+import threading
+import time
+from config.settings import PROGRESS_INTERVAL
+
+def throttle(callback, min_interval=PROGRESS_INTERVAL, clock=time.monotonic):
+    """Wrap callback so calls closer together than min_interval are dropped"""
+    last = [None]
+
+    def throttled(*args):
+        now = clock()
+        if last[0] is not None and now - last[0] < min_interval:
+            return
+        last[0] = now
+        callback(*args)
+    return throttled
+
+def format_duration(seconds):
+    """Format seconds as 1h02m, 3m20s or 45s"""
+    if seconds is None:
+        return "--"
+    seconds = int(round(seconds))
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f"{hours}h{minutes:02d}m"
+    if minutes:
+        return f"{minutes}m{seconds:02d}s"
+    return f"{seconds}s"
+
+def format_event(event):
+    """One-line text form of a progress event, for the CLI and the status label"""
+    if event['kind'] == 'finished':
+        return (f"Done {event['completed']}/{event['total']} ({event['failed']} failed) in {format_duration(event['elapsed'])}"
+                f" | {event['throughput']:.1f}x realtime")
+    line = f"[{event['index']}/{event['total']}] {event['item']}"
+    if event['kind'] == 'failed':
+        line += " failed"
+    elif event['item_percent'] is not None:
+        line += f" {event['item_percent']:.0f}%"
+    line += f" | batch {event['percent']:.0f}%"
+    if event['throughput']:
+        line += f" | {event['throughput']:.1f}x realtime"
+    return line + f" | ETA {format_duration(event['eta'])}"
+
+class ProgressTracker:
+    """
+    Turns per-item encode progress into batch progress events.
+    Each item is weighted by its audio length, so batch percent, throughput (audio seconds encoded per wall
+    second) and ETA stay meaningful when songs differ in length or several are encoded at once.
+    Item start, finish and failure events are always sent; in-between updates are rate-limited to
+    min_interval so a fast encoder cannot flood a UI event loop.
+    """
+
+    def __init__(self, jobs, callback, min_interval=PROGRESS_INTERVAL, clock=time.monotonic):
+        self.callback = callback
+        self.min_interval = min_interval
+        self.clock = clock
+        known = [job['duration'] for job in jobs if job.get('duration')]
+        fallback = sum(known) / len(known) if known else 1.0
+        self.durations = {job['audio']: job.get('duration') or fallback for job in jobs}
+        # Items are numbered in the order they start, which is not the plan order when a pool reorders them
+        self.index = {}
+        self.total_seconds = sum(self.durations.values())
+        self.total = len(jobs)
+        self.in_flight = {}
+        self.finished = set()
+        self.done_seconds = 0.0
+        self.completed = 0
+        self.failed = 0
+        self.started_at = clock()
+        self._last_emit = None
+        self._lock = threading.Lock()
+
+    def start(self, audio):
+        self.update(audio, 0.0, force=True)
+
+    def update(self, audio, seconds, force=False):
+        """Record that seconds of an item's audio have been encoded"""
+        with self._lock:
+            # Updates from a worker can arrive after the item's result; those are stale
+            if audio not in self.durations or audio in self.finished:
+                return
+            if audio not in self.index:
+                self.index[audio] = len(self.index) + 1
+            self.in_flight[audio] = min(max(seconds, 0.0), self.durations[audio])
+            now = self.clock()
+            if not force and self._last_emit is not None and now - self._last_emit < self.min_interval:
+                return
+            self._last_emit = now
+            event = self.event('start' if force else 'progress', audio, now)
+        self.callback(event)
+
+    def finish(self, audio, success=True):
+        """Mark an item done (or failed); its audio counts as processed either way"""
+        with self._lock:
+            # An item can fail before its encode ever started (e.g. its frame did not render)
+            if audio in self.durations and audio not in self.index:
+                self.index[audio] = len(self.index) + 1
+            self.in_flight.pop(audio, None)
+            self.finished.add(audio)
+            self.done_seconds += self.durations.get(audio, 0.0)
+            self.completed += 1 if success else 0
+            self.failed += 0 if success else 1
+            now = self.clock()
+            self._last_emit = now
+            event = self.event('done' if success else 'failed', audio, now)
+        self.callback(event)
+
+    def cancel(self, audio):
+        """Drop an item the batch was stopped before finishing; it counts as neither done nor failed"""
+        with self._lock:
+            self.in_flight.pop(audio, None)
+            self.finished.add(audio)
+
+    def close(self):
+        """Send the final batch event"""
+        with self._lock:
+            event = self.event('finished', None, self.clock())
+        self.callback(event)
+
+    def event(self, kind, audio, now):
+        processed = self.done_seconds + sum(self.in_flight.values())
+        elapsed = now - self.started_at
+        throughput = processed / elapsed if elapsed > 0 else 0.0
+        remaining = self.total_seconds - processed
+        item_percent = None
+        if audio in self.in_flight:
+            item_percent = 100.0 * self.in_flight[audio] / self.durations[audio]
+        elif audio is not None:
+            item_percent = 100.0
+        return {
+            'kind': kind,
+            'item': os.path.basename(audio) if audio else None,
+            'index': self.index.get(audio),
+            'total': self.total,
+            'completed': self.completed,
+            'failed': self.failed,
+            'item_percent': round(item_percent, 1) if item_percent is not None else None,
+            'percent': round(100.0 * processed / self.total_seconds, 1) if self.total_seconds else 100.0,
+            'audio_seconds': round(processed, 3),
+            'total_audio_seconds': round(self.total_seconds, 3),
+            'elapsed': round(elapsed, 3),
+            'throughput': round(throughput, 3),
+            'eta': round(remaining / throughput, 1) if throughput > 0 and remaining > 0 else (0.0 if remaining <= 0 else None),
+        }
@@ -0,0 +1,147 @@
+# src/core/trace.py
+
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; spans are recorded without rusage figures
+    resource = None
+
+TRACE_NAME = 'autovid_trace.jsonl'
+
+def _rusage(who):
+    if resource is None:
+        return None
+    return resource.getrusage(who)
+
+def _rss_bytes(maxrss):
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return maxrss if sys.platform == 'darwin' else maxrss * 1024
+
+class Tracer:
+    """
+    Records timed spans as JSON lines: wall time, CPU time of this process and of its finished child
+    processes (ffmpeg), and peak RSS. Peak RSS is the process high-water mark when the span ends, so it only
+    rises through a batch. Several worker processes can append to the same file; each span is one write.
+    A tracer without a path records nothing.
+    """
+
+    def __init__(self, path=None, **fields):
+        self.path = path
+        self.fields = fields
+        # Fields from context() are per thread, so concurrent pipeline stages tag their own video
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    @property
+    def enabled(self):
+        return bool(self.path)
+
+    @contextmanager
+    def context(self, **fields):
+        """Attach fields (e.g. the video being rendered) to every span recorded inside the block"""
+        previous = getattr(self._local, 'fields', {})
+        self._local.fields = dict(previous, **fields)
+        try:
+            yield
+        finally:
+            self._local.fields = previous
+
+    @contextmanager
+    def span(self, stage, **fields):
+        """Time the block as one stage"""
+        if not self.path:
+            yield
+            return
+        started_at = time.time()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        children_start = _rusage(resource.RUSAGE_CHILDREN) if resource else None
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            record = dict(self.fields, **getattr(self._local, 'fields', {}))
+            record.update(fields)
+            record.update({
+                'stage': stage,
+                'pid': os.getpid(),
+                'started_at': round(started_at, 6),
+                'wall': round(time.perf_counter() - wall_start, 6),
+                'cpu': round(time.process_time() - cpu_start, 6),
+                'error': error,
+            })
+            if resource is not None:
+                own = _rusage(resource.RUSAGE_SELF)
+                children = _rusage(resource.RUSAGE_CHILDREN)
+                record['child_cpu'] = round(
+                    (children.ru_utime + children.ru_stime) - (children_start.ru_utime + children_start.ru_stime), 6
+                )
+                record['peak_rss'] = _rss_bytes(own.ru_maxrss)
+                record['child_peak_rss'] = _rss_bytes(children.ru_maxrss)
+            self.write(record)
+
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+
+def load_trace(path, **filters):
+    """Read a trace file, keeping only records whose fields match filters"""
+    records = []
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # A line cut short by a crash
+                if all(record.get(key) == value for key, value in filters.items()):
+                    records.append(record)
+    except FileNotFoundError:
+        pass
+    return records
+
+def summarize(records):
+    """Per-stage totals, in the order stages first appear"""
+    stages = {}
+    for record in records:
+        row = stages.setdefault(record['stage'], {
+            'stage': record['stage'], 'count': 0, 'errors': 0, 'wall_total': 0.0, 'wall_max': 0.0,
+            'cpu_total': 0.0, 'child_cpu_total': 0.0, 'peak_rss': 0,
+        })
+        row['count'] += 1
+        row['errors'] += 1 if record.get('error') else 0
+        row['wall_total'] += record['wall']
+        row['wall_max'] = max(row['wall_max'], record['wall'])
+        row['cpu_total'] += record.get('cpu') or 0
+        row['child_cpu_total'] += record.get('child_cpu') or 0
+        row['peak_rss'] = max(row['peak_rss'], record.get('peak_rss') or 0, record.get('child_peak_rss') or 0)
+    rows = []
+    for row in stages.values():
+        row['wall_mean'] = row['wall_total'] / row['count']
+        for key in ('wall_total', 'wall_max', 'wall_mean', 'cpu_total', 'child_cpu_total'):
+            row[key] = round(row[key], 4)
+        rows.append(row)
+    return rows
+
+def format_table(rows):
+    """Render summarize() rows as a fixed-width text table"""
+    lines = [f"{'stage':<16} {'count':>5} {'total s':>9} {'mean s':>8} {'max s':>8} {'cpu s':>8} {'child cpu s':>11} {'peak MB':>8}"]
+    for row in rows:
+        lines.append(
+            f"{row['stage']:<16} {row['count']:>5} {row['wall_total']:>9.3f} {row['wall_mean']:>8.3f} {row['wall_max']:>8.3f} "
+            f"{row['cpu_total']:>8.3f} {row['child_cpu_total']:>11.3f} {row['peak_rss'] / (1024 * 1024):>8.1f}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,149 @@
+# src/core/tracking_store.py
+
+import os
+import sqlite3
+import threading
+import time
+from config.settings import TRACKING_DB, TRACKING_FILE
+from core.utils import load_tracking
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS videos (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    song TEXT NOT NULL,
+    artist TEXT NOT NULL,
+    year TEXT NOT NULL,
+    combination TEXT NOT NULL,
+    image TEXT,
+    output TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS videos_song ON videos (song);
+CREATE INDEX IF NOT EXISTS videos_combination ON videos (combination);
+CREATE INDEX IF NOT EXISTS videos_artist ON videos (artist);
+CREATE INDEX IF NOT EXISTS videos_image ON videos (image);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+def combination_key(artist_name, song_name, year):
+    """The artist_song_year string used to identify a metadata combination"""
+    return f"{artist_name}_{song_name}_{year}"
+
+class TrackingStore:
+    """
+    SQLite-backed record of every video created.
+    Each video is committed as its own row as soon as it is done, so a crash only loses the video in flight.
+    Lookups by song, artist/song/year combination and image use indexes instead of scanning.
+    The database runs in WAL mode, so several processes can write to it at once.
+    """
+
+    def __init__(self, db_path=TRACKING_DB, json_path=TRACKING_FILE, timeout=30):
+        self.db_path = db_path
+        self.json_path = json_path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.conn = sqlite3.connect(db_path, timeout=timeout, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.migrate_json()
+
+    def migrate_json(self):
+        """Import the legacy tracking.json once; later runs skip it"""
+        if self.get_meta('json_migrated') or not os.path.exists(self.json_path):
+            return 0
+        with self._lock:
+            # IMMEDIATE takes the write lock up front, so only one process imports the file
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                if self.conn.execute("SELECT 1 FROM meta WHERE key = 'json_migrated'").fetchone():
+                    self.conn.execute("COMMIT")
+                    return 0
+                tracking_data = load_tracking(self.json_path)
+                rows = [
+                    (entry['song'], entry['artist'], entry['year'],
+                     combination_key(entry['artist'], entry['song'], entry['year']),
+                     entry.get('image'), None, 0)
+                    for entry in tracking_data.get('images', [])
+                ]
+                self.conn.executemany(
+                    "INSERT INTO videos (song, artist, year, combination, image, output, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+                self.conn.execute("INSERT INTO meta (key, value) VALUES ('json_migrated', ?)", (str(time.time()),))
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+        return len(rows)
+
+    def get_meta(self, key):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def record(self, song_name, artist_name, year, image, output=None):
+        """Write one video's row and commit it immediately"""
+        with self._lock:
+            self.conn.execute(
+                "INSERT INTO videos (song, artist, year, combination, image, output, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (song_name, artist_name, str(year), combination_key(artist_name, song_name, year),
+                 os.path.basename(image) if image else None, output, time.time())
+            )
+
+    def has_song(self, song_name):
+        return self._exists("SELECT 1 FROM videos WHERE song = ? LIMIT 1", (song_name,))
+
+    def has_combination(self, artist_name, song_name, year):
+        return self._exists("SELECT 1 FROM videos WHERE combination = ? LIMIT 1", (combination_key(artist_name, song_name, year),))
+
+    def has_artist(self, artist_name):
+        return self._exists("SELECT 1 FROM videos WHERE artist = ? LIMIT 1", (artist_name,))
+
+    def has_image(self, image):
+        return self._exists("SELECT 1 FROM videos WHERE image = ? LIMIT 1", (os.path.basename(image),))
+
+    def _exists(self, query, params):
+        with self._lock:
+            return self.conn.execute(query, params).fetchone() is not None
+
+    def count(self):
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM videos").fetchone()[0]
+
+    def combinations(self):
+        """Yield every used artist_song_year combination"""
+        with self._lock:
+            rows = self.conn.execute("SELECT DISTINCT combination FROM videos").fetchall()
+        for (combination,) in rows:
+            yield combination
+
+    def artists(self):
+        """Yield every artist name that has been used"""
+        with self._lock:
+            rows = self.conn.execute("SELECT DISTINCT artist FROM videos").fetchall()
+        for (artist,) in rows:
+            yield artist
+
+    def used_metadata(self):
+        """Yield every distinct (artist, song, year) that has been used"""
+        with self._lock:
+            rows = self.conn.execute("SELECT DISTINCT artist, song, year FROM videos").fetchall()
+        for row in rows:
+            yield row
+
+    def to_dict(self):
+        """Export in the legacy tracking.json layout"""
+        with self._lock:
+            rows = self.conn.execute("SELECT song, artist, year, image FROM videos ORDER BY id").fetchall()
+        return {
+            'songs': [song for song, _, _, _ in rows],
+            'combinations': [combination_key(artist, song, year) for song, artist, year, _ in rows],
+            'images': [{'song': song, 'artist': artist, 'year': year, 'image': image} for song, artist, year, image in rows],
+        }
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
@@ -1,8 +1,15 @@
 # src/core/utils.py
 
 import json
+import os
 import re
-from config.settings import NAMES_FILE, TRACKING_FILE
+from config.settings import NAMES_FILE, TEMPLATE_DIR
+from core.log import get_logger
+
+logger = get_logger('utils')
+
+# Image assets a template can reference by name, looked up in TEMPLATE_DIR
+TEMPLATE_ASSETS = ('container_background', 'photo_background', 'logo')
 
 def sanitize_filename(name):
     """Sanitize the filename by removing unsafe characters and replacing spaces"""
@@ -14,6 +21,14 @@ def parse_filename(filename):
     match = re.match(pattern, filename)
     return match.groups() if match else (None, None, None)
 
+def find_template_asset(name, template_dir=TEMPLATE_DIR):
+    """Return the path of a template image asset (.png, .jpg or .jpeg), or None if it is missing"""
+    for ext in ['.png', '.jpg', '.jpeg']:
+        path = os.path.join(template_dir, f"{name}{ext}")
+        if os.path.exists(path):
+            return path
+    return None
+
 def load_names(names_file=NAMES_FILE):
     """Load names from the names.json file"""
     try:
@@ -21,18 +36,13 @@ def load_names(names_file=NAMES_FILE):
             names_data = json.load(f)
         return names_data['first_names'], names_data['last_names']
     except FileNotFoundError:
-        print(f"Names file '{names_file}' not found.")
+        logger.warning(f"Names file '{names_file}' not found.")
         return [], []
 
-def load_tracking(tracking_file=TRACKING_FILE):
-    """Load the tracking data from file"""
+def load_tracking(tracking_file):
+    """Load the legacy JSON tracking data, which TrackingStore imports once"""
     try:
         with open(tracking_file, 'r') as f:
             return json.load(f)
     except FileNotFoundError:
         return {}
-
-def save_tracking(tracking_data, tracking_file=TRACKING_FILE):
-    """Save the tracking data to file"""
-    with open(tracking_file, 'w', encoding='utf-8') as f:
-        json.dump(tracking_data, f, ensure_ascii=False, indent=4)
\ No newline at end of file
@@ -0,0 +1,99 @@
+# src/core/watcher.py
+
+import json
+import os
+import threading
+import time
+from config.settings import WATCH_INTERVAL, WATCH_SETTLE_SECONDS
+
+WATCH_STATE_NAME = 'autovid_watch_state.json'
+
+class FolderWatcher:
+    """
+    Incrementally scans a folder for new audio files.
+    Files already handled are remembered by name, size and mtime in a persisted seen-set; a new or changed
+    file is only reported once its size and mtime have stayed the same for settle_seconds, so uploads that
+    are still being written are left alone.
+    """
+
+    def __init__(self, folder, state_path, extensions=('.mp3',), settle_seconds=WATCH_SETTLE_SECONDS):
+        self.folder = os.path.abspath(folder)
+        self.state_path = state_path
+        self.extensions = tuple(ext.lower() for ext in extensions)
+        self.settle_seconds = settle_seconds
+        self.seen = {}
+        self.pending = {}
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                self.seen = json.load(f).get('seen', {})
+        except (FileNotFoundError, ValueError):
+            self.seen = {}
+
+    def save(self):
+        """Persist the seen-set atomically"""
+        temp_path = f"{self.state_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'folder': self.folder, 'seen': self.seen}, f, ensure_ascii=False, indent=4)
+        os.replace(temp_path, self.state_path)
+
+    def scan(self, now=None):
+        """Return paths of new or changed files that have finished being written"""
+        now = time.monotonic() if now is None else now
+        ready = []
+        present = set()
+        with os.scandir(self.folder) as entries:
+            for entry in entries:
+                if not entry.name.lower().endswith(self.extensions) or not entry.is_file():
+                    continue
+                present.add(entry.name)
+                stat = entry.stat()
+                signature = [stat.st_size, stat.st_mtime_ns]
+                if self.seen.get(entry.name) == signature:
+                    continue
+                pending = self.pending.get(entry.name)
+                if pending is None or pending['signature'] != signature:
+                    # New, or still growing: (re)start the settle timer
+                    self.pending[entry.name] = {'signature': signature, 'since': now}
+                    continue
+                if stat.st_size > 0 and now - pending['since'] >= self.settle_seconds:
+                    ready.append(entry.path)
+        for name in list(self.pending):
+            if name not in present:
+                del self.pending[name]
+        return sorted(ready)
+
+    def mark_all_seen(self):
+        """Treat every file currently in the folder as already handled"""
+        with os.scandir(self.folder) as entries:
+            for entry in entries:
+                if entry.name.lower().endswith(self.extensions) and entry.is_file():
+                    stat = entry.stat()
+                    self.seen[entry.name] = [stat.st_size, stat.st_mtime_ns]
+        self.pending.clear()
+        self.save()
+
+    def mark_done(self, paths):
+        """Record files as handled, with the size and mtime they had when they were picked up"""
+        for path in paths:
+            name = os.path.basename(path)
+            pending = self.pending.pop(name, None)
+            if pending is not None:
+                self.seen[name] = pending['signature']
+        self.save()
+
+def watch_folder(watcher, process, interval=WATCH_INTERVAL, stop_event=None):
+    """
+    Poll the watcher and hand each group of ready files to process(paths) until stop_event is set.
+    Files are marked as handled once process returns, whether or not every video succeeded;
+    if process raises, they are picked up again on the next scan.
+    """
+    stop_event = stop_event or threading.Event()
+    while not stop_event.is_set():
+        ready = watcher.scan()
+        if ready:
+            process(ready)
+            watcher.mark_done(ready)
+        stop_event.wait(interval)
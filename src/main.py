@@ -3,12 +3,14 @@
 import sys
 from PyQt6.QtWidgets import QApplication
 from ui.main_window import VideoCreatorApp
+from core.log import configure_logging
 
 def main():
     """
     Main entry point of the application.
     Initializes and runs the main window.
     """
+    configure_logging()
     app = QApplication(sys.argv)
     window = VideoCreatorApp()
     window.show()
@@ -0,0 +1,52 @@
+# src/tests/test_compositor.py
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.synthetic import make_sample_template, make_image_folder
+from core.compositor import Compositor, resolve_backend
+
+class CompositorTest(unittest.TestCase):
+    """The benchmark's sample template, whose layout mirrors its HTML"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.folder = tempfile.mkdtemp(prefix='autovid-compositor-')
+        cls.html_template = make_sample_template(os.path.join(cls.folder, 'template'))
+        cls.cover = make_image_folder(os.path.join(cls.folder, 'images'), [(640, 640)])[0]
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.folder, ignore_errors=True)
+
+    def test_auto_backend_follows_the_layout_file(self):
+        self.assertEqual(resolve_backend(self.html_template, 'auto'), 'pillow')
+        bare = os.path.join(self.folder, 'bare.html')
+        with open(bare, 'w', encoding='utf-8') as f:
+            f.write('<html></html>')
+        self.assertEqual(resolve_backend(bare, 'auto'), 'browser')
+        with self.assertRaises(FileNotFoundError):
+            resolve_backend(bare, 'pillow')
+
+    def test_render_at_layout_size(self):
+        compositor = Compositor.from_template(self.html_template)
+        frame = compositor.render(self.cover, 'Song', 'Artist', '1984')
+        self.assertEqual((frame.size, frame.mode), ((1920, 1080), 'RGB'))
+        # The static layers are composited once; songs only change the dynamic ones
+        other = compositor.render(self.cover, 'Another Song', 'Artist', '1984')
+        self.assertNotEqual(frame.tobytes(), other.tobytes())
+        self.assertEqual(compositor.render(self.cover, 'Song', 'Artist', '1984').tobytes(), frame.tobytes())
+
+    def test_rendition_and_preview_sizes(self):
+        vertical = Compositor.from_template(self.html_template, '9x16', (1080, 1920))
+        self.assertEqual(vertical.render(self.cover, 'Song', 'Artist', '1984').size, (1080, 1920))
+        preview = Compositor.from_template(self.html_template, fit_within=(480, 480))
+        self.assertEqual(preview.render(self.cover, 'Song', 'Artist', '1984').size, (480, 270))
+
+if __name__ == '__main__':
+    unittest.main()
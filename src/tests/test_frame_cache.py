@@ -0,0 +1,91 @@
+# src/tests/test_frame_cache.py
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.synthetic import make_sample_template, make_image_folder
+from core.creator import VideoRenderer
+from core.frame_cache import FrameCache, hash_file
+
+class FrameCacheTest(unittest.TestCase):
+    """Frames rendered with the Pillow backend into a frame cache in a temp folder"""
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp(prefix='autovid-frame-cache-')
+        self.html_template = make_sample_template(os.path.join(self.folder, 'template'))
+        self.cover = make_image_folder(os.path.join(self.folder, 'images'), [(640, 640)])[0]
+        self.screenshots_dir = os.path.join(self.folder, 'screenshots')
+        os.makedirs(self.screenshots_dir)
+        self.cache = FrameCache(cache_dir=os.path.join(self.folder, 'cache'))
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def renderer(self):
+        renderer = VideoRenderer(self.html_template, self.folder, self.screenshots_dir, backend='pillow', prescale=False)
+        renderer.frame_cache = self.cache
+        self.addCleanup(renderer.close)
+        return renderer
+
+    def frame(self, renderer):
+        return renderer.cached_frame(self.cover, 'Song', 'Artist', '1984')
+
+    def test_put_and_get(self):
+        source = os.path.join(self.folder, 'source.png')
+        with open(source, 'wb') as f:
+            f.write(b'frame')
+        destination = os.path.join(self.folder, 'destination.png')
+        self.assertFalse(self.cache.get('ab' * 32, destination))
+        self.cache.put('ab' * 32, source)
+        self.assertTrue(self.cache.get('ab' * 32, destination))
+        self.assertEqual(hash_file(destination), hash_file(source))
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_eviction_keeps_recently_used_frames(self):
+        cache = FrameCache(cache_dir=os.path.join(self.folder, 'small_cache'), max_bytes=250)
+        source = os.path.join(self.folder, 'source.png')
+        with open(source, 'wb') as f:
+            f.write(b'x' * 100)
+        keys = [f"{index:02d}" * 32 for index in range(3)]
+        for key in keys[:2]:
+            cache.put(key, source)
+        for key in keys[:2]:
+            os.utime(cache.path_for(key), (1, 1))
+        # A hit refreshes the first entry, so the second one is the least recently used
+        self.assertTrue(cache.get(keys[0], os.path.join(self.folder, 'hit.png')))
+        cache.put(keys[2], source)
+        self.assertEqual(cache.evictions, 1)
+        self.assertEqual([os.path.exists(cache.path_for(key)) for key in keys], [True, False, True])
+
+    def test_miss_after_layout_edit_leaves_old_entry_intact(self):
+        renderer = self.renderer()
+        path, status = self.frame(renderer)
+        self.assertEqual(status, 'miss')
+        old_key = renderer.frame_key(self.cover, 'Song', 'Artist', '1984')
+        old_frame = hash_file(path)
+
+        # The hit places the frame as a hard link to the cache entry
+        path, status = self.frame(renderer)
+        self.assertEqual(status, 'hit')
+
+        layout_path = os.path.join(os.path.dirname(self.html_template), 'sample.layout.json')
+        with open(layout_path, 'r', encoding='utf-8') as f:
+            layout = json.load(f)
+        layout['background_color'] = '#202020'
+        layout['layers'] = layout['layers'][1:]
+        with open(layout_path, 'w', encoding='utf-8') as f:
+            json.dump(layout, f)
+
+        path, status = self.frame(self.renderer())
+        self.assertEqual(status, 'miss')
+        self.assertNotEqual(hash_file(path), old_frame)
+        self.assertEqual(hash_file(self.cache.path_for(old_key)), old_frame)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+# src/tests/test_job_queue.py
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.synthetic import make_sample_template, make_audio_folder, make_image_folder, start_stub_driver
+from core.creator import VideoCreator, run_queue_workers
+from core.job_queue import JobQueue, collect_results
+from core.manifest import BatchManifest, ENCODED
+from core.tracking_store import TrackingStore
+
+SONGS = 3
+LEASE_SECONDS = 0.5
+
+class JobQueueTest(unittest.TestCase):
+    """A small batch queued in a temp folder and rendered on the stub driver"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.inputs = tempfile.mkdtemp(prefix='autovid-queue-test-')
+        cls.html_template = make_sample_template(os.path.join(cls.inputs, 'template'))
+        make_audio_folder(os.path.join(cls.inputs, 'audio'), SONGS, 2)
+        make_image_folder(os.path.join(cls.inputs, 'images'), [(640, 640)])
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.inputs, ignore_errors=True)
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp(prefix='autovid-queue-')
+        self.output_folder = os.path.join(self.folder, 'output')
+        self.tracking_db = os.path.join(self.folder, 'tracking.db')
+        creator = VideoCreator(os.path.join(self.inputs, 'images'), os.path.join(self.inputs, 'audio'), self.html_template,
+                               output_folder=self.output_folder, driver_factory=start_stub_driver, backend='browser',
+                               frame_cache=False, tracking_db=self.tracking_db)
+        success, message = creator.submit(self.queue('submitter'))
+        self.assertTrue(success, message)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def queue(self, node, lease_seconds=60):
+        return JobQueue(os.path.join(self.folder, 'queue'), node=node, lease_seconds=lease_seconds)
+
+    def tracked(self):
+        tracking = TrackingStore(self.tracking_db)
+        try:
+            return tracking.count()
+        finally:
+            tracking.close()
+
+    def test_claim_leases_every_job_once(self):
+        first, second = self.queue('a'), self.queue('b')
+        claimed = [first.claim() for _ in range(SONGS)]
+        self.assertEqual(len({job_id for job_id, job, lease in claimed}), SONGS)
+        self.assertIsNone(first.claim())
+        self.assertIsNone(second.claim())
+        self.assertEqual(first.status()['leased'], SONGS)
+
+    def test_expired_lease_is_taken_over(self):
+        first, second = self.queue('a', LEASE_SECONDS), self.queue('b')
+        job_id, job, lease = first.claim()
+        self.assertIsNone(second.acquire(job_id))
+        time.sleep(LEASE_SECONDS * 1.5)
+        # A lapsed lease is not extended, even before another node has taken it over
+        self.assertFalse(first.renew(lease))
+        taken = second.acquire(job_id)
+        self.assertIsNotNone(taken)
+        self.assertFalse(first.renew(lease))
+        # Releasing the lost lease leaves the new holder's in place
+        first.release(lease)
+        self.assertTrue(second.renew(taken))
+
+    def test_job_completed_twice_keeps_first_result(self):
+        first, second = self.queue('a', LEASE_SECONDS), self.queue('b')
+        job_id, job, lease = first.claim()
+        time.sleep(LEASE_SECONDS * 1.5)
+        taken = second.acquire(job_id)
+        second.complete(job_id, taken, {'output': 'b.mp4'})
+        first.complete(job_id, lease, {'output': 'a.mp4'})
+        done = [record for record in second.uncollected() if record['id'] == job_id]
+        self.assertEqual([record['result']['output'] for record in done], ['b.mp4'])
+        self.assertEqual(second.status()['done'], 1)
+        self.assertNotEqual(second.claim()[0], job_id)
+
+    def test_concurrent_submits_keep_the_first_job(self):
+        first, second = self.queue('a'), self.queue('b')
+        # Both nodes list the queue before either of them has added its jobs
+        files, queued = first.job_files(), first.jobs()
+        for job_queue in (first, second):
+            job_queue.job_files = lambda: files
+            job_queue.jobs = lambda: queued
+        options = first.options()
+        shared = os.path.join(self.folder, 'shared.mp3')
+        self.assertEqual(first.create(options, [dict(queued[0], audio=shared, song='First'),
+                                                dict(queued[0], audio=os.path.join(self.folder, 'a.mp3'))]), 2)
+        self.assertEqual(second.create(options, [dict(queued[0], audio=shared, song='Second'),
+                                                 dict(queued[0], audio=os.path.join(self.folder, 'b.mp3'))]), 1)
+
+        jobs = self.queue('c').jobs()
+        self.assertEqual(len(jobs), SONGS + 3)
+        self.assertEqual([job['song'] for job in jobs if job['audio'] == shared], ['First'])
+
+    def test_collect_results_is_idempotent(self):
+        job_queue = self.queue('collector')
+        rendered = run_queue_workers(job_queue.folder, nodes=2, driver_factory=start_stub_driver, lease_seconds=30)
+        self.assertEqual(rendered, SONGS)
+        self.assertEqual(job_queue.status()['done'], SONGS)
+
+        recorded = self.tracked()
+        self.assertEqual(len(collect_results(job_queue, self.tracking_db)), SONGS)
+        self.assertEqual(collect_results(job_queue, self.tracking_db), [])
+        self.assertEqual(self.tracked(), recorded + SONGS)
+        manifest = BatchManifest.load(self.output_folder)
+        for job in job_queue.jobs():
+            self.assertEqual(manifest.get(job['audio'])['state'], ENCODED)
+            self.assertTrue(os.path.exists(manifest.get(job['audio'])['output']))
+
+if __name__ == '__main__':
+    unittest.main()
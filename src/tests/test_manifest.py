@@ -0,0 +1,130 @@
+# src/tests/test_manifest.py
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.synthetic import make_audio_folder, make_image_folder
+from core.creator import VideoCreator
+from core.manifest import BatchManifest, ENCODED, FAILED, is_complete_mp4
+
+SONGS = 2
+
+# The smallest file is_complete_mp4 accepts: a moov and an mdat box spanning the whole file
+MINIMAL_MP4 = b'\x00\x00\x00\x08moov\x00\x00\x00\x08mdat'
+
+class ManifestTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp(prefix='autovid-manifest-')
+        self.output = os.path.join(self.folder, 'Artist_Song_1984.mp4')
+        self.job = {'audio': os.path.join(self.folder, 'song.mp3'), 'image': os.path.join(self.folder, 'cover.jpg'),
+                    'song': 'Song', 'artist': 'Artist', 'year': '1984', 'audio_hash': 'a', 'image_hash': 'i',
+                    'renditions': None, 'profile': None}
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def encoded(self, data=MINIMAL_MP4):
+        with open(self.output, 'wb') as f:
+            f.write(data)
+        manifest = BatchManifest(self.folder)
+        manifest.update(self.job, ENCODED, output=self.output)
+        return BatchManifest.load(self.folder)
+
+    def test_complete_output_is_done(self):
+        self.assertTrue(self.encoded().is_done(self.job))
+
+    def test_partial_output_is_not_done(self):
+        self.assertFalse(self.encoded(MINIMAL_MP4[:12]).is_done(self.job))
+
+    def test_missing_output_is_not_done(self):
+        manifest = self.encoded()
+        os.remove(self.output)
+        self.assertFalse(manifest.is_done(self.job))
+
+    def test_changed_inputs_are_not_done(self):
+        manifest = self.encoded()
+        self.assertFalse(manifest.is_done(dict(self.job, audio_hash='b')))
+        self.assertFalse(manifest.is_done(dict(self.job, renditions=['9x16'])))
+
+    def test_failed_item_is_not_done(self):
+        manifest = self.encoded()
+        manifest.update(self.job, FAILED, error='boom')
+        self.assertFalse(BatchManifest.load(self.folder).is_done(self.job))
+
+class ResumeTest(unittest.TestCase):
+    """A batch without a template, interrupted by hand and resumed from its manifest"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.inputs = tempfile.mkdtemp(prefix='autovid-resume-test-')
+        make_audio_folder(os.path.join(cls.inputs, 'audio'), SONGS, 2)
+        make_image_folder(os.path.join(cls.inputs, 'images'), [(640, 640)])
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.inputs, ignore_errors=True)
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp(prefix='autovid-resume-')
+        self.output_folder = os.path.join(self.folder, 'output')
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def run_batch(self, resume=False):
+        creator = VideoCreator(os.path.join(self.inputs, 'images'), os.path.join(self.inputs, 'audio'), None,
+                               output_folder=self.output_folder, frame_cache=False, resume=resume,
+                               tracking_db=os.path.join(self.folder, 'tracking.db'))
+        success, message = creator.run()
+        self.assertTrue(success, message)
+        return creator
+
+    def test_plan_counts_only_incomplete_videos(self):
+        first = self.run_batch()
+        truncated = sorted(result['output'] for result in first.results)[0]
+        with open(truncated, 'r+b') as f:
+            f.truncate(os.path.getsize(truncated) // 2)
+
+        creator = VideoCreator(os.path.join(self.inputs, 'images'), os.path.join(self.inputs, 'audio'), None,
+                               output_folder=self.output_folder, frame_cache=False, resume=True,
+                               tracking_db=os.path.join(self.folder, 'tracking.db'))
+        report = creator.plan(calibrate_missing=False)
+        self.assertEqual((report['count'], report['done']), (1, SONGS - 1))
+        # The resumed item keeps its name, so the half-written video is the one that would be replaced
+        self.assertEqual([item['outputs'] for item in report['items'] if item['state'] == 'planned'], [[truncated]])
+        self.assertFalse(is_complete_mp4(truncated))
+
+    def test_resume_redoes_only_incomplete_videos(self):
+        first = self.run_batch()
+        outputs = sorted(result['output'] for result in first.results)
+        self.assertEqual(len(outputs), SONGS)
+        manifest = BatchManifest.load(self.output_folder)
+        self.assertTrue(all(manifest.is_done(job) for job in first.results))
+
+        # Cut one video short and leave a partial encode behind, as a crash mid-encode would
+        truncated = outputs[0]
+        with open(truncated, 'r+b') as f:
+            f.truncate(os.path.getsize(truncated) // 2)
+        self.assertFalse(is_complete_mp4(truncated))
+        base, ext = os.path.splitext(outputs[1])
+        partial = f"{base}.partial-crashed-1{ext}"
+        with open(partial, 'wb') as f:
+            f.write(b'partial')
+
+        second = self.run_batch(resume=True)
+        self.assertEqual([job['output'] for job in second.skipped], [outputs[1]])
+        self.assertEqual([result['output'] for result in second.results], [truncated])
+        self.assertTrue(is_complete_mp4(truncated))
+        self.assertFalse(os.path.exists(partial))
+        manifest = BatchManifest.load(self.output_folder)
+        for job in first.results:
+            self.assertEqual(manifest.get(job['audio'])['state'], ENCODED)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+# src/tests/test_pipeline.py
+
+import os
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.pipeline import Pipeline, PipelineCancelled, Stage
+
+class PipelineTest(unittest.TestCase):
+
+    def run_pipeline(self, pipeline, items):
+        results, errors = {}, {}
+        pipeline.run(items, results.__setitem__, errors.__setitem__)
+        return results, errors
+
+    def test_items_pass_every_stage(self):
+        pipeline = Pipeline([Stage('double', lambda item, _: item * 2, workers=2),
+                             Stage('add', lambda item, value: value + 1, workers=2)])
+        results, errors = self.run_pipeline(pipeline, range(10))
+        self.assertEqual(results, {item: item * 2 + 1 for item in range(10)})
+        self.assertEqual(errors, {})
+
+    def test_failed_item_skips_later_stages(self):
+        def check(item, _):
+            if item == 3:
+                raise ValueError('bad item')
+            return item
+        later = []
+        pipeline = Pipeline([Stage('check', check), Stage('after', lambda item, value: later.append(item))])
+        results, errors = self.run_pipeline(pipeline, range(5))
+        self.assertEqual(sorted(results), [0, 1, 2, 4])
+        self.assertIsInstance(errors[3], ValueError)
+        self.assertNotIn(3, later)
+
+    def test_cancel_reports_every_item(self):
+        started = []
+        cancel_event = threading.Event()
+
+        def render(item, _):
+            started.append(item)
+            if item == 2:
+                cancel_event.set()
+            return item
+
+        pipeline = Pipeline([Stage('render', render, queue_size=1), Stage('encode', lambda item, value: value, queue_size=1)],
+                            cancel_event=cancel_event)
+        items = list(range(20))
+        results, errors = self.run_pipeline(pipeline, items)
+        self.assertEqual(sorted(list(results) + list(errors)), items)
+        self.assertTrue(errors)
+        self.assertTrue(all(isinstance(error, PipelineCancelled) for error in errors.values()))
+        self.assertLess(len(started), len(items))
+
+    def test_cancel_during_a_later_stage_reports_waiting_items(self):
+        cancel_event = threading.Event()
+
+        def encode(item, value):
+            if item == 0:
+                cancel_event.set()
+            return value
+
+        pipeline = Pipeline([Stage('render', lambda item, _: item, queue_size=4), Stage('encode', encode, queue_size=4)],
+                            cancel_event=cancel_event)
+        items = list(range(8))
+        results, errors = self.run_pipeline(pipeline, items)
+        self.assertEqual(list(results), [0])
+        self.assertEqual(sorted(errors), items[1:])
+        self.assertTrue(all(isinstance(error, PipelineCancelled) for error in errors.values()))
+
+if __name__ == '__main__':
+    unittest.main()
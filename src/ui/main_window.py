@@ -4,12 +4,14 @@ import json
 from PyQt6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, 
     QFileDialog, QLabel, QMessageBox, QLineEdit, QComboBox,
-    QFrame, QSizePolicy
+    QFrame, QSizePolicy, QProgressBar
 )
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QTimer
 from PyQt6.QtGui import QFont, QIcon, QPixmap
-from core.autovid import VideoCreatorThread
-from config.settings import TEMPLATE_DIR
+from core.autovid import VideoCreatorThread, TemplatePreviewThread
+from core.progress import format_event
+from core.utils import parse_filename
+from config.settings import TEMPLATE_DIR, PREVIEW_SIZE, PREVIEW_DEBOUNCE_MS
 import os
 
 class StyledButton(QPushButton):
@@ -68,6 +70,7 @@ class VideoCreatorApp(QMainWindow):
         """)
         self.init_ui()
         self.load_settings()
+        self.schedule_preview()
 
     def init_ui(self):
         main_layout = QVBoxLayout()
@@ -89,8 +92,35 @@ class VideoCreatorApp(QMainWindow):
         self.populate_template_dropdown()
         template_layout.addWidget(self.template_label)
         template_layout.addWidget(self.template_dropdown)
+        self.backend_label = QLabel("Renderer:")
+        self.backend_dropdown = QComboBox()
+        self.backend_dropdown.addItem("Auto", "auto")
+        self.backend_dropdown.addItem("Browser", "browser")
+        self.backend_dropdown.addItem("Pillow (no browser)", "pillow")
+        template_layout.addWidget(self.backend_label)
+        template_layout.addWidget(self.backend_dropdown)
+        self.renditions_label = QLabel("Formats:")
+        self.renditions_dropdown = QComboBox()
+        self.renditions_dropdown.addItem("Template size", None)
+        self.renditions_dropdown.addItem("16:9 + 9:16 + 1:1", ['16x9', '9x16', '1x1'])
+        self.renditions_dropdown.addItem("16:9", ['16x9'])
+        self.renditions_dropdown.addItem("9:16", ['9x16'])
+        self.renditions_dropdown.addItem("1:1", ['1x1'])
+        template_layout.addWidget(self.renditions_label)
+        template_layout.addWidget(self.renditions_dropdown)
         main_layout.addLayout(template_layout)
 
+        # Template preview, rendered in the background at reduced size
+        self.preview_label = QLabel("Rendering preview...")
+        self.preview_label.setFixedSize(*PREVIEW_SIZE)
+        self.preview_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.preview_label.setWordWrap(True)
+        self.preview_label.setStyleSheet("background-color: #2E2E2E; border: 1px solid #6A5ACD;")
+        main_layout.addWidget(self.preview_label, alignment=Qt.AlignmentFlag.AlignHCenter)
+        self.preview_status_label = QLabel("")
+        self.preview_status_label.setStyleSheet("font-size: 12px; color: #AAAAAA;")
+        main_layout.addWidget(self.preview_status_label, alignment=Qt.AlignmentFlag.AlignHCenter)
+
         # Folder selection
 
         self.output_folder_button = StyledButton("Select Output Folder")
@@ -155,6 +185,17 @@ class VideoCreatorApp(QMainWindow):
         main_layout.addWidget(self.create_single_video_button)
 
         # Status display
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 1000)
+        self.progress_bar.setTextVisible(False)
+        self.progress_bar.hide()
+        main_layout.addWidget(self.progress_bar)
+
+        self.stop_button = StyledButton("Stop")
+        self.stop_button.clicked.connect(self.stop_videos)
+        self.stop_button.hide()
+        main_layout.addWidget(self.stop_button)
+
         self.status_label = QLabel("")
         self.status_label.setStyleSheet("font-weight: bold; color: #6A5ACD;")
         main_layout.addWidget(self.status_label)
@@ -170,6 +211,21 @@ class VideoCreatorApp(QMainWindow):
         self.output_folder = ""
         self.single_image = ""
         self.single_audio = ""
+        self.thread = None
+
+        # Edits restart the timer, so the preview is rendered once typing pauses
+        self.preview_timer = QTimer(self)
+        self.preview_timer.setSingleShot(True)
+        self.preview_timer.setInterval(PREVIEW_DEBOUNCE_MS)
+        self.preview_timer.timeout.connect(self.request_preview)
+        self.preview_thread = TemplatePreviewThread()
+        self.preview_thread.preview_signal.connect(self.show_preview)
+        self.preview_thread.failed_signal.connect(self.preview_failed)
+        self.preview_thread.start()
+        for dropdown in (self.template_dropdown, self.backend_dropdown, self.renditions_dropdown):
+            dropdown.currentIndexChanged.connect(self.schedule_preview)
+        self.artist_name_input.textChanged.connect(self.schedule_preview)
+        self.year_input.textChanged.connect(self.schedule_preview)
 
     def truncate(s):
         words = str(s).split() 
@@ -201,6 +257,7 @@ class VideoCreatorApp(QMainWindow):
             self.image_folder = folder
             self.image_folder_button.setText(f"Image Folder: {os.path.basename(folder)}")
             self.save_settings()
+            self.schedule_preview()
 
     def select_audio_folder(self):
         """Open a dialog to select the audio folder"""
@@ -255,6 +312,7 @@ class VideoCreatorApp(QMainWindow):
         if file:
             self.single_image = file
             self.select_single_image_button.setText(f"Image: {os.path.basename(file)[:15]}")
+            self.schedule_preview()
 
     def select_single_audio(self):
         """Open a dialog to select a single audio file"""
@@ -262,6 +320,53 @@ class VideoCreatorApp(QMainWindow):
         if file:
             self.single_audio = file
             self.select_single_audio_button.setText(f"Audio: {os.path.basename(file)[:15]}")
+            self.schedule_preview()
+
+    def schedule_preview(self, *_):
+        """Render the preview once edits have paused for PREVIEW_DEBOUNCE_MS"""
+        self.preview_timer.start()
+
+    def request_preview(self):
+        """Preview the selected template with the chosen cover and metadata, samples standing in for the rest"""
+        song_name = None
+        if self.single_audio:
+            filename = os.path.basename(self.single_audio)
+            song_name = parse_filename(filename)[0] or os.path.splitext(filename)[0]
+        self.preview_thread.request(
+            html_template=self.template_dropdown.currentData(),
+            image_path=self.preview_image(),
+            song_name=song_name,
+            artist_name=self.artist_name_input.text().strip(),
+            year=self.year_input.text().strip(),
+            backend=self.backend_dropdown.currentData(),
+            renditions=self.renditions_dropdown.currentData()
+        )
+
+    def preview_image(self):
+        """The single image if one is picked, else the first image of the image folder"""
+        if self.single_image:
+            return self.single_image
+        if self.image_folder and os.path.isdir(self.image_folder):
+            images = [f for f in os.listdir(self.image_folder) if f.lower().endswith(('.png', '.jpg', '.jpeg'))]
+            if images:
+                return os.path.join(self.image_folder, min(images))
+        return None
+
+    def show_preview(self, image, info):
+        """Show a finished preview and how it was made"""
+        self.preview_label.setPixmap(QPixmap.fromImage(image))
+        timing = "cached" if info['cached'] else f"{info['seconds'] * 1000:.0f} ms"
+        self.preview_status_label.setText(f"Preview ({info['backend'] or 'no template'}, {timing})")
+
+    def preview_failed(self, message):
+        self.preview_label.setText(f"No preview: {message}")
+        self.preview_status_label.setText("")
+
+    def closeEvent(self, event):
+        """Stop the preview thread (and its browser) with the window"""
+        self.preview_timer.stop()
+        self.preview_thread.stop()
+        super().closeEvent(event)
 
     def create_videos(self):
         """Start the process of creating multiple videos"""
@@ -273,9 +378,16 @@ class VideoCreatorApp(QMainWindow):
         self.create_video_button.setEnabled(False)
 
         selected_template = self.template_dropdown.currentData()
-        self.thread = VideoCreatorThread(self.image_folder, self.audio_folder, selected_template, output_folder=self.output_folder)
+        self.thread = VideoCreatorThread(self.image_folder, self.audio_folder, selected_template, output_folder=self.output_folder,
+                                         backend=self.backend_dropdown.currentData(),
+                                         renditions=self.renditions_dropdown.currentData())
         self.thread.progress_signal.connect(self.update_progress)
+        self.thread.progress_event_signal.connect(self.update_progress_event)
         self.thread.finished_signal.connect(self.video_creation_finished)
+        self.progress_bar.setValue(0)
+        self.progress_bar.show()
+        self.stop_button.setEnabled(True)
+        self.stop_button.show()
         self.thread.start()
 
     def create_single_video(self):
@@ -293,21 +405,44 @@ class VideoCreatorApp(QMainWindow):
         selected_template = self.template_dropdown.currentData()
         self.thread = VideoCreatorThread(self.image_folder, self.audio_folder, selected_template,
                                          single_image=self.single_image, single_audio=self.single_audio,
-                                         custom_artist=artist_name, custom_year=year, output_folder=self.output_folder)
+                                         custom_artist=artist_name, custom_year=year, output_folder=self.output_folder,
+                                         backend=self.backend_dropdown.currentData(),
+                                         renditions=self.renditions_dropdown.currentData())
         self.thread.progress_signal.connect(self.update_progress)
+        self.thread.progress_event_signal.connect(self.update_progress_event)
         self.thread.finished_signal.connect(self.video_creation_finished)
+        self.progress_bar.setValue(0)
+        self.progress_bar.show()
+        self.stop_button.setEnabled(True)
+        self.stop_button.show()
         self.thread.start()
 
+    def stop_videos(self):
+        """Stop the running batch; songs already finished are kept"""
+        if self.thread is not None and self.thread.isRunning():
+            self.stop_button.setEnabled(False)
+            self.status_label.setText("Stopping...")
+            self.thread.stop()
+
     def update_progress(self, message):
         """Update the status label with progress messages"""
         self.status_label.setText(message)
 
+    def update_progress_event(self, event):
+        """Move the progress bar and show item, percent, throughput and ETA"""
+        self.progress_bar.setValue(int(event['percent'] * 10))
+        self.status_label.setText(format_event(event))
+
     def video_creation_finished(self, success, message):
         """Handle the completion of video creation"""
         self.create_video_button.setEnabled(True)
         self.create_single_video_button.setEnabled(True)
-        if success:
+        self.stop_button.hide()
+        if self.thread is not None and self.thread.stopped:
+            QMessageBox.information(self, "Stopped", message)
+        elif success:
             QMessageBox.information(self, "Success", f"Videos created successfully in:\n{self.output_folder}")
         else:
             QMessageBox.warning(self, "Error", message)
-        self.status_label.setText("")
\ No newline at end of file
+        self.status_label.setText("")
+        self.progress_bar.hide()
\ No newline at end of file